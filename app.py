@@ -4,17 +4,18 @@
 # ==========================================
 from dotenv import load_dotenv
 import os
-from flask import Flask, request, redirect, url_for, session, flash, render_template, jsonify
+from flask import Flask, request, redirect, url_for, session, flash, render_template, jsonify, g
 from datetime import datetime, timezone, timedelta
 import uuid
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash
 
 # ----------------- IMPORT UTILITAIRES -----------------
-from utils.db_utils import execute_db, init_db, query_db
-from utils.auth_utils import login_required, init_jwt, register_jwt_protection
-from services.wsjf_calculator import calculate_wsjf
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
+from utils.db_utils import execute_db, init_db, init_db_pool, pool_stats, query_db
+from utils.sql_stats import init_sql_stats, reinitialiser as reinitialiser_sql_stats, statistiques as sql_statistiques
+from utils.auth_utils import admin_required, login_required, init_jwt, register_jwt_protection, jwt_requete
+from utils.cache_vues import init_cache_vues, statistiques as cache_vues_statistiques, vider as vider_cache_vues
+from services.jobs import init_jobs
 
 # 🔒 Décorateurs utilitaires
 from utils.decorators import readonly_if_user
@@ -45,6 +46,7 @@ from routes.sous_domaine_collaborateur import sous_domaine_bp  # ✅ Nouveau blu
 from routes.valeurs_metier_routes import valeurs_bp
 from routes.demande_it import demande_it_bp
 from routes.import_excel_it_routes import import_excel_it_bp
+from routes.jobs_routes import jobs_bp
 
 # ==========================================
 # 🔹 CONFIGURATION APP
@@ -63,6 +65,18 @@ app.config.update(
 # ✅ Init DB
 init_db()
 
+# 🏊 Connexions SQLite poolées (une par requête, rendue au teardown)
+init_db_pool(app)
+
+# 📊 Instrumentation SQL (Server-Timing, requêtes lentes, /admin/sql-stats)
+init_sql_stats(app)
+
+# 🗃️ Cache des vues CAF (ETag / 304, /admin/cache-vues)
+init_cache_vues()
+
+# ⏳ Jobs d'import interrompus par le redémarrage → erreur
+init_jobs()
+
 # 🔐 Init JWT
 jwt = init_jwt(app)
 
@@ -82,22 +96,17 @@ app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(minutes=15)
 # ==========================================
 @app.context_processor
 def inject_ui_user():
-    try:
-        verify_jwt_in_request(optional=True)
-        identity = get_jwt_identity()
-        if identity:
-            claims = get_jwt()
-            return {
-                "ui_user": {
-                    "username": identity,
-                    "prenom": claims.get("prenom", ""),
-                    "nom": claims.get("nom", ""),
-                    "email": claims.get("email", ""),
-                    "role": claims.get("role", "user"),
-                }
+    identity, claims = jwt_requete()
+    if identity:
+        return {
+            "ui_user": {
+                "username": identity,
+                "prenom": claims.get("prenom", ""),
+                "nom": claims.get("nom", ""),
+                "email": claims.get("email", ""),
+                "role": claims.get("role", "user"),
             }
-    except Exception:
-        pass
+        }
 
     user = session.get("user")
     if user:
@@ -122,24 +131,23 @@ def handle_expired_session():
     if request.endpoint in exempt_routes or request.endpoint is None:
         return
 
-    try:
-        verify_jwt_in_request(optional=True)
-        claims = get_jwt()
-        if claims:
-            exp = claims.get("exp")
-            if exp and datetime.fromtimestamp(exp, tz=timezone.utc) < datetime.now(timezone.utc):
-                session.clear()
-                return redirect(url_for("auth.expired"))
-
-        if not get_jwt_identity() and not session.get("user"):
-            session.clear()
-            return redirect(url_for("auth.expired"))
-    except Exception:
+    # JWT déjà décodé par la protection globale (voir jwt_requete)
+    identity, claims = jwt_requete()
+    if g.jwt_erreur is not None:
         if request.headers.get("X-Requested-With") == "XMLHttpRequest":
             return jsonify({"session_expired": True}), 401
         session.clear()
         return redirect(url_for("auth.expired"))
 
+    exp = claims.get("exp")
+    if exp and datetime.fromtimestamp(exp, tz=timezone.utc) < datetime.now(timezone.utc):
+        session.clear()
+        return redirect(url_for("auth.expired"))
+
+    if not identity and not session.get("user"):
+        session.clear()
+        return redirect(url_for("auth.expired"))
+
 
 # ==========================================
 # 🧭 ROUTE KEEPALIVE — maintient la session active si activité
@@ -151,6 +159,47 @@ def ping():
     return "", 204
 
 
+# ==========================================
+# 📈 Statistiques du pool SQLite (dimensionnement DB_POOL_SIZE)
+# ==========================================
+@app.route("/admin/db-pool")
+@admin_required
+def db_pool_stats():
+    return jsonify(pool_stats())
+
+
+# ==========================================
+# 📊 Statistiques SQL par endpoint (POST /reset pour remettre à zéro)
+# ==========================================
+@app.route("/admin/sql-stats")
+@admin_required
+def sql_stats():
+    return jsonify(sql_statistiques())
+
+
+@app.route("/admin/sql-stats/reset", methods=["POST"])
+@admin_required
+def sql_stats_reset():
+    reinitialiser_sql_stats()
+    return jsonify(sql_statistiques())
+
+
+# ==========================================
+# 🗃️ Cache des vues CAF : taux de hit, mémoire (POST /reset pour le vider)
+# ==========================================
+@app.route("/admin/cache-vues")
+@admin_required
+def cache_vues_stats():
+    return jsonify(cache_vues_statistiques())
+
+
+@app.route("/admin/cache-vues/reset", methods=["POST"])
+@admin_required
+def cache_vues_reset():
+    vider_cache_vues(compteurs=True)
+    return jsonify(cache_vues_statistiques())
+
+
 # ==========================================
 # 🔹 BLUEPRINTS
 # ==========================================
@@ -160,7 +209,7 @@ for bp in [
     statut_demande_bp, phase_bp, domaines_bp, programme_config_bp,
     regles_complexite_bp, affectation_bp, accompagnement_bp, recrutement_bp,
     sous_domaine_bp,  # ✅ Ajout du blueprint ici
-    valeurs_bp, demande_it_bp, import_excel_it_bp,
+    valeurs_bp, demande_it_bp, import_excel_it_bp, jobs_bp,
 ]:
     app.register_blueprint(bp)
 
@@ -190,24 +239,18 @@ def has_role(required_roles):
 # ==========================================
 @app.route("/")
 def index():
-    try:
-        verify_jwt_in_request(optional=True)
-        if get_jwt_identity():
-            return redirect(url_for("projet.liste_demandes"))
-    except Exception:
-        pass
+    identity, _ = jwt_requete()
+    if identity:
+        return redirect(url_for("projet.liste_demandes"))
     return redirect(url_for("auth.login"))
 
 
 @app.route("/home")
 def home():
     """Page d'accueil redirigeant selon connexion"""
-    try:
-        verify_jwt_in_request(optional=True)
-        if get_jwt_identity():
-            return redirect(url_for("projet.liste_demandes"))
-    except Exception:
-        pass
+    identity, _ = jwt_requete()
+    if identity:
+        return redirect(url_for("projet.liste_demandes"))
     return redirect(url_for("auth.login"))
 
 
@@ -0,0 +1,88 @@
+# benchmarks/bench_auth.py
+# ==========================================
+# ⏱️ Benchmark : coût de l'authentification JWT par requête
+#
+# Avant : le cookie était vérifié par la protection globale, le contrôle
+# d'expiration, login_required et le context processor (4 décodages + réécriture
+# de session["user"]). Après : jwt_requete() décode une fois et garde le
+# résultat sur g.
+#
+# Usage : python benchmarks/bench_auth.py [nb_requetes]
+# ==========================================
+import os
+import sys
+import time
+
+from flask import Flask, session
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, verify_jwt_in_request  # noqa: E402
+
+from utils.auth_utils import init_jwt, jwt_requete  # noqa: E402
+
+
+def creer_app():
+    app = Flask(__name__)
+    app.secret_key = "bench"
+    init_jwt(app)
+    with app.app_context():
+        token = create_access_token(identity="admin", additional_claims={
+            "prenom": "Ada", "nom": "Lovelace", "email": "ada@example.com", "role": "admin",
+        })
+    return app, {"Cookie": f"access_token_cookie={token}"}
+
+
+def auth_historique():
+    """Enchaînement des vérifications d'une requête protégée avant la lecture unique."""
+    # register_jwt_protection
+    verify_jwt_in_request(optional=False)
+    # handle_expired_session
+    verify_jwt_in_request(optional=True)
+    get_jwt()
+    get_jwt_identity()
+    # login_required
+    verify_jwt_in_request()
+    identity, claims = get_jwt_identity(), get_jwt()
+    session["user"] = {"username": identity, "prenom": claims.get("prenom"), "nom": claims.get("nom"),
+                       "email": claims.get("email"), "role": claims.get("role", "user")}
+    # inject_ui_user
+    verify_jwt_in_request(optional=True)
+    get_jwt_identity()
+    get_jwt()
+
+
+def auth_lecture_unique():
+    """Mêmes points d'appel, servis par jwt_requete()."""
+    for _ in range(4):
+        jwt_requete()
+
+
+def chrono(app, entetes, fn, nb_requetes, repetitions=3):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        for _ in range(nb_requetes):
+            with app.test_request_context("/projet/liste", headers=entetes):
+                fn()
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return meilleur / nb_requetes
+
+
+def main():
+    nb_requetes = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    app, entetes = creer_app()
+
+    t_vide = chrono(app, entetes, lambda: None, nb_requetes)
+    t_ancien = chrono(app, entetes, auth_historique, nb_requetes) - t_vide
+    t_unique = chrono(app, entetes, auth_lecture_unique, nb_requetes) - t_vide
+
+    print(f"Requêtes simulées       : {nb_requetes}")
+    print(f"Vérifications multiples : {t_ancien * 1e6:8.1f} µs / requête")
+    print(f"Lecture unique (g)      : {t_unique * 1e6:8.1f} µs / requête")
+    print(f"Accélération            : x{t_ancien / t_unique:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
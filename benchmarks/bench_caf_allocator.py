@@ -0,0 +1,98 @@
+# benchmarks/bench_caf_allocator.py
+# ==========================================
+# ⏱️ Benchmark : boucle historique vs allocateur NumPy (CAF requise)
+#
+# Usage : python benchmarks/bench_caf_allocator.py [nb_lignes] [annee]
+# ==========================================
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.caf_allocator import charge_par_profil  # noqa: E402
+
+
+def generer_lignes(nb_lignes, annee, nb_profils=30, seed=42):
+    """Lignes projet × phase × profil aléatoires autour de l'année ciblée."""
+    rnd = random.Random(seed)
+    origine = date(annee - 1, 7, 1)
+    lignes = []
+    for i in range(nb_lignes):
+        debut = origine + timedelta(days=rnd.randint(0, 540))
+        fin = debut + timedelta(days=rnd.randint(0, 240))
+        lignes.append({
+            "id": i,
+            "duree_estimee_jh": rnd.choice([20, 40, 60, 120, 500]),
+            "date_debut": debut.strftime("%Y-%m-%d"),
+            "date_fin": fin.strftime("%Y-%m-%d"),
+            # quelques profils inexistants pour alimenter 'Autre'
+            "profil_id": rnd.randint(1, nb_profils + 2),
+            "pourcentage": rnd.choice([None, 10, 25, 50, 100]),
+        })
+    return lignes
+
+
+def boucle_historique(lignes, annee, profil_ids):
+    """Copie de l'ancien calcul de routes/caf.py (lignes × semaines en Python)."""
+    num_weeks = 53 if date(annee, 12, 31).isocalendar()[1] == 53 else 52
+    start = date(annee, 1, 1)
+    while start.weekday() != 0:
+        start += timedelta(days=1)
+
+    charge_semaine = {i: {pid: 0 for pid in profil_ids} for i in range(num_weeks)}
+    autre = [0] * num_weeks
+    for projet in lignes:
+        debut = datetime.strptime(projet["date_debut"], "%Y-%m-%d").date()
+        fin = datetime.strptime(projet["date_fin"], "%Y-%m-%d").date()
+        charge_projet = (projet["duree_estimee_jh"] or 0) * ((projet["pourcentage"] or 100) / 100)
+        for i in range(num_weeks):
+            debut_semaine = start + timedelta(weeks=i)
+            fin_semaine = debut_semaine + timedelta(days=6)
+            if debut <= fin_semaine and fin >= debut_semaine:
+                jours = (min(fin, fin_semaine) - max(debut, debut_semaine)).days + 1
+                total_jours = (fin - debut).days + 1
+                if total_jours > 0:
+                    part = (charge_projet * jours) / total_jours
+                    if projet["profil_id"] in charge_semaine[i]:
+                        charge_semaine[i][projet["profil_id"]] += part
+                    else:
+                        autre[i] += part
+
+    matrice = np.array([[charge_semaine[i][pid] for i in range(num_weeks)] for pid in profil_ids])
+    return matrice, np.array(autre)
+
+
+def chrono(fn, repetitions):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        resultat = fn()
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return meilleur, resultat
+
+
+def main():
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    annee = int(sys.argv[2]) if len(sys.argv) > 2 else date.today().year
+    profil_ids = list(range(1, 31))
+    lignes = generer_lignes(nb_lignes, annee)
+
+    t_ancien, (m_ancien, a_ancien) = chrono(lambda: boucle_historique(lignes, annee, profil_ids), 1)
+    t_numpy, (m_numpy, a_numpy) = chrono(lambda: charge_par_profil(lignes, annee, profil_ids), 5)
+
+    identique = np.allclose(m_ancien, m_numpy) and np.allclose(a_ancien, a_numpy)
+    print(f"Lignes phase × profil : {nb_lignes}  (année {annee}, {m_numpy.shape[1]} semaines)")
+    print(f"Boucle historique     : {t_ancien * 1000:9.1f} ms")
+    print(f"Allocateur NumPy      : {t_numpy * 1000:9.1f} ms")
+    print(f"Accélération          : x{t_ancien / t_numpy:.1f}")
+    print(f"Résultats identiques  : {'oui' if identique else 'NON'}")
+    return 0 if identique else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
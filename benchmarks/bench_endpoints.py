@@ -0,0 +1,296 @@
+# benchmarks/bench_endpoints.py
+# ==========================================
+# 🏁 Benchmark de bout en bout des routes principales
+#
+# Génère (ou réutilise) un portefeuille synthétique (benchmarks/portefeuille.py),
+# pointe l'application dessus puis appelle chaque route via le client de test
+# Flask : latence p50 / p95 et nombre de requêtes SQL (en-tête Server-Timing).
+# Chaque route est mesurée à froid (cache des vues vidé avant chaque appel :
+# coût réel du calcul, section « routes ») puis à chaud (réponses servies
+# par le cache, section « routes_chaud »).
+# Les imports Excel sont envoyés en job (Accept: application/json) et mesurés
+# jusqu'à la fin du job.
+#
+# Résultat écrit en JSON (--sortie) ; avec --comparer BASELINE.json, signale
+# toute route plus lente que la référence au-delà de --tolerance (ou qui
+# exécute plus de requêtes SQL) et sort en code 1.
+#
+# Usage : python benchmarks/bench_endpoints.py [--projets N] [--collaborateurs M]
+#         [--base chemin.db] [--repetitions R] [--sortie resultats.json]
+#         [--comparer baseline.json] [--tolerance 0.25] [--imports]
+# ==========================================
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import portefeuille  # noqa: E402
+
+ANNEE = datetime.now().year
+
+# (nom, méthode, URL)
+ROUTES = [
+    ("projets.liste", "GET", "/projet/liste"),
+    ("demande_it.liste_projets_it", "GET", "/demande_it/liste_projet_it"),
+    ("demande_it.liste_demandes_it", "GET", "/demande_it/liste_demandes_it"),
+    ("collaborateurs.liste", "GET", "/collaborateurs/"),
+    ("accompagnement.liste", "GET", "/accompagnement/"),
+    ("programme_config.liste", "GET", "/programme_config/"),
+    ("caf.requise", "GET", "/caf/caf-requise"),
+    ("caf.disponibles", "GET", "/caf/caf-disponibles"),
+    ("caf.automatique", "GET", "/caf/automatique"),
+    ("caf.dashboard", "GET", "/caf/dashboard"),
+    ("caf.matrices", "GET", f"/caf/api/matrices?annee={ANNEE}"),
+    ("caf.export_excel", "GET", f"/caf/export-excel?annee={ANNEE}"),
+    ("collaborateurs.modele", "GET", "/collaborateurs/telecharger-modele"),
+]
+
+# (nom, URL, fichier généré par portefeuille.ecrire_excel)
+IMPORTS = [
+    ("import.projets", "/import/", "projets.xlsx"),
+    ("import.projets_it", "/import_excel_it/", "projets_it.xlsx"),
+    ("import.collaborateurs", "/collaborateurs/import-excel", "collaborateurs.xlsx"),
+]
+
+# (section du JSON, cache des vues vidé avant chaque appel)
+MODES = (("routes", True), ("routes_chaud", False))
+
+RE_SQL = re.compile(r'db;desc="SQL x(\d+)";dur=([\d.]+)')
+
+
+# ============================================================
+# 📐 Mesures
+# ============================================================
+def centile(valeurs, p):
+    """Centile p (0-100) par interpolation linéaire."""
+    valeurs = sorted(valeurs)
+    if len(valeurs) == 1:
+        return valeurs[0]
+    rang = (len(valeurs) - 1) * p / 100
+    bas = int(rang)
+    haut = min(bas + 1, len(valeurs) - 1)
+    return valeurs[bas] + (valeurs[haut] - valeurs[bas]) * (rang - bas)
+
+
+def resume(durees, nb_sql, ms_sql, statut):
+    return {
+        "statut": statut,
+        "repetitions": len(durees),
+        "p50_ms": round(centile(durees, 50), 2),
+        "p95_ms": round(centile(durees, 95), 2),
+        "min_ms": round(min(durees), 2),
+        "sql_nb": max(nb_sql) if nb_sql else None,
+        "sql_ms_p50": round(centile(ms_sql, 50), 2) if ms_sql else None,
+    }
+
+
+def sql_de(reponse):
+    """(nombre de requêtes, ms SQL) lus dans Server-Timing."""
+    m = RE_SQL.search(reponse.headers.get("Server-Timing", ""))
+    return (int(m.group(1)), float(m.group(2))) if m else (None, None)
+
+
+def mesurer_route(client, methode, url, repetitions, chauffe, avant=None):
+    """
+    Appelle la route `chauffe` fois sans mesurer puis `repetitions` fois ;
+    `avant` est appelé (hors mesure) avant chaque appel mesuré.
+    """
+    for _ in range(chauffe):
+        client.open(url, method=methode).close()
+
+    durees, nb_sql, ms_sql, statut = [], [], [], None
+    for _ in range(repetitions):
+        if avant:
+            avant()
+        debut = time.perf_counter()
+        reponse = client.open(url, method=methode)
+        reponse.get_data()  # inclut la génération des réponses en flux
+        durees.append((time.perf_counter() - debut) * 1000)
+        statut = reponse.status_code
+        nb, ms = sql_de(reponse)
+        if nb is not None:
+            nb_sql.append(nb)
+            ms_sql.append(ms)
+        reponse.close()
+    return resume(durees, nb_sql, ms_sql, statut)
+
+
+def mesurer_import(client, url, chemin, delai_max=600):
+    """Envoie le fichier en job puis interroge /jobs/<id> jusqu'à la fin."""
+    debut = time.perf_counter()
+    with open(chemin, "rb") as f:
+        reponse = client.post(
+            url, data={"file": (f, os.path.basename(chemin))},
+            headers={"Accept": "application/json"}, content_type="multipart/form-data",
+        )
+    if reponse.status_code != 202:
+        return {"statut": reponse.status_code, "erreur": "job non créé"}
+    envoi_ms = (time.perf_counter() - debut) * 1000
+    statut_url = reponse.get_json()["status_url"]
+
+    job = {}
+    while time.perf_counter() - debut < delai_max:
+        job = client.get(statut_url).get_json()
+        if job["termine"]:
+            break
+        time.sleep(0.05)
+    return {
+        "statut": job.get("statut"),
+        "envoi_ms": round(envoi_ms, 2),
+        "total_ms": round((time.perf_counter() - debut) * 1000, 2),
+        "lignes_lues": job.get("lignes_lues"),
+        "lignes_inserees": job.get("lignes_inserees"),
+        "lignes_rejetees": job.get("lignes_rejetees"),
+    }
+
+
+# ============================================================
+# 🔍 Comparaison avec une référence
+# ============================================================
+def comparer(resultats, reference, tolerance, plancher_ms=2.0):
+    """
+    Liste des régressions (texte) de `resultats` par rapport à `reference`.
+    Les écarts de moins de `plancher_ms` sont ignorés (bruit des routes très rapides).
+    """
+    regressions = []
+    # Références antérieures aux mesures à froid : « routes » y était mesurée à chaud
+    sections = [(s, s) for s, _ in MODES] if "routes_chaud" in reference else [("routes", "routes_chaud")]
+    for section_ref, section in sections:
+        suffixe = "" if section == "routes" else " (chaud)"
+        for nom, ref in reference.get(section_ref, {}).items():
+            cour = resultats.get(section, {}).get(nom)
+            if cour is None or "p50_ms" not in ref:
+                continue
+            nom = f"{nom}{suffixe}"
+            if cour["statut"] != ref["statut"]:
+                regressions.append(f"{nom} : statut {ref['statut']} → {cour['statut']}")
+            for cle in ("p50_ms", "p95_ms"):
+                if cour[cle] > ref[cle] * (1 + tolerance) and cour[cle] - ref[cle] >= plancher_ms:
+                    regressions.append(f"{nom} : {cle} {ref[cle]:.1f} → {cour[cle]:.1f} ms "
+                                       f"(+{(cour[cle] / ref[cle] - 1) * 100:.0f} %)")
+            if ref.get("sql_nb") is not None and (cour.get("sql_nb") or 0) > ref["sql_nb"]:
+                regressions.append(f"{nom} : requêtes SQL {ref['sql_nb']} → {cour['sql_nb']}")
+    for nom, ref in reference.get("imports", {}).items():
+        cour = resultats.get("imports", {}).get(nom)
+        if cour and "total_ms" in ref and "total_ms" in cour \
+                and cour["total_ms"] > ref["total_ms"] * (1 + tolerance):
+            regressions.append(f"{nom} : {ref['total_ms']:.0f} → {cour['total_ms']:.0f} ms")
+    if reference.get("taille") != resultats["taille"]:
+        regressions.insert(0, "⚠️ tailles de portefeuille différentes : comparaison indicative")
+    return regressions
+
+
+# ============================================================
+# 🏁 Exécution
+# ============================================================
+def client_admin(app):
+    from flask_jwt_extended import create_access_token
+
+    client = app.test_client()
+    with app.app_context():
+        jeton = create_access_token(identity="admin", additional_claims={"role": "admin"})
+    client.set_cookie("access_token_cookie", jeton)
+    return client
+
+
+def main():
+    parser = portefeuille.arguments(argparse.ArgumentParser(description="Benchmark des routes principales."))
+    parser.add_argument("--base", help="base déjà générée à réutiliser (sinon générée dans un dossier temporaire)")
+    parser.add_argument("--repetitions", type=int, default=10)
+    parser.add_argument("--chauffe", type=int, default=1)
+    parser.add_argument("--imports", action="store_true", help="mesure aussi les imports Excel (jobs)")
+    parser.add_argument("--sortie", help="fichier JSON où écrire les résultats")
+    parser.add_argument("--comparer", help="résultats de référence (JSON)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="dégradation tolérée (0.25 = +25 %%)")
+    parser.add_argument("--plancher-ms", type=float, default=2.0, help="écart absolu minimal signalé")
+    options = parser.parse_args()
+
+    dossier = tempfile.mkdtemp(prefix="bench_portefeuille_")
+    try:
+        base = options.base or os.path.join(dossier, "projets.db")
+        taille = {"projets": options.projets, "collaborateurs": options.collaborateurs,
+                  "regles": options.regles, "seed": options.seed}
+        if not options.base:
+            debut = time.perf_counter()
+            comptes = portefeuille.generer(
+                base, options.projets, options.collaborateurs, options.regles, options.seed,
+                portefeuille.distribution_depuis(options),
+                excel=dossier if options.imports else None,
+            )
+            print(f"🏭 Portefeuille généré en {time.perf_counter() - debut:.1f} s : "
+                  + ", ".join(f"{t}={n}" for t, n in comptes.items()))
+        elif options.imports:
+            import sqlite3
+            conn = sqlite3.connect(base)
+            portefeuille.ecrire_excel(conn, portefeuille.random.Random(options.seed), dossier,
+                                      options.projets, options.collaborateurs)
+            conn.close()
+
+        # La base doit être choisie avant l'import de l'application
+        import utils.db_utils as db_utils
+        db_utils.DB_PATH = base
+        os.environ["INIT_DB_FORCE"] = "0"
+        from app import app
+        from utils import cache_vues
+
+        client = client_admin(app)
+        resultats = {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "taille": taille,
+            "cache_vues": cache_vues.CACHE_VUES,
+            **{section: {} for section, _ in MODES},
+        }
+
+        print(f"{'route':34s} {'statut':>6s} {'froid p50':>10s} {'p95':>9s} {'SQL':>5s}"
+              f" {'chaud p50':>10s} {'p95':>9s} {'SQL':>5s}")
+        for nom, methode, url in ROUTES:
+            ligne = f"{nom:34s}"
+            for section, froid in MODES:
+                r = mesurer_route(client, methode, url, options.repetitions, options.chauffe,
+                                  avant=cache_vues.vider if froid else None)
+                resultats[section][nom] = r
+                if froid:
+                    ligne += f" {r['statut']:6d}"
+                ligne += (f" {r['p50_ms']:10.1f} {r['p95_ms']:9.1f}"
+                          f" {'-' if r['sql_nb'] is None else r['sql_nb']:>5}")
+            print(ligne)
+
+        if options.imports:
+            resultats["imports"] = {}
+            for nom, url, fichier in IMPORTS:
+                r = mesurer_import(client, url, os.path.join(dossier, fichier))
+                resultats["imports"][nom] = r
+                print(f"{nom:34s} {r.get('statut')!s:>6s} {r.get('total_ms', float('nan')):9.0f} ms "
+                      f"({r.get('lignes_inserees')} insérées, {r.get('lignes_rejetees')} rejetées)")
+
+        if options.sortie:
+            with open(options.sortie, "w", encoding="utf-8") as f:
+                json.dump(resultats, f, indent=2, ensure_ascii=False)
+            print(f"💾 Résultats écrits dans {options.sortie}")
+
+        if options.comparer:
+            with open(options.comparer, encoding="utf-8") as f:
+                reference = json.load(f)
+            regressions = comparer(resultats, reference, options.tolerance, options.plancher_ms)
+            bloquantes = [r for r in regressions if not r.startswith("⚠️")]
+            for ligne in regressions:
+                print(f"❌ {ligne}" if not ligne.startswith("⚠️") else ligne)
+            if bloquantes:
+                return 1
+            print(f"✅ Aucune régression par rapport à {options.comparer} (tolérance {options.tolerance:.0%}).")
+        return 0
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
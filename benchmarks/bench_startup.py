@@ -0,0 +1,100 @@
+# benchmarks/bench_startup.py
+# ==========================================
+# ⏱️ Benchmark : temps de démarrage de l'application
+#
+# Lance `python -X importtime -c "import app"` dans un sous-processus (sur une
+# copie de la base) et affiche le coût cumulé de chaque blueprint routes.*,
+# des bibliothèques lourdes et de l'import complet, puis compare un démarrage
+# avec initialisation du schéma forcée et un démarrage où elle est sautée.
+#
+# Usage : python benchmarks/bench_startup.py
+# ==========================================
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+RACINE = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BASE = os.path.join(RACINE, "database", "projets.db")
+
+BIBLIOTHEQUES = ("pandas", "openpyxl", "numpy", "ldap3", "pyxlsb")
+
+# Importe l'application sur une copie de la base et affiche la durée totale (ms)
+SCRIPT = """
+import time
+t0 = time.perf_counter()
+import utils.db_utils as db
+db.DB_PATH = {base!r}
+import app
+print("TOTAL_MS", (time.perf_counter() - t0) * 1000)
+"""
+
+LIGNE_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def copier_base(dst):
+    """Copie cohérente (WAL compris) de la base, via l'API de sauvegarde SQLite."""
+    src = sqlite3.connect(f"file:{BASE}?mode=ro", uri=True)
+    cible = sqlite3.connect(dst)
+    src.backup(cible)
+    cible.close()
+    src.close()
+
+
+def demarrer(base, importtime=False, forcer=False):
+    """Un démarrage à froid : (sortie standard, sortie d'erreur)."""
+    env = dict(os.environ, INIT_DB_FORCE="1" if forcer else "0")
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", SCRIPT.format(base=base)]
+    res = subprocess.run(cmd, cwd=RACINE, env=env, capture_output=True, text=True, check=True)
+    return res.stdout, res.stderr
+
+
+def total_ms(sortie):
+    for ligne in sortie.splitlines():
+        if ligne.startswith("TOTAL_MS"):
+            return float(ligne.split()[1])
+    return float("nan")
+
+
+def cumuls(stderr):
+    """{ module : cumul en ms } pour les modules de premier niveau chargés."""
+    resultat = {}
+    for ligne in stderr.splitlines():
+        m = LIGNE_IMPORTTIME.match(ligne)
+        if m:
+            resultat.setdefault(m.group(4), int(m.group(2)) / 1000)
+    return resultat
+
+
+def main():
+    with tempfile.TemporaryDirectory() as dossier:
+        base = os.path.join(dossier, "projets.db")
+        copier_base(base)
+
+        _, stderr = demarrer(base, importtime=True)
+        modules = cumuls(stderr)
+
+        print("Blueprints (cumul d'import, ms)")
+        for nom, ms in sorted(((n, v) for n, v in modules.items() if n.startswith("routes.")),
+                              key=lambda x: -x[1]):
+            print(f"  {nom:40s} {ms:8.1f}")
+
+        print("Bibliothèques lourdes")
+        for nom in BIBLIOTHEQUES:
+            ms = modules.get(nom)
+            print(f"  {nom:40s} {'non chargée' if ms is None else f'{ms:8.1f}'}")
+
+        print(f"  {'app (total)':40s} {modules.get('app', float('nan')):8.1f}")
+
+        # Les deux démarrages ci-dessous diffèrent seulement par init_db
+        avec_init = min(total_ms(demarrer(base, forcer=True)[0]) for _ in range(3))
+        sans_init = min(total_ms(demarrer(base)[0]) for _ in range(3))
+        print(f"Démarrage, schéma réinitialisé : {avec_init:8.1f} ms")
+        print(f"Démarrage, schéma à jour       : {sans_init:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
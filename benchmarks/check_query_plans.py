@@ -0,0 +1,155 @@
+# benchmarks/check_query_plans.py
+# ==========================================
+# 🔍 Contrôle des plans d'exécution (EXPLAIN QUERY PLAN)
+#
+# Applique les migrations sur une copie de la base puis vérifie que les
+# requêtes chaudes des routes lisent les tables filtrées / jointes par
+# index : aucune ligne « SCAN <table> » sans index pour les alias listés.
+# Le SQL contrôlé est celui des routes : mêmes constructeurs de listes,
+# passés par requete_page / requete_total comme dans paginer, et mêmes
+# constantes SQL pour les requêtes ponctuelles.
+# Code de sortie 1 si une requête régresse (utilisable en CI).
+#
+# Usage : python benchmarks/check_query_plans.py [chemin_base]
+# ==========================================
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from routes.complexite_routes import (  # noqa: E402
+    SQL_TYPES_PAR_LIBELLE as SQL_TYPES_COMPLEXITE,
+    SQL_VALEURS_PAR_TYPE as SQL_VALEURS_COMPLEXITE,
+)
+from routes.demande_it import (  # noqa: E402
+    SQL_DEMANDES_CHIFFREES_IT, requete_liste_demandes_it, requete_liste_projets_it,
+)
+from routes.profils_routes import SQL_DEPENDANCES_PROFIL, TABLES_DEPENDANTES_PROFIL  # noqa: E402
+from routes.programme_config_routes import SQL_PROJETS_PROGRAMME  # noqa: E402
+from routes.programmes_routes import SQL_PROJETS_PROGRAMME as SQL_PROJETS_ANCIENS  # noqa: E402
+from routes.projet_routes import (  # noqa: E402
+    SQL_DEMANDES_A_RETENIR, requete_liste_demandes, requete_liste_projets,
+)
+from routes.valeurs_metier_routes import (  # noqa: E402
+    SQL_TYPES_PAR_LIBELLE as SQL_TYPES_VALEURS,
+    SQL_VALEURS_PAR_TYPE as SQL_VALEURS_VALEURS,
+)
+from services.criteres_projet import CRITERES, _select_critere  # noqa: E402
+from services.priorites import SQL_RANG, SQL_RECLASSEMENT  # noqa: E402
+from services.repartitions import SQL_REPARTITIONS  # noqa: E402
+from utils.migrations import appliquer_migrations  # noqa: E402
+from utils.pagination import encoder_curseur, requete_page, requete_total  # noqa: E402
+
+BASE = os.path.join(os.path.dirname(__file__), "..", "database", "projets.db")
+
+RECHERCHE = "projet"
+
+# Listes : Projet lu par index (type / retenue), jointures par clé primaire
+ALIAS_LISTES = ["p", "prog", "d", "cat", "s"]
+
+
+# ==========================================
+# 📋 Listes paginées : mêmes constructeurs que les routes
+# ==========================================
+def variantes_listes():
+    """(nom, constructeur, kwargs) pour chaque combinaison de filtres des listes."""
+    constructeurs = {
+        "projet.liste_projets": (requete_liste_projets, False),
+        "projet.liste_demandes": (requete_liste_demandes, True),
+        "demande_it.liste_projets_it": (requete_liste_projets_it, False),
+        "demande_it.liste_demandes_it": (requete_liste_demandes_it, True),
+    }
+    for nom, (constructeur, avec_retenue) in constructeurs.items():
+        for search in ("", RECHERCHE):
+            for incomplets in (False, True):
+                for retenue in (("", "1", "0", "null") if avec_retenue else ("",)):
+                    kwargs = {"search": search, "incomplets": incomplets}
+                    if avec_retenue:
+                        kwargs["retenue_filter"] = retenue
+                    etiquette = ", ".join(f"{k}={v!r}" for k, v in kwargs.items() if v)
+                    yield f"{nom} ({etiquette or 'sans filtre'})", constructeur, kwargs
+
+
+def parcours_projet_admis(nom, kwargs):
+    """Demandes hors IT sans recherche ni filtre retenue : presque toute la table, le parcours de p est le bon plan."""
+    return nom.startswith("projet.liste_demandes") and not kwargs["search"] and not kwargs["retenue_filter"]
+
+
+def requetes_listes():
+    """Page 1 (OFFSET), page suivante (curseur) et total de chaque variante."""
+    for nom, constructeur, kwargs in variantes_listes():
+        base_query, args, tri = constructeur(**kwargs)
+        alias = ALIAS_LISTES[1:] if parcours_projet_admis(nom, kwargs) else ALIAS_LISTES
+        sql, params, _ = requete_page(base_query, args, tri)
+        yield f"{nom} page 1", sql, params, alias
+        curseur = encoder_curseur([0] * len(tri))
+        sql, params, _ = requete_page(base_query, args, tri, apres=curseur)
+        yield f"{nom} curseur", sql, params, alias
+        sql, params = requete_total(base_query, args)
+        yield f"{nom} total", sql, params, alias
+
+
+# ==========================================
+# 🔎 Requêtes ponctuelles des routes et services
+# ==========================================
+def requetes_ponctuelles():
+    yield "demande_it.demandes_chiffrees", SQL_DEMANDES_CHIFFREES_IT, [], ["p"]
+    yield "projet.demandes_a_retenir", SQL_DEMANDES_A_RETENIR, [1], ["Projet"]
+    yield "programme_config.get_projets", SQL_PROJETS_PROGRAMME, [1], ["Projet"]
+    yield "programmes.gerer_projets (ancienne table)", SQL_PROJETS_ANCIENS, [1], ["p", "c"]
+    yield "priorites.reclasser", SQL_RECLASSEMENT, [], ["Projet"]
+    yield "priorites.rang", SQL_RANG, [1], ["Projet", "p", "q"]
+    yield ("criteres_projet.charger_criteres",
+           " UNION ALL ".join(_select_critere(c) for c in CRITERES), [1] * len(CRITERES), ["l", "t"])
+    yield ("repartitions.charger_repartitions",
+           SQL_REPARTITIONS.format(marqueurs="?,?"), ["A1", "A2"], ["cr", "p"])
+    for table in TABLES_DEPENDANTES_PROFIL:
+        yield f"profils.supprimer ({table})", SQL_DEPENDANCES_PROFIL.format(table=table), [1], [table]
+    yield "complexite.get_types", SQL_TYPES_COMPLEXITE, ["x"], ["complexite"]
+    yield "complexite.get_valeurs", SQL_VALEURS_COMPLEXITE, ["x", "y"], ["complexite"]
+    yield "valeurs_metier.get_types", SQL_TYPES_VALEURS, ["x"], ["valeur_metier"]
+    yield "valeurs_metier.get_valeurs", SQL_VALEURS_VALEURS, ["x", "y"], ["valeur_metier"]
+
+
+def copier_base(src_path, dst):
+    """Copie cohérente (WAL compris) de la base, via l'API de sauvegarde SQLite."""
+    src = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True)
+    src.backup(dst)
+    src.close()
+
+
+def scans_complets(conn, sql, params, alias):
+    """Lignes du plan qui parcourent une table surveillée sans index."""
+    fautes = []
+    for _, _, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+        mots = detail.split()
+        if mots[:1] == ["SCAN"] and len(mots) > 1 and mots[1] in alias and "INDEX" not in detail:
+            fautes.append(detail)
+    return fautes
+
+
+def main():
+    chemin = sys.argv[1] if len(sys.argv) > 1 else BASE
+    with tempfile.TemporaryDirectory() as dossier:
+        conn = sqlite3.connect(os.path.join(dossier, "plans.db"))
+        copier_base(chemin, conn)
+        appliquer_migrations(conn)
+
+        requetes = list(requetes_listes()) + list(requetes_ponctuelles())
+        echecs = 0
+        for nom, sql, params, alias in requetes:
+            fautes = scans_complets(conn, sql, params, alias)
+            print(f"{'❌' if fautes else '✅'} {nom}")
+            for faute in fautes:
+                print(f"      {faute}")
+            echecs += bool(fautes)
+        conn.close()
+
+    print(f"{len(requetes) - echecs}/{len(requetes)} requêtes sans parcours complet.")
+    return 1 if echecs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
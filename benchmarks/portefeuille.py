@@ -0,0 +1,390 @@
+# benchmarks/portefeuille.py
+# ==========================================
+# 🏭 Générateur de portefeuille synthétique
+#
+# Copie la base (schéma réel + référentiels : programmes, profils,
+# phases, complexités, valeurs métier...) puis la remplit avec :
+#   - N projets (Projet + miroir dans l'ancienne table projets lue par
+#     la CAF requise), leurs phases datées, réponses de complexité et
+#     de valeur métier ;
+#   - M collaborateurs et leurs répartitions secondaires ;
+#   - K règles de complexité (estimations et priorités recalculées) ;
+#   - la CAF requise matérialisée correspondante.
+# Peut aussi écrire les fichiers Excel correspondants pour les routes
+# d'import (projets, projets IT, collaborateurs).
+#
+# Usage : python benchmarks/portefeuille.py sortie.db [--projets N] [--collaborateurs M]
+#         [--regles K] [--excel DOSSIER] [--seed S] ...
+# ==========================================
+import argparse
+import math
+import os
+import random
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import utils.db_utils as db_utils  # noqa: E402
+from services.caf_requise_semaine import reconstruire as reconstruire_caf_requise  # noqa: E402
+from services.priorites import SQL_RECLASSEMENT  # noqa: E402
+from services.reestimation import SQL_REESTIMATION, _arrondi_py  # noqa: E402
+
+BASE = os.path.join(os.path.dirname(__file__), "..", "database", "projets.db")
+
+MOTS = [
+    "migration", "refonte", "digital", "paiement", "crédit", "conformité", "reporting",
+    "mobile", "agence", "sécurité", "données", "cloud", "monétique", "risque", "client",
+    "workflow", "archivage", "supervision", "réseau", "portail", "œuvre", "trésorerie",
+]
+NOMS = ["BEN ALI", "TRABELSI", "GHARBI", "JEBALI", "SASSI", "MEJRI", "HAMMAMI", "BOUAZIZI",
+        "KHELIFI", "DRIDI", "CHAABANE", "MANSOURI", "AYARI", "ZOUARI", "BEN SALAH"]
+PRENOMS = ["Mohamed", "Sana", "Karim", "Amel", "Youssef", "Ines", "Walid", "Rim", "Hatem",
+           "Nour", "Sami", "Leila", "Aziz", "Meriem", "Fares"]
+# Matricules numériques (seul format accepté par l'import) hors des plages réelles
+MATRICULE_BASE = 9_000_000
+MATRICULE_IMPORT = 9_500_000
+STATUTS_CAF = ["En attente", "À planifier", "En cours", "Terminé"]
+
+# Répartition par défaut (surchargée en ligne de commande)
+DISTRIBUTION = {
+    "part_it": 0.3,             # projets de type 'it'
+    "part_retenus": 0.6,        # retenue = 1 (sinon 2, ou NULL pour part_sans_decision)
+    "part_sans_decision": 0.1,
+    "taux_reponses": 0.9,       # probabilité de répondre à chaque critère
+    "jh_median": 120,           # charge d'un projet (loi log-normale)
+    "jh_sigma": 0.8,
+    "repartitions_max": 2,      # profils secondaires par collaborateur (0..max)
+    "annee": date.today().year,
+}
+
+
+# ============================================================
+# 🔧 Utilitaires
+# ============================================================
+def copier_base(source, destination):
+    """Copie cohérente (WAL compris) via l'API de sauvegarde SQLite."""
+    if os.path.exists(destination):
+        os.remove(destination)
+    src = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    dst = sqlite3.connect(destination)
+    src.backup(dst)
+    dst.close()
+    src.close()
+
+
+def _ids(conn, sql):
+    return [r[0] for r in conn.execute(sql)]
+
+
+def _par_libelle(conn, table):
+    """{ libelle : [ids] } des options d'un critère."""
+    options = {}
+    for id_, libelle in conn.execute(f"SELECT id, libelle FROM {table} WHERE libelle IS NOT NULL ORDER BY id"):
+        options.setdefault(libelle, []).append(id_)
+    return options
+
+
+def _titre(rnd, i):
+    return f"{rnd.choice(MOTS).capitalize()} {rnd.choice(MOTS)} {rnd.choice(MOTS)} #{i}"
+
+
+# ============================================================
+# 🧮 Règles de complexité
+# ============================================================
+def generer_regles(conn, nb_regles):
+    """Remplace les règles par K tranches contiguës (Fibonacci) couvrant tous les scores."""
+    fibo = [1, 2]
+    while len(fibo) < nb_regles + 1:
+        fibo.append(fibo[-1] + fibo[-2])
+    conn.execute("DELETE FROM regle_complexite")
+    conn.executemany("""
+        INSERT INTO regle_complexite (fibo, score_min, score_max, valeur_base, idate, iuser)
+        VALUES (?, ?, ?, ?, DATETIME('now'), 1)
+    """, [
+        (fibo[k], float(fibo[k]), fibo[k + 1] - 0.01, float(50 * fibo[k]))
+        for k in range(nb_regles)
+    ])
+    return fibo[0], fibo[nb_regles]
+
+
+# ============================================================
+# 📁 Projets
+# ============================================================
+def generer_projets(conn, rnd, nb_projets, distribution, score_max):
+    """Insère Projet, projets (miroir CAF), projet_phases et réponses aux critères."""
+    programmes = _ids(conn, "SELECT id FROM Programme")
+    domaines = _ids(conn, "SELECT id FROM domaines")
+    categories = _ids(conn, "SELECT id FROM categorie")
+    statuts = _ids(conn, "SELECT id FROM Statut")
+    statuts_demande = _ids(conn, "SELECT id FROM Statut_demande")
+    phases_programme = {}
+    for programme_id, phase_id, poids in conn.execute(
+        "SELECT programme_id, phase_id, poids FROM programme_phase ORDER BY phase_id"
+    ):
+        phases_programme.setdefault(programme_id, []).append((phase_id, poids or 1))
+    phases_defaut = [(pid, 1.0) for pid in _ids(conn, "SELECT id FROM Phase ORDER BY id")[:4]]
+    complexites = _par_libelle(conn, "complexite")
+    valeurs = _par_libelle(conn, "valeur_metier")
+
+    # Identifiants libres dans Projet et dans l'ancienne table (ids texte, parfois numériques)
+    premier_id = conn.execute("""
+        SELECT MAX((SELECT COALESCE(MAX(id), 0) FROM Projet),
+                   (SELECT COALESCE(MAX(CAST(id AS INTEGER)), 0) FROM projets WHERE id GLOB '[0-9]*'))
+    """).fetchone()[0] + 1
+    origine = date(distribution["annee"] - 1, 1, 1)
+    projets, miroirs, phases, reponses_c, reponses_v = [], [], [], [], []
+
+    for k in range(nb_projets):
+        pid = premier_id + k
+        tirage = rnd.random()
+        if tirage < distribution["part_sans_decision"]:
+            retenue = None
+        elif tirage < distribution["part_sans_decision"] + distribution["part_retenus"]:
+            retenue = 1
+        else:
+            retenue = 2
+        jh = max(5.0, round(distribution["jh_median"] * math.exp(rnd.gauss(0, distribution["jh_sigma"]))))
+        debut = origine + timedelta(days=rnd.randint(0, 730))
+        duree = max(14, int(jh * rnd.uniform(1.0, 2.5)))
+        mep = debut + timedelta(days=duree)
+        id_programme = rnd.choice(programmes) if programmes and rnd.random() > 0.05 else None
+        titre = _titre(rnd, pid)
+        score_wsjf = round(rnd.uniform(1, 100), 2)
+        projets.append((
+            pid, 10_000 + pid, titre, f"Projet synthétique {pid}", id_programme,
+            round(rnd.uniform(1, score_max - 0.01), 2), mep.isoformat(), retenue,
+            rnd.choice(domaines) if domaines and rnd.random() > 0.05 else None,
+            rnd.choice(categories) if categories else None,
+            rnd.choice(statuts) if statuts else None,
+            rnd.choice(statuts_demande) if statuts_demande else None,
+            "it" if rnd.random() < distribution["part_it"] else None,
+            score_wsjf,
+        ))
+        miroirs.append((str(pid), titre, rnd.choice(STATUTS_CAF), jh, score_wsjf, id_programme))
+
+        # Phases datées au prorata de leur poids, de `debut` à la MEP
+        etapes = phases_programme.get(id_programme) or phases_defaut
+        total = sum(p for _, p in etapes) or 1
+        curseur = debut
+        for phase_id, poids in etapes:
+            fin = curseur + timedelta(days=max(1, round(duree * poids / total)))
+            phases.append((pid, phase_id, curseur.isoformat(), fin.isoformat()))
+            curseur = fin
+
+        for options in complexites.values():
+            if rnd.random() < distribution["taux_reponses"]:
+                reponses_c.append((pid, rnd.choice(options)))
+        for options in valeurs.values():
+            if rnd.random() < distribution["taux_reponses"]:
+                reponses_v.append((pid, rnd.choice(options)))
+
+    conn.executemany("""
+        INSERT INTO Projet (id, ref_opg, titre_projet, description, id_programme, score_complexite,
+                            date_mep, retenue, id_domaine, id_categorie, id_statut,
+                            id_statut_demande, type, score_wsjf, idate, iuser)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, DATETIME('now'), 1)
+    """, projets)
+    conn.executemany("""
+        INSERT INTO projets (id, titre, statut, duree_estimee_jh, score_wsjf, programme_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, miroirs)
+    conn.executemany("""
+        INSERT OR IGNORE INTO projet_phases (projet_id, phase_id, date_debut, date_fin)
+        VALUES (?, ?, ?, ?)
+    """, phases)
+    conn.executemany("""
+        INSERT INTO complexite_projet (id_projet, id_complexite, idate, iuser)
+        VALUES (?, ?, DATETIME('now'), 1)
+    """, reponses_c)
+    conn.executemany("""
+        INSERT INTO valeur_metier_projet (id_projet, id_valeur_metier, idate, iuser)
+        VALUES (?, ?, DATETIME('now'), 1)
+    """, reponses_v)
+    return projets
+
+
+# ============================================================
+# 👥 Collaborateurs
+# ============================================================
+def generer_collaborateurs(conn, rnd, nb_collaborateurs, distribution):
+    """Insère les collaborateurs (CAF selon heures_base du profil) et leurs répartitions."""
+    profils = conn.execute("SELECT id, COALESCE(heures_base, 220) FROM profils").fetchall()
+    affectations = _ids(conn, "SELECT id FROM affectation")
+    sous_domaines = _ids(conn, "SELECT id FROM sous_domaine_collaborateur")
+    # Quelques profils très représentés, les autres rares
+    poids = [1 / (rang + 1) for rang in range(len(profils))]
+
+    collaborateurs, repartitions = [], []
+    for k in range(nb_collaborateurs):
+        matricule = str(MATRICULE_BASE + k)
+        profil_id, heures = rnd.choices(profils, weights=poids)[0]
+        build = rnd.choice([100, 80, 70, 50])
+        collaborateurs.append((
+            matricule, rnd.choice(NOMS), rnd.choice(PRENOMS), profil_id,
+            rnd.choice(affectations) if affectations else None,
+            heures, build, 100 - build, build, 100 - build,
+            round(heures * build / 100, 2), round(heures * (100 - build) / 100, 2),
+            rnd.choice(sous_domaines) if sous_domaines else None,
+        ))
+        secondaires = rnd.sample(profils, min(len(profils), rnd.randint(0, distribution["repartitions_max"])))
+        for profil_sec, heures_sec in secondaires:
+            part = rnd.choice([20, 30, 50])
+            repartitions.append((
+                matricule, profil_sec, part, 0, round(heures_sec * part / 100, 2), 0,
+            ))
+
+    conn.executemany("""
+        INSERT INTO collaborateurs (matricule, nom, prenom, profil_id, affectation_id, heures_base,
+                                    pourcentage_build, pourcentage_run, build_ratio, run_ratio,
+                                    caf_disponible_build, caf_disponible_run, sous_domaine_id,
+                                    idate, iuser)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, DATETIME('now'), 'generateur')
+    """, collaborateurs)
+    conn.executemany("""
+        INSERT INTO collaborateur_repartition (collaborateur_id, profil_id, pourcentage_build,
+                                               pourcentage_run, caf_disponible_build, caf_disponible_run)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, repartitions)
+    return collaborateurs
+
+
+# ============================================================
+# 📊 Fichiers Excel pour les routes d'import
+# ============================================================
+def ecrire_excel(conn, rnd, dossier, nb_projets, nb_collaborateurs):
+    """Écrit projets.xlsx, projets_it.xlsx et collaborateurs.xlsx (mêmes formats que les imports)."""
+    from openpyxl import Workbook
+
+    os.makedirs(dossier, exist_ok=True)
+    domaines = _ids(conn, "SELECT nom FROM domaines")
+    valeurs = {}
+    for libelle, type_libelle, valeur in conn.execute(
+        "SELECT libelle, type_libelle, valeur_libelle FROM valeur_metier WHERE libelle IS NOT NULL"
+    ):
+        valeurs.setdefault(libelle, []).append((type_libelle, valeur))
+    entete = ["Ref OGP", "Nomencalture du projet", "Description du projet",
+              "Date de MEP prévue", "Nom du département"]
+
+    def classeur(chemin, colonnes_en_plus, lignes_bloc):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(entete + colonnes_en_plus)
+        for i in range(nb_projets):
+            for ligne in lignes_bloc(i):
+                ws.append(ligne)
+        wb.save(chemin)
+
+    def meta(i):
+        mep = date(DISTRIBUTION["annee"], 1, 1) + timedelta(days=rnd.randint(0, 700))
+        return [f"OGP-{i + 1:06d}", _titre(rnd, i + 1), f"Import synthétique {i + 1}",
+                mep.isoformat(), rnd.choice(domaines) if domaines else None]
+
+    # 1 projet = 3 lignes (ligne 1 : méta ; lignes 2-3 : compléments)
+    classeur(os.path.join(dossier, "projets.xlsx"), [],
+             lambda i: [meta(i), [None] * len(entete), [None] * len(entete)])
+
+    libelles = list(valeurs)
+
+    def bloc_it(i):
+        choix = [rnd.choice(valeurs[lib]) for lib in libelles]
+        return [
+            meta(i) + [c[0] for c in choix],           # type_libelle
+            [None] * (len(entete) + len(libelles)),
+            [None] * len(entete) + [c[1] for c in choix],  # valeur_libelle
+        ]
+    classeur(os.path.join(dossier, "projets_it.xlsx"), libelles, bloc_it)
+
+    profils = _ids(conn, "SELECT nom FROM profils")
+    affectations = _ids(conn, "SELECT nom FROM affectation")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Collaborateurs")
+    ws.append(["Matricule", "Nom", "Prenom", "Profil", "Affectation",
+               "Heures_Base", "Pourcentage_Build", "Pourcentage_Run"])
+    for k in range(nb_collaborateurs):
+        build = rnd.choice([100, 80, 70, 50])
+        ws.append([str(MATRICULE_IMPORT + k), rnd.choice(NOMS), rnd.choice(PRENOMS), rnd.choice(profils),
+                   rnd.choice(affectations), 220, build, 100 - build])
+    wb.save(os.path.join(dossier, "collaborateurs.xlsx"))
+
+
+# ============================================================
+# 🏭 Génération complète
+# ============================================================
+def generer(destination, nb_projets=1000, nb_collaborateurs=300, nb_regles=9, seed=42,
+            distribution=None, excel=None, source=BASE):
+    """
+    Crée `destination` (copie de `source`) remplie du portefeuille synthétique.
+    Retourne le nombre de lignes par table générée.
+    """
+    distribution = {**DISTRIBUTION, **(distribution or {})}
+    rnd = random.Random(seed)
+    copier_base(source, destination)
+
+    # Schéma à jour (triggers FTS / versions, index) avant le remplissage
+    ancien_chemin = db_utils.DB_PATH
+    db_utils.DB_PATH = destination
+    try:
+        db_utils.init_db(force=True)
+    finally:
+        db_utils.DB_PATH = ancien_chemin
+
+    conn = sqlite3.connect(destination)
+    conn.create_function("arrondi_py", 1, _arrondi_py, deterministic=True)
+    try:
+        _, score_max = generer_regles(conn, nb_regles)
+        generer_projets(conn, rnd, nb_projets, distribution, score_max)
+        generer_collaborateurs(conn, rnd, nb_collaborateurs, distribution)
+        conn.execute(SQL_REESTIMATION.format(filtre="1")).fetchall()
+        conn.execute(SQL_RECLASSEMENT)
+        conn.row_factory = sqlite3.Row
+        reconstruire_caf_requise(conn)  # la migration l'a remplie avant la génération (base vide)
+        conn.row_factory = None
+        conn.commit()
+        if excel:
+            ecrire_excel(conn, rnd, excel, nb_projets, nb_collaborateurs)
+        conn.execute("PRAGMA optimize")
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("Projet", "projets", "projet_phases", "complexite_projet",
+                          "valeur_metier_projet", "collaborateurs", "collaborateur_repartition",
+                          "regle_complexite")
+        }
+    finally:
+        conn.close()
+
+
+def arguments(parser):
+    """Options de génération (partagées avec bench_endpoints)."""
+    parser.add_argument("--projets", type=int, default=1000)
+    parser.add_argument("--collaborateurs", type=int, default=300)
+    parser.add_argument("--regles", type=int, default=9)
+    parser.add_argument("--seed", type=int, default=42)
+    for cle, defaut in DISTRIBUTION.items():
+        parser.add_argument(f"--{cle.replace('_', '-')}", dest=cle, type=type(defaut), default=defaut)
+    return parser
+
+
+def distribution_depuis(options):
+    return {cle: getattr(options, cle) for cle in DISTRIBUTION}
+
+
+def main():
+    parser = arguments(argparse.ArgumentParser(description="Génère un portefeuille synthétique."))
+    parser.add_argument("sortie", help="base SQLite à créer")
+    parser.add_argument("--excel", help="dossier où écrire les fichiers d'import")
+    parser.add_argument("--source", default=BASE, help="base dont on copie schéma et référentiels")
+    options = parser.parse_args()
+
+    comptes = generer(
+        options.sortie, options.projets, options.collaborateurs, options.regles, options.seed,
+        distribution_depuis(options), excel=options.excel, source=options.source,
+    )
+    for table, nb in comptes.items():
+        print(f"{table:28s} {nb:8d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,7 @@ import os
 from datetime import date
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, send_file
 from utils.db_utils import query_db, execute_db
-import pandas as pd
+from utils.referentiel import referentiels
 import io
 
 accompagnement_bp = Blueprint("accompagnement", __name__, url_prefix="/accompagnement")
@@ -54,8 +54,7 @@ def liste_accompagnement():
         LIMIT ? OFFSET ?
     """, args + [per_page, offset])
 
-    profils = query_db("SELECT id, nom FROM profils ORDER BY nom")
-    sous_domaines = query_db("SELECT id, nom FROM sous_domaine_collaborateur ORDER BY nom")
+    profils, sous_domaines = referentiels("profils", "sous_domaines")
 
     return render_template(
         "accompagnement_list.html",
@@ -173,6 +172,7 @@ def supprimer_accompagnement(id):
 # ==============================================
 @accompagnement_bp.route("/telecharger-modele")
 def telecharger_modele():
+    import pandas as pd
     try:
         output = io.BytesIO()
         data = {
@@ -205,6 +205,7 @@ def telecharger_modele():
 # ==============================================
 @accompagnement_bp.route("/importer-excel", methods=["POST"])
 def importer_excel():
+    import pandas as pd
     try:
         file = request.files.get("file")
         if not file:
@@ -9,7 +9,6 @@ from flask import (
     current_app,
     jsonify,
 )
-from utils.ldap_utils import ldap_authenticate
 from utils.auth_utils import login_required, make_login_response, make_logout_response
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
 import os
@@ -52,6 +51,8 @@ def login():
         # ==============================
         if auth_mode == "AD":
             try:
+                # ldap3 chargé seulement en mode AD (démarrage plus rapide en LOCAL)
+                from utils.ldap_utils import ldap_authenticate
                 user_info = ldap_authenticate(username, password)
             except Exception as e:
                 current_app.logger.warning(f"⚠️ LDAP indisponible : {e}")
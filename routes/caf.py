@@ -1,16 +1,25 @@
 # routes/caf.py
 
-from datetime import date, timedelta
-import calendar
+from datetime import date
 from flask import Blueprint, send_file, request, render_template, flash, redirect, url_for, jsonify
 from io import BytesIO
-import pandas as pd
+import numpy as np
 from datetime import datetime
+from utils.cache_vues import resultat, vue_cachee
+from utils.calendrier import MOIS_FR, calendrier
 from utils.db_utils import query_db
-import calendar
+from utils.pagination import paginer
+from utils.search_utils import filtre_fts
+from services.repartitions import charger_repartitions
+from services.caf_requise_semaine import matrice_annee
 
 caf_bp = Blueprint('caf', __name__, url_prefix='/caf')
 
+# Tables lues par les vues CAF (leurs versions invalident le cache des vues)
+TABLES_CAF_DISPONIBLE = ("collaborateurs", "collaborateur_repartition", "profils")
+TABLES_CAF_REQUISE = ("profils", "caf_requise_semaine")
+TABLES_CAF = TABLES_CAF_DISPONIBLE + ("caf_requise_semaine",)
+
 
 # ============================================================
 # 🧮 UTILITAIRE : Récupère l'année courante ou celle du paramètre
@@ -27,33 +36,23 @@ def get_annee():
 # 🔹 CAF AUTOMATIQUE (total dynamique selon mois sélectionné)
 # ============================================================
 @caf_bp.route("/automatique")
+@vue_cachee(TABLES_CAF_DISPONIBLE, cle=lambda: (get_annee(), request.args.get("mois", "all")))
 def caf_automatique():
     annee = get_annee()
-
-    # 📅 Liste des mois (français)
-    mois_labels = [
-        "Janvier", "Février", "Mars", "Avril", "Mai", "Juin",
-        "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre"
-    ]
     mois_filtre = request.args.get("mois", "all")
+    contexte = resultat("caf_automatique", (annee, mois_filtre), TABLES_CAF_DISPONIBLE,
+                        lambda: _calcul_caf_automatique(annee, mois_filtre))
+    return render_template("caf_automatique.html", **contexte)
 
-    # 🔹 Premier lundi de l’année
-    start = date(annee, 1, 1)
-    while start.weekday() != 0:
-        start += timedelta(days=1)
-
-    # 🔹 Nombre de semaines
-    num_weeks = 53 if date(annee, 12, 31).isocalendar()[1] == 53 else 52
-    week_labels = [f"S{i}" for i in range(1, num_weeks + 1)]
 
-    # 🔹 Mapping semaine ↔ mois
-    semaine_to_mois = {}
-    mois_to_semaines = {m: [] for m in mois_labels}
-    for i, semaine in enumerate(week_labels, start=1):
-        debut_semaine = start + timedelta(weeks=i - 1)
-        mois_nom = mois_labels[debut_semaine.month - 1]
-        semaine_to_mois[semaine] = mois_nom
-        mois_to_semaines[mois_nom].append(semaine)
+def _calcul_caf_automatique(annee, mois_filtre):
+    # 📅 Semaines de l'année et correspondance semaine ↔ mois
+    cal = calendrier(annee)
+    mois_labels = list(MOIS_FR)
+    num_weeks = cal.nb_semaines
+    week_labels = list(cal.libelles)
+    semaine_to_mois = cal.semaine_to_mois()
+    mois_to_semaines = cal.mois_to_semaines()
 
     # 🔹 Semaines à afficher
     if mois_filtre != "all" and mois_filtre in mois_to_semaines:
@@ -129,10 +128,9 @@ def caf_automatique():
     data.append(total_row)
 
     # ======================================================
-    # 🔹 Rendu final
+    # 🔹 Contexte du rendu
     # ======================================================
-    return render_template(
-        "caf_automatique.html",
+    return dict(
         week_labels=week_labels,
         semaines_affichees=semaines_affichees,
         semaine_to_mois=semaine_to_mois,
@@ -146,81 +144,33 @@ def caf_automatique():
 # 🔹 CAF REQUISE
 # ============================================================
 @caf_bp.route('/caf-requise')
+@vue_cachee(TABLES_CAF_REQUISE, cle=lambda: (get_annee(),))
 def caf_requise():
     annee = get_annee()
+    contexte = resultat("caf_requise", (annee,), TABLES_CAF_REQUISE, lambda: _calcul_caf_requise(annee))
+    return render_template('caf_requise.html', **contexte)
 
-    num_weeks = 53 if date(annee, 12, 31).isocalendar()[1] == 53 else 52
-    week_labels = [f"S{i}" for i in range(1, num_weeks + 1)]
 
-    # 🔹 Premier lundi de l’année
-    start = date(annee, 1, 1)
-    while start.weekday() != 0:
-        start += timedelta(days=1)
-
-    # 🔹 Récupération des projets et profils
-    projets = query_db("""
-        SELECT 
-            p.id, p.titre, p.duree_estimee_jh,
-            pp.date_debut, pp.date_fin,
-            pph.profil_id, pph.pourcentage
-        FROM projets p
-        JOIN projet_phases pp ON p.id = pp.projet_id
-        JOIN phase_profils_programme pph ON pp.phase_id = pph.phase_id
-        WHERE p.statut IN ('En attente', 'À planifier', 'En cours')
-    """)
+def _calcul_caf_requise(annee):
+    week_labels = list(calendrier(annee).libelles)
 
+    # 🔹 Lecture de la CAF requise matérialisée (profil × semaine)
     profils = query_db("SELECT id, nom FROM profils")
-    profil_dict = {p['id']: p['nom'] for p in profils}
-
-    # Initialisation charge
-    charge_semaine = {f"S{i}": {p['id']: 0 for p in profils} for i in range(1, num_weeks + 1)}
-    for i in range(1, num_weeks + 1):
-        charge_semaine[f"S{i}"]['Autre'] = 0
-
-    for projet in projets:
-        try:
-            debut = datetime.strptime(projet['date_debut'], "%Y-%m-%d").date()
-            fin = datetime.strptime(projet['date_fin'], "%Y-%m-%d").date()
-            charge = projet['duree_estimee_jh'] or 0
-            pourcentage = projet['pourcentage'] or 100
-            profil_id = projet['profil_id']
-            charge_projet = charge * (pourcentage / 100)
-        except Exception as e:
-            print(f"⚠️ Erreur parsing projet {projet.get('id')} : {e}")
-            continue
-
-        for i in range(1, num_weeks + 1):
-            debut_semaine = start + timedelta(weeks=i - 1)
-            fin_semaine = debut_semaine + timedelta(days=6)
-            key = f"S{i}"
-
-            if debut <= fin_semaine and fin >= debut_semaine:
-                overlap = min(fin, fin_semaine) - max(debut, debut_semaine)
-                jours = overlap.days + 1
-                total_jours = (fin - debut).days + 1
-                if total_jours > 0:
-                    charge_semaine_projet = (charge_projet * jours) / total_jours
-
-                    if profil_id in charge_semaine[key]:
-                        charge_semaine[key][profil_id] += charge_semaine_projet
-                    else:
-                        charge_semaine[key]['Autre'] += charge_semaine_projet
-                        print(f"⚠️ Profil {profil_id} inexistant → charge transférée dans 'Autre'")
+    matrice, autre = matrice_annee(annee, [p['id'] for p in profils])
 
     data = []
-    for profil in profils:
+    for profil, charges in zip(profils, matrice.tolist()):
         row = {'profil': profil['nom']}
-        for s in week_labels:
-            row[s] = charge_semaine[s][profil['id']]
+        row.update(zip(week_labels, charges))
         data.append(row)
 
-    if any(charge_semaine[s]['Autre'] > 0 for s in week_labels):
+    if (autre > 0).any():
+        print("⚠️ Charge rattachée à des profils inexistants → transférée dans 'Autre'")
         row_autre = {'profil': '🌀 Autre (profils supprimés)'}
-        for s in week_labels:
-            row_autre[s] = charge_semaine[s]['Autre']
+        row_autre.update(zip(week_labels, autre.tolist()))
         data.append(row_autre)
 
-    return render_template('caf_requise.html', week_labels=week_labels, data=data, annee=annee)
+    return dict(week_labels=week_labels, data=data, annee=annee)
 
 
 @caf_bp.route('/caf-disponibles')
@@ -230,15 +180,21 @@ def caf_disponibles():
     # 🔍 Recherche
     search = request.args.get("search", "").strip()
 
-    # 📄 Pagination
+    # 📄 Pagination (sur les collaborateurs, pas sur les lignes de répartition)
     page = request.args.get("page", 1, type=int)
     per_page = 10
-    offset = (page - 1) * per_page
+
+    # 🔍 Recherche plein texte (nom, prénom, profil, affectation)
+    jointure_fts, rang, params = filtre_fts(
+        "collaborateur_fts", "c.rowid", search, colonnes=("nom", "prenom", "profil", "affectation")
+    )
 
     # 🔹 Base query
-    base_query = """
+    base_query = f"""
         SELECT 
             c.matricule,
+            c.nom,
+            c.prenom,
             c.nom || ' ' || c.prenom AS nom_prenom,
             p.nom AS profil,
             a.nom AS affectation,
@@ -246,81 +202,56 @@ def caf_disponibles():
             c.run_ratio,
             c.caf_disponible_build,
             c.caf_disponible_run,
-            pp.nom AS profil_repartition,
-            cr.pourcentage_build,
-            cr.pourcentage_run,
-            cr.caf_disponible_build AS caf_repartition_build,
-            cr.caf_disponible_run AS caf_repartition_run
+            {rang} AS rang
         FROM collaborateurs c
+        {jointure_fts}
         JOIN profils p ON c.profil_id = p.id
         JOIN affectation a ON c.affectation_id = a.id
-        LEFT JOIN collaborateur_repartition cr ON cr.collaborateur_id = c.matricule
-        LEFT JOIN profils pp ON pp.id = cr.profil_id
     """
 
-    params = []
-    if search:
-        base_query += """
-        WHERE 
-            c.nom LIKE ? OR 
-            c.prenom LIKE ? OR 
-            p.nom LIKE ? OR 
-            a.nom LIKE ?
-        """
-        like = f"%{search}%"
-        params.extend([like, like, like, like])
-
-    # 🔹 Total pour pagination
-    total_query = "SELECT COUNT(DISTINCT c.matricule) AS cnt FROM collaborateurs c JOIN profils p ON c.profil_id=p.id JOIN affectation a ON c.affectation_id=a.id"
-    if search:
-        total_query += " WHERE c.nom LIKE ? OR c.prenom LIKE ? OR p.nom LIKE ? OR a.nom LIKE ?"
-        total_row = query_db(total_query, [like, like, like, like], one=True)
-    else:
-        total_row = query_db(total_query, one=True)
-
-    total = total_row["cnt"]
-    total_pages = (total + per_page - 1) // per_page
-
-    # 🔹 Ajout du tri et pagination
-    base_query += """
-        ORDER BY c.nom, c.prenom
-        LIMIT ? OFFSET ?
-    """
-    params.extend([per_page, offset])
+    tri = [("nom", "ASC"), ("prenom", "ASC"), ("matricule", "ASC")]
+    if jointure_fts:
+        tri.insert(0, ("rang", "ASC"))
+    pagination = paginer(
+        base_query, params,
+        tri=tri,
+        page=page, per_page=per_page, apres=request.args.get("apres"),
+        tables=("collaborateurs", "profils", "affectation")
+    )
 
-    collaborateurs = query_db(base_query, params)
+    # 🔹 Répartitions de la page en une seule requête
+    repartitions = charger_repartitions(row["matricule"] for row in pagination.items)
 
-    # 🔹 Regrouper par collaborateur
     data = {}
-    for row in collaborateurs:
+    for row in pagination.items:
         m = row["matricule"]
-        if m not in data:
-            data[m] = {
-                "matricule": m,
-                "nom_prenom": row["nom_prenom"],
-                "profil": row["profil"],
-                "affectation": row["affectation"],
-                "build_ratio": row["build_ratio"],
-                "run_ratio": row["run_ratio"],
-                "caf_disponible_build": row["caf_disponible_build"],
-"caf_disponible_run": row["caf_disponible_run"],
-                "repartitions": []
-            }
-
-        if row["profil_repartition"]:
-            data[m]["repartitions"].append({
-                "profil": row["profil_repartition"],
-                "pct_build": row["pourcentage_build"] or 0,
-                "pct_run": row["pourcentage_run"] or 0,
-                "jh_build": row["caf_repartition_build"] or 0,
-                "jh_run": row["caf_repartition_run"] or 0
-            })
+        data[m] = {
+            "matricule": m,
+            "nom_prenom": row["nom_prenom"],
+            "profil": row["profil"],
+            "affectation": row["affectation"],
+            "build_ratio": row["build_ratio"],
+            "run_ratio": row["run_ratio"],
+            "caf_disponible_build": row["caf_disponible_build"],
+            "caf_disponible_run": row["caf_disponible_run"],
+            "repartitions": [
+                {
+                    "profil": r["profil_nom"],
+                    "pct_build": r["pourcentage_build"] or 0,
+                    "pct_run": r["pourcentage_run"] or 0,
+                    "jh_build": r["caf_disponible_build"] or 0,
+                    "jh_run": r["caf_disponible_run"] or 0
+                }
+                for r in repartitions.get(m, []) if r["profil_nom"]
+            ]
+        }
 
     return render_template(
         "caf_disponibles.html",
         collaborateurs=list(data.values()),
         page=page,
-        total_pages=total_pages,
+        total_pages=pagination.total_pages,
+        next_cursor=pagination.next_cursor,
         search=search,
         annee=annee
     )
@@ -329,6 +260,7 @@ def caf_disponibles():
 
 @caf_bp.route('/export-excel')
 def export_excel():
+    import pandas as pd
     try:
         # 🔹 Requête : total CAF par profil
         data = query_db("""
@@ -351,6 +283,16 @@ def export_excel():
         df = pd.DataFrame(data)
         df.columns = ["Profil", "Nb collaborateurs", "CAF Build", "CAF Run"]
 
+        # 🔹 CAF requise profil × semaine (même table que /caf/caf-requise)
+        annee = get_annee()
+        profils = query_db("SELECT id, nom FROM profils ORDER BY nom")
+        matrice, _ = matrice_annee(annee, [p["id"] for p in profils])
+        df_requise = pd.DataFrame(
+            matrice.round(2),
+            columns=[f"S{i}" for i in range(1, matrice.shape[1] + 1)]
+        )
+        df_requise.insert(0, "Profil", [p["nom"] for p in profils])
+
         # 🔹 Création du fichier Excel en mémoire
         output = BytesIO()
         with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
@@ -399,6 +341,16 @@ def export_excel():
             worksheet.autofilter(0, 0, len(df), len(df.columns) - 1)
             worksheet.freeze_panes(1, 0)
 
+            # ---------- Feuille CAF requise ----------
+            sheet_requise = f'CAF Requise {annee}'
+            df_requise.to_excel(writer, index=False, sheet_name=sheet_requise)
+            ws_requise = writer.sheets[sheet_requise]
+            ws_requise.set_column(0, 0, 35, cell_fmt)
+            ws_requise.set_column(1, len(df_requise.columns) - 1, 9, num_fmt)
+            for col_num, value in enumerate(df_requise.columns):
+                ws_requise.write(0, col_num, str(value), header_fmt)
+            ws_requise.freeze_panes(1, 1)
+
         output.seek(0)
         file_name = f"CAF_Disponible_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
@@ -414,176 +366,93 @@ def export_excel():
         flash(f"Erreur export CAF : {e}", "error")
         return redirect(url_for('caf.caf_disponible'))
 @caf_bp.route('/dashboard')
+@vue_cachee(TABLES_CAF, cle=lambda: (get_annee(),))
 def caf_dashboard():
-    annee = get_annee()
+    # Page légère : graphique et tableaux construits côté client depuis l'API
+    return render_template("caf_dashboard.html", annee=get_annee())
 
-    # ===============================
-    # 📅 Préparation des semaines et mois
-    # ===============================
-    start = date(annee, 1, 1)
-    while start.weekday() != 0:
-        start += timedelta(days=1)
 
-    num_weeks = 53 if date(annee, 12, 31).isocalendar()[1] == 53 else 52
-    week_labels = [f"S{i}" for i in range(1, num_weeks + 1)]
-    mois_labels = [calendar.month_name[i] for i in range(1, 13)]
+# ============================================================
+# 🔢 API : matrices CAF profil × semaine (tableaux denses)
+# ============================================================
+@caf_bp.route('/api/matrices')
+@vue_cachee(TABLES_CAF, cle=lambda: (get_annee(),))
+def caf_matrices():
+    annee = get_annee()
+    return jsonify(resultat("caf_matrices", (annee,), TABLES_CAF, lambda: _matrices_caf(annee)))
 
-    semaine_to_mois = {}
-    mois_to_semaines = {m: [] for m in mois_labels}
 
-    for i in range(1, num_weeks + 1):
-        debut_semaine = start + timedelta(weeks=i - 1)
-        mois = debut_semaine.strftime("%B")
-        semaine = f"S{i}"
-        semaine_to_mois[semaine] = mois
-        mois_to_semaines[mois].append(semaine)
+def _matrices_caf(annee):
+    """
+    CAF disponible et requise par profil et par semaine, plus la
+    correspondance semaine → mois et les jours ouvrés ; les totaux, vues mensuelles et par
+    mois sont dérivés côté client.
+    """
+    # ===============================
+    # 📅 Semaines et mois
+    # ===============================
+    cal = calendrier(annee)
+    num_weeks = cal.nb_semaines
 
     # ===============================
-    # 📘 Récupération des profils
+    # 📘 Profils
     # ===============================
     profils = query_db("SELECT id, nom FROM profils ORDER BY nom")
-    profil_dict = {p["id"]: p["nom"] for p in profils}
+    position = {p["id"]: i for i, p in enumerate(profils)}
 
     # ===============================
-    # ✅ CAF DISPONIBLE (profil principal + répartition)
+    # ✅ CAF DISPONIBLE (profil principal + répartitions), répartie à parts égales
     # ===============================
     collaborateurs = query_db("""
-        SELECT 
+        SELECT
             c.matricule,
-            p.id AS profil_id,
-            p.nom AS profil,
+            c.profil_id,
             c.caf_disponible_build,
-            c.caf_disponible_run,
-            pp.nom AS profil_repartition,
-            cr.pourcentage_build,
-            cr.pourcentage_run,
-            cr.caf_disponible_build AS caf_repartition_build,
-            cr.caf_disponible_run AS caf_repartition_run
+            c.caf_disponible_run
         FROM collaborateurs c
         JOIN profils p ON c.profil_id = p.id
-        LEFT JOIN collaborateur_repartition cr ON cr.collaborateur_id = c.matricule
-        LEFT JOIN profils pp ON pp.id = cr.profil_id
     """)
+    repartitions = charger_repartitions(c["matricule"] for c in collaborateurs)
 
-    # 🔸 Initialisation dictionnaire profil → liste des semaines
-    caf_dispo = {p["nom"]: [0] * num_weeks for p in profils}
-
+    dispo_annuelle = np.zeros(len(profils))
     for collab in collaborateurs:
-        # 🔹 Cas 1 : profil principal
-        profil_nom = collab["profil"]
         total_jh = (collab["caf_disponible_build"] or 0) + (collab["caf_disponible_run"] or 0)
-        jh_par_semaine = total_jh / num_weeks if num_weeks else 0
-        for i in range(num_weeks):
-            caf_dispo[profil_nom][i] += jh_par_semaine
-
-        # 🔹 Cas 2 : répartition secondaire (si existe)
-        if collab["profil_repartition"]:
-            profil_rep = collab["profil_repartition"]
-            pct_build = (collab["pourcentage_build"] or 0) / 100
-            pct_run = (collab["pourcentage_run"] or 0) / 100
-            jh_rep = ((collab["caf_repartition_build"] or 0) + (collab["caf_repartition_run"] or 0))
+        dispo_annuelle[position[collab["profil_id"]]] += total_jh
 
+        for rep in repartitions.get(collab["matricule"], []):
+            if not rep["profil_nom"]:
+                continue
+            jh_rep = (rep["caf_disponible_build"] or 0) + (rep["caf_disponible_run"] or 0)
             # Si les valeurs CAF ne sont pas renseignées, on les déduit du CAF principal × pourcentage
             if jh_rep == 0:
-                jh_rep = total_jh * (pct_build + pct_run)
-
-            jh_par_semaine_rep = jh_rep / num_weeks if num_weeks else 0
-            for i in range(num_weeks):
-                caf_dispo[profil_rep][i] += jh_par_semaine_rep
+                jh_rep = total_jh * ((rep["pourcentage_build"] or 0) + (rep["pourcentage_run"] or 0)) / 100
+            dispo_annuelle[position[rep["profil_id"]]] += jh_rep
 
-    # ===============================
-    # ⚙️ CAF REQUISE (par profil)
-    # ===============================
-    projets = query_db("""
-        SELECT 
-            p.id, p.duree_estimee_jh, pp.date_debut, pp.date_fin,
-            pph.profil_id, pph.pourcentage
-        FROM projets p
-        JOIN projet_phases pp ON p.id = pp.projet_id
-        JOIN phase_profils_programme pph ON pp.phase_id = pph.phase_id
-        WHERE p.statut IN ('En attente', 'À planifier', 'En cours')
-    """)
-
-    caf_requise = {p["nom"]: [0] * num_weeks for p in profils}
-
-    for projet in projets:
-        try:
-            debut = datetime.strptime(projet["date_debut"], "%Y-%m-%d").date()
-            fin = datetime.strptime(projet["date_fin"], "%Y-%m-%d").date()
-            charge = projet["duree_estimee_jh"] or 0
-            pourcentage = projet["pourcentage"] or 100
-            profil_nom = profil_dict.get(projet["profil_id"], "Autre")
-            charge_projet = charge * (pourcentage / 100)
-        except Exception as e:
-            print(f"⚠️ Erreur parsing projet {projet.get('id')} : {e}")
-            continue
-
-        for i in range(num_weeks):
-            debut_s = start + timedelta(weeks=i)
-            fin_s = debut_s + timedelta(days=6)
-            if debut <= fin_s and fin >= debut_s:
-                overlap = min(fin, fin_s) - max(debut, debut_s)
-                jours = overlap.days + 1
-                total = (fin - debut).days + 1
-                part = (charge_projet * jours / total) if total > 0 else 0
-                caf_requise.setdefault(profil_nom, [0] * num_weeks)[i] += round(part, 2)
-
-    # ===============================
-    # 📊 Totaux globaux
-    # ===============================
-    caf_dispo["TOTAL"] = [sum(caf_dispo[p][i] for p in caf_dispo if p != "TOTAL") for i in range(num_weeks)]
-    caf_requise["TOTAL"] = [sum(caf_requise[p][i] for p in caf_requise if p != "TOTAL") for i in range(num_weeks)]
+    disponible = np.repeat((dispo_annuelle / num_weeks)[:, None], num_weeks, axis=1)
 
     # ===============================
-    # 🗓️ CAF PAR MOIS ET SEMAINE
+    # ⚙️ CAF REQUISE (profils supprimés → ligne à part, comptée dans les totaux)
     # ===============================
-    caf_dispo_par_semaine = {}
-    caf_requise_par_semaine = {}
-
-    for profil in caf_dispo.keys():
-        caf_dispo_par_semaine[profil] = {}
-        caf_requise_par_semaine[profil] = {}
-        for i, s in enumerate(week_labels):
-            mois = semaine_to_mois[s]
-            caf_dispo_par_semaine[profil].setdefault(mois, {})[s] = caf_dispo[profil][i]
-            caf_requise_par_semaine[profil].setdefault(mois, {})[s] = caf_requise[profil][i]
-
-    # ===============================
-    # 📆 CAF MENSUELLE (somme par mois)
-    # ===============================
-    caf_dispo_mensuel = {}
-    caf_requise_mensuel = {}
-
-    for profil in profils:
-        p_nom = profil["nom"]
-        caf_dispo_mensuel[p_nom] = {m: 0 for m in mois_labels}
-        caf_requise_mensuel[p_nom] = {m: 0 for m in mois_labels}
-
-        for i, s in enumerate(week_labels):
-            mois = semaine_to_mois[s]
-            caf_dispo_mensuel[p_nom][mois] += caf_dispo[p_nom][i]
-            caf_requise_mensuel[p_nom][mois] += caf_requise[p_nom][i]
+    requise, autre = matrice_annee(annee, list(position), arrondi=True)
+    noms = [p["nom"] for p in profils]
+    if "Autre" in noms:
+        # Cumulée sur le profil « Autre » s'il existe
+        requise[noms.index("Autre")] += autre
+        autre = np.zeros_like(autre)
+
+    return {
+        "annee": annee,
+        "semaines": list(cal.libelles),
+        "mois": list(MOIS_FR),
+        "mois_semaine": cal.mois.tolist(),
+        "jours_ouvres": cal.jours_ouvres.tolist(),
+        "profils": noms,
+        "disponible": disponible.round(3).tolist(),
+        "requise": requise.round(3).tolist(),
+        "requise_hors_profils": autre.round(3).tolist(),
+    }
 
-    caf_dispo_mensuel["TOTAL"] = {m: sum(caf_dispo_mensuel[p["nom"]][m] for p in profils) for m in mois_labels}
-    caf_requise_mensuel["TOTAL"] = {m: sum(caf_requise_mensuel[p["nom"]][m] for p in profils) for m in mois_labels}
 
-    # ===============================
-    # ✅ Envoi vers le template
-    # ===============================
-    return render_template(
-        "caf_dashboard.html",
-        annee=annee,
-        week_labels=week_labels,
-        mois_labels=mois_labels,
-        mois_to_semaines=mois_to_semaines,
-        profils=[p["nom"] for p in profils] + ["TOTAL"],
-        caf_dispo=caf_dispo,
-        caf_requise=caf_requise,
-        caf_dispo_par_semaine=caf_dispo_par_semaine,
-        caf_requise_par_semaine=caf_requise_par_semaine,
-        caf_dispo_mensuel=caf_dispo_mensuel,
-        caf_requise_mensuel=caf_requise_mensuel
-    )
 from flask import jsonify
 from utils.db_utils import query_db
 
@@ -592,27 +461,20 @@ from utils.db_utils import query_db
 
 @caf_bp.route("/profils_secondaires/<matricule>")
 def profils_secondaires(matricule):
-    rows = query_db("""
-        SELECT 
-            p.nom AS profil,
-            cr.pourcentage_build AS pct_build,
-            cr.pourcentage_run AS pct_run,
-            cr.caf_disponible_build AS jh_build,
-            cr.caf_disponible_run AS jh_run
-        FROM collaborateur_repartition cr
-        JOIN profils p ON p.id = cr.profil_id
-        JOIN collaborateurs c ON c.matricule = cr.collaborateur_id
-        WHERE c.matricule = ?
-    """, [matricule])
+    rows = charger_repartitions([matricule]).get(matricule, [])
 
     profils = []
     for r in rows:
+        if not r["profil_nom"]:
+            continue
+        pct_build, pct_run = r["pourcentage_build"], r["pourcentage_run"]
+        jh_build, jh_run = r["caf_disponible_build"], r["caf_disponible_run"]
         profils.append({
-            "profil": r["profil"],
-            "pct_build": int(r["pct_build"]) if r["pct_build"].is_integer() else round(r["pct_build"], 2),
-            "pct_run": int(r["pct_run"]) if r["pct_run"].is_integer() else round(r["pct_run"], 2),
-            "jh_build": int(r["jh_build"]) if r["jh_build"].is_integer() else round(r["jh_build"], 2),
-            "jh_run": int(r["jh_run"]) if r["jh_run"].is_integer() else round(r["jh_run"], 2)
+            "profil": r["profil_nom"],
+            "pct_build": int(pct_build) if pct_build.is_integer() else round(pct_build, 2),
+            "pct_run": int(pct_run) if pct_run.is_integer() else round(pct_run, 2),
+            "jh_build": int(jh_build) if jh_build.is_integer() else round(jh_build, 2),
+            "jh_run": int(jh_run) if jh_run.is_integer() else round(jh_run, 2)
         })
 
     return jsonify({
@@ -1,11 +1,17 @@
 import os
 import sqlite3
-import pandas as pd
 from datetime import datetime
 from io import BytesIO
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, send_file
 from werkzeug.utils import secure_filename
-from utils.db_utils import query_db, execute_db
+from utils.db_utils import query_db, execute_db, get_db
+from utils.pagination import paginer
+from utils.search_utils import filtre_fts
+from utils.referentiel import referentiels
+from services.repartitions import charger_repartitions
+from services.jobs import lancer as lancer_job
+from utils.auth_utils import jwt_requete
+from routes.jobs_routes import reponse_job
 from utils.decorators import readonly_if_user
 import unicodedata, re, glob
 
@@ -15,6 +21,7 @@ UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 LOGS_FOLDER = "logs"
 os.makedirs(LOGS_FOLDER, exist_ok=True)
+TABLES_LISTE_COLLABORATEURS = ("collaborateurs", "profils", "affectation")
 
 
 # ================================================================
@@ -70,49 +77,48 @@ def liste_collaborateurs():
     incomplets = request.args.get('incomplets')
     page = request.args.get('page', 1, type=int)
     per_page = 10
-    offset = (page - 1) * per_page
 
-    profils = query_db("SELECT * FROM profils ORDER BY nom")
-    affectations = query_db("SELECT * FROM affectation ORDER BY nom")
+    profils, affectations = referentiels("profils", "affectations")
 
-    base_query = """
+    # 🔍 Recherche plein texte (matricule, nom, prénom) classée par pertinence
+    jointure_fts, rang, args = filtre_fts(
+        "collaborateur_fts", "c.rowid", search, colonnes=("matricule", "nom", "prenom")
+    )
+
+    base_query = f"""
         SELECT 
             c.matricule, c.nom, c.prenom, c.profil_id, c.affectation_id,
             c.pourcentage_build, c.pourcentage_run,
             c.caf_disponible_build, c.caf_disponible_run,
-            p.nom AS profil, a.nom AS affectation, c.heures_base
+            p.nom AS profil, a.nom AS affectation, c.heures_base,
+            c.rowid AS num_ligne, {rang} AS rang
         FROM collaborateurs c
+        {jointure_fts}
         LEFT JOIN profils p ON c.profil_id = p.id
         LEFT JOIN affectation a ON c.affectation_id = a.id
         WHERE 1=1
     """
-    args = []
 
     if profil_id:
         base_query += " AND p.id = ?"
         args.append(profil_id)
 
-    if search:
-        base_query += " AND (c.matricule LIKE ? OR c.nom LIKE ? OR c.prenom LIKE ?)"
-        args.extend([f"%{search}%", f"%{search}%", f"%{search}%"])
-
     if incomplets:
         base_query += " AND (c.profil_id IS NULL OR c.affectation_id IS NULL)"
 
-    total = query_db(f"SELECT COUNT(*) AS count FROM ({base_query})", args, one=True)['count']
+    tri = [("rang", "ASC"), ("-num_ligne", "ASC")] if jointure_fts else [("num_ligne", "DESC")]
+    pagination = paginer(
+        base_query, args, tri=tri, page=page, per_page=per_page,
+        apres=request.args.get('apres'), tables=TABLES_LISTE_COLLABORATEURS
+    )
 
-    total_pages = (total // per_page) + (1 if total % per_page > 0 else 0)
+    total_pages = pagination.total_pages
     user_role = session.get('user', {}).get('role', '')
-    collaborateurs = query_db(f"{base_query} ORDER BY c.rowid DESC LIMIT ? OFFSET ?", args + [per_page, offset])
 
-    collaborateurs = [dict(c) for c in collaborateurs]
+    collaborateurs = [dict(c) for c in pagination.items]
+    repartitions = charger_repartitions(c['matricule'] for c in collaborateurs)
     for c in collaborateurs:
-        c['repartitions'] = query_db("""
-            SELECT cr.*, p.nom AS profil_nom
-            FROM collaborateur_repartition cr
-            LEFT JOIN profils p ON p.id = cr.profil_id
-            WHERE cr.collaborateur_id = ?
-        """, [c['matricule']])
+        c['repartitions'] = repartitions.get(c['matricule'], [])
     return render_template(
         'collaborateurs/liste.html',
         collaborateurs=collaborateurs,
@@ -123,6 +129,7 @@ def liste_collaborateurs():
         incomplets=incomplets,
         page=page,
         total_pages=total_pages,
+        next_cursor=pagination.next_cursor,
         user_role=user_role
     )
 
@@ -463,11 +470,39 @@ def modifier_collaborateur(matricule):
 @collab_bp.route('/import-excel', methods=['POST'])
 @readonly_if_user
 def import_excel():
-    import datetime, unicodedata, re, glob
+    import datetime
 
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
     os.makedirs(LOGS_FOLDER, exist_ok=True)
 
+    # === Récupération du fichier ===
+    file = request.files.get('file')
+    if not file or not file.filename.endswith('.xlsx'):
+        flash("❌ Veuillez importer un fichier Excel (.xlsx)", "danger")
+        return redirect(url_for('collaborateurs.liste_collaborateurs'))
+
+    filepath = os.path.join(UPLOAD_FOLDER, secure_filename(file.filename))
+    file.save(filepath)
+
+    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_path = os.path.join(LOGS_FOLDER, f"import_collaborateurs_{ts}.log")
+    iuser = session.get('user', {}).get('username', 'system')
+
+    # ⏳ Traitement en arrière-plan
+    job_id = lancer_job(
+        "import_collaborateurs", file.filename, log_path,
+        _executer_import_excel, filepath, file.filename, log_path, iuser,
+        redirection=url_for('collaborateurs.liste_collaborateurs'),
+        iuser=jwt_requete()[0],
+    )
+    return reponse_job(job_id)
+
+
+def _executer_import_excel(job, filepath, filename, log_path, iuser):
+    """Import des collaborateurs (exécuté par le job) ; retourne (message, catégorie flash)."""
+    import pandas as pd
+    import datetime, unicodedata, re
+
     def normalize_col(col: str):
         col = ''.join(c for c in unicodedata.normalize('NFD', str(col)) if unicodedata.category(c) != 'Mn')
         col = re.sub(r'[\s_]+', '', col)
@@ -486,22 +521,12 @@ def import_excel():
         v = max(0, min(100, round(v, 2)))
         return int(round(v))
 
-    # === Récupération du fichier ===
-    file = request.files.get('file')
-    if not file or not file.filename.endswith('.xlsx'):
-        flash("❌ Veuillez importer un fichier Excel (.xlsx)", "danger")
-        return redirect(url_for('collaborateurs.liste_collaborateurs'))
-
-    filepath = os.path.join(UPLOAD_FOLDER, secure_filename(file.filename))
-    file.save(filepath)
-
-    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_path = os.path.join(LOGS_FOLDER, f"import_collaborateurs_{ts}.log")
-    log = []
-    def _log(msg): log.append(msg)
+    # Log écrit ligne par ligne : lisible pendant le job via /jobs/<id>/log
+    log_file = open(log_path, "w", encoding="utf-8", buffering=1)
+    def _log(msg): log_file.write(msg + "\n")
 
     _log(f"=== Import collaborateurs ({datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) ===")
-    _log(f"Fichier importé : {file.filename}")
+    _log(f"Fichier importé : {filename}")
     _log("-" * 60)
 
     try:
@@ -527,48 +552,95 @@ def import_excel():
 
         has_heures_base = 'heuresbase' in df.columns
 
-        profils = {p['nom'].strip().lower(): p for p in query_db("SELECT id, nom, heures_base FROM profils")}
-        affectations = {a['nom'].strip().lower(): a['id'] for a in query_db("SELECT id, nom FROM affectation")}
-
+        def to_int(x):
+            try:
+                return int(x)
+            except Exception:
+                return 0
+
+        # 🔹 Normalisation de tout le fichier en une passe
+        data = pd.DataFrame({
+            'ligne': df.index + 2,
+            'matricule': df['matricule'].map(str).str.strip(),
+            'nom': df['nom'].map(str).str.strip(),
+            'prenom': df['prenom'].map(str).str.strip(),
+            'profil_cle': df['profil'].map(str).str.strip().str.lower(),
+            'affect_cle': df['affectation'].map(str).str.strip().str.lower(),
+            'pourcentage_build': df['pourcentagebuild'].map(parse_percentage),
+            'pourcentage_run': df['pourcentagerun'].map(parse_percentage),
+        })
+        data['valide'] = data['matricule'].str.isdigit().fillna(False).astype(bool)
+        if has_heures_base:
+            data['heures_fichier'] = df['heuresbase'].map(to_int)
+
+        # 🔹 Résolution profil / affectation par jointure (dernier nom en double retenu)
+        ref_profils = pd.DataFrame(
+            [dict(p) for p in query_db("SELECT id, nom, heures_base FROM profils")],
+            columns=['id', 'nom', 'heures_base'])
+        ref_profils['profil_cle'] = ref_profils['nom'].map(lambda n: n.strip().lower())
+        ref_profils = ref_profils.drop_duplicates('profil_cle', keep='last').rename(
+            columns={'id': 'profil_id', 'heures_base': 'heures_profil'})
+
+        ref_affectations = pd.DataFrame(
+            [dict(a) for a in query_db("SELECT id, nom FROM affectation")],
+            columns=['id', 'nom'])
+        ref_affectations['affect_cle'] = ref_affectations['nom'].map(lambda n: n.strip().lower())
+        ref_affectations = ref_affectations.drop_duplicates('affect_cle', keep='last').rename(
+            columns={'id': 'affectation_id'})
+
+        data = data.merge(ref_profils[['profil_cle', 'profil_id', 'heures_profil']], on='profil_cle', how='left')
+        data = data.merge(ref_affectations[['affect_cle', 'affectation_id']], on='affect_cle', how='left')
+
+        # 🔹 Si le fichier contient heures_base → on l’utilise, sinon hérité du profil
+        if has_heures_base:
+            data['heures_base'] = data['heures_fichier']
+        else:
+            data['heures_base'] = data['heures_profil'].map(lambda h: int(h) if pd.notna(h) else 0)
+
+        existants = {r['matricule'] for r in query_db("SELECT matricule FROM collaborateurs")}
+        a_inserer = []
+        job.progression(total=len(data), force=True)
         inserted, ignored = 0, 0
 
-        for idx, row in df.iterrows():
-            ligne = idx + 2
-            matricule = str(row.get('matricule', '')).strip()
-            nom = str(row.get('nom', '')).strip()
-            prenom = str(row.get('prenom', '')).strip()
-            profil_nom = str(row.get('profil', '')).strip().lower()
-            affect_nom = str(row.get('affectation', '')).strip().lower()
-
-            if not matricule or not matricule.isdigit():
+        for n, row in enumerate(data.itertuples(index=False)):
+            job.progression(lues=n, inserees=inserted, rejetees=ignored)
+            ligne = row.ligne
+            if not row.valide:
                 _log(f"⚠️ L{ligne}: ignorée — matricule manquant/invalide.")
                 ignored += 1
                 continue
 
-            profil_data = profils.get(profil_nom)
-            affectation_id = affectations.get(affect_nom)
+            if row.matricule in existants:
+                _log(f"⚠️ L{ligne}: ignorée — matricule {row.matricule} déjà existant.")
+                ignored += 1
+                continue
+            existants.add(row.matricule)
+
+            profil_id = int(row.profil_id) if pd.notna(row.profil_id) else None
+            affectation_id = int(row.affectation_id) if pd.notna(row.affectation_id) else None
+            heures_base = int(row.heures_base)
+            caf_build = round(heures_base * (row.pourcentage_build / 100.0), 2)
+            caf_run = round(heures_base * (row.pourcentage_run / 100.0), 2)
+
+            a_inserer.append((
+                row.matricule, row.nom, row.prenom,
+                profil_id, affectation_id, heures_base,
+                int(row.pourcentage_build), int(row.pourcentage_run),
+                float(caf_build), float(caf_run),
+                iuser
+            ))
 
-            # 🔹 Si le fichier contient heures_base → on l’utilise, sinon hérité du profil
-            if has_heures_base:
-                try:
-                    heures_base = int(row.get('heuresbase', 0))
-                except Exception:
-                    heures_base = 0
+            if profil_id is None or not affectation_id:
+                _log(f"🔸 L{ligne}: ajouté INCOMPLET — {row.prenom} {row.nom} (profil/affectation manquant).")
             else:
-                heures_base = int(profil_data['heures_base']) if profil_data else 0
-
-            pourcentage_build = parse_percentage(row.get('pourcentagebuild', 70))
-            pourcentage_run = parse_percentage(row.get('pourcentagerun', 30))
-
-            caf_build = round(heures_base * (pourcentage_build / 100.0), 2)
-            caf_run = round(heures_base * (pourcentage_run / 100.0), 2)
+                _log(f"✅ L{ligne}: ajouté — {row.prenom} {row.nom} (H={heures_base}, %B={row.pourcentage_build}, %R={row.pourcentage_run}).")
 
-            if query_db("SELECT 1 FROM collaborateurs WHERE matricule = ?", [matricule], one=True):
-                _log(f"⚠️ L{ligne}: ignorée — matricule {matricule} déjà existant.")
-                ignored += 1
-                continue
+            inserted += 1
 
-            execute_db("""
+        # 🔹 Insertion groupée : tout ou rien
+        conn = get_db()
+        try:
+            conn.executemany("""
                 INSERT INTO collaborateurs (
                     matricule, nom, prenom,
                     profil_id, affectation_id, heures_base,
@@ -576,38 +648,26 @@ def import_excel():
                     caf_disponible_build, caf_disponible_run,
                     idate, iuser
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), ?)
-            """, [
-                matricule, nom, prenom,
-                int(profil_data['id']) if profil_data else None,
-                int(affectation_id) if affectation_id else None,
-                heures_base,
-                int(pourcentage_build), int(pourcentage_run),
-                float(caf_build), float(caf_run),
-                session.get('user', {}).get('username', 'system')
-            ])
-
-            if not profil_data or not affectation_id:
-                _log(f"🔸 L{ligne}: ajouté INCOMPLET — {prenom} {nom} (profil/affectation manquant).")
-            else:
-                _log(f"✅ L{ligne}: ajouté — {prenom} {nom} (H={heures_base}, %B={pourcentage_build}, %R={pourcentage_run}).")
-
-            inserted += 1
+            """, a_inserer)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            _log("-" * 60)
+            _log("Aucune ligne enregistrée (transaction annulée).")
+            raise
 
+        job.progression(lues=len(data), inserees=inserted, rejetees=ignored, force=True)
         _log("-" * 60)
         _log(f"Résultat : {inserted} ajoutés / {ignored} ignorés")
 
-        with open(log_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(log))
-
-        flash(f"✅ Import terminé : {inserted} ajoutés, {ignored} ignorés. Log : {os.path.basename(log_path)}", "success")
+        return f"✅ Import terminé : {inserted} ajoutés, {ignored} ignorés. Log : {os.path.basename(log_path)}", "success"
 
     except Exception as e:
         _log(f"❌ Erreur critique : {e}")
-        with open(log_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(log))
-        flash(f"❌ Erreur lors de l’import : {e}. Log : {os.path.basename(log_path)}", "danger")
+        return f"❌ Erreur lors de l’import : {e}. Log : {os.path.basename(log_path)}", "danger"
 
-    return redirect(url_for('collaborateurs.liste_collaborateurs'))
+    finally:
+        log_file.close()
 
 # ================================================================
 # 🔹 SUPPRIMER COLLABORATEUR
@@ -634,6 +694,7 @@ def supprimer_collaborateur(matricule):
 # -----------------------
 @collab_bp.route('/telecharger-modele')
 def telecharger_modele():
+    import pandas as pd
     # On fournit les pourcentages, CAF sera calculé automatiquement côté serveur
     colonnes = ['Matricule', 'Nom', 'Prenom', 'Profil', 'Affectation',
                 'Heures_Base', 'Pourcentage_Build', 'Pourcentage_Run']
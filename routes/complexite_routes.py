@@ -117,23 +117,23 @@ def supprimer_complexite(id):
 # ROUTES AJAX (DÉPENDANCES)
 # -----------------------
 
+SQL_TYPES_PAR_LIBELLE = "SELECT DISTINCT type_libelle FROM complexite WHERE libelle = ? ORDER BY type_libelle"
+SQL_VALEURS_PAR_TYPE = (
+    "SELECT DISTINCT valeur_libelle FROM complexite WHERE libelle = ? AND type_libelle = ? ORDER BY valeur_libelle"
+)
+
+
 # Types distincts pour un libellé donné
 @complexite_bp.route('/get_types/<libelle>')
 def get_types(libelle):
-    rows = query_db(
-        "SELECT DISTINCT type_libelle FROM complexite WHERE libelle = ? ORDER BY type_libelle",
-        [libelle]
-    )
+    rows = query_db(SQL_TYPES_PAR_LIBELLE, [libelle])
     return jsonify({"types": [r["type_libelle"] for r in rows]})
 
 
 # Valeurs distinctes pour un couple (libellé, type_libelle)
 @complexite_bp.route('/get_valeurs/<libelle>/<type_libelle>')
 def get_valeurs(libelle, type_libelle):
-    rows = query_db(
-        "SELECT DISTINCT valeur_libelle FROM complexite WHERE libelle = ? AND type_libelle = ? ORDER BY valeur_libelle",
-        [libelle, type_libelle]
-    )
+    rows = query_db(SQL_VALEURS_PAR_TYPE, [libelle, type_libelle])
     return jsonify({"valeurs": [r["valeur_libelle"] for r in rows]})
 
 
@@ -5,23 +5,29 @@ import sqlite3
 from datetime import datetime, timedelta
 from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
 from utils.db_utils import query_db, get_db
+from utils.pagination import paginer
+from utils.search_utils import filtre_fts
+from utils.referentiel import referentiel, referentiels
 from utils.calcul_utils import calculer_charge_estimee
+from services.caf_requise_semaine import rafraichir_projet
+from services.priorites import rang, reclasser_plus_tard
+from services.criteres_projet import charger_criteres, enregistrer_criteres
 
 demande_it_bp = Blueprint("demande_it", __name__, url_prefix="/demande_it")
 
+TABLES_LISTE_PROJETS = ("Projet", "programme", "domaines", "categorie", "statut")
+TABLES_LISTE_DEMANDES = ("Projet", "programme", "domaines", "categorie", "statut_demande")
+
 
 # ==========================================
 # Liste des projets
 # ==========================================
-@demande_it_bp.route("/liste_projet_it")
-def liste_projets_it():
-    page = request.args.get("page", 1, type=int)
-    per_page = 10
-    offset = (page - 1) * per_page
-    search = request.args.get("q", "").strip()
-    incomplets = request.args.get("incomplets", False, type=bool)
+def requete_liste_projets_it(search="", incomplets=False):
+    """(requête, paramètres, tri) des projets IT retenus ; plans contrôlés par benchmarks/check_query_plans.py."""
+    # 🔍 Recherche plein texte (titre, programme) classée par pertinence
+    jointure_fts, rang, args = filtre_fts("projet_fts", "p.id", search, colonnes=("titre", "programme"))
 
-    base_query = """
+    base_query = f"""
         SELECT 
             p.id,
             p.titre_projet AS titre,
@@ -33,47 +39,71 @@ def liste_projets_it():
             IFNULL(p.score_complexite, 0) AS score_complexite,
             IFNULL(p.estimation_jh, 0) AS estimation_jh,
             IFNULL(p.date_mep, '-') AS date_mep,
-             p.priority,p.score_wsjf
+             p.priority,p.score_wsjf,
+            {rang} AS rang
         FROM Projet p
+        {jointure_fts}
         LEFT JOIN programme prog ON prog.id = p.id_programme
         LEFT JOIN domaines d ON d.id = p.id_domaine
         LEFT JOIN categorie cat ON cat.id = p.id_categorie
         LEFT JOIN statut s ON s.id = p.id_statut
         WHERE p.type = 'it' AND p.retenue = 1
     """
-    args = []
-
-    if search:
-        base_query += " AND (p.titre_projet LIKE ? OR prog.nom LIKE ?)"
-        args.extend([f"%{search}%", f"%{search}%"])
 
     if incomplets:
         base_query += " AND (p.id_programme IS NULL OR p.id_domaine IS NULL)"
 
-    total = query_db(f"SELECT COUNT(*) AS count FROM ({base_query})", args, one=True)["count"]
-    projets = query_db(f"{base_query} ORDER BY p.id DESC LIMIT ? OFFSET ?", args + [per_page, offset])
-    total_pages = (total // per_page) + (1 if total % per_page else 0)
+    tri = [("rang", "ASC"), ("-id", "ASC")] if jointure_fts else [("id", "DESC")]
+    return base_query, args, tri
+
+
+@demande_it_bp.route("/liste_projet_it")
+def liste_projets_it():
+    page = request.args.get("page", 1, type=int)
+    per_page = 10
+    search = request.args.get("q", "").strip()
+    incomplets = request.args.get("incomplets", False, type=bool)
+
+    base_query, args, tri = requete_liste_projets_it(search, incomplets)
+    pagination = paginer(
+        base_query, args, tri=tri, page=page, per_page=per_page,
+        apres=request.args.get("apres"), tables=TABLES_LISTE_PROJETS
+    )
 
     return render_template(
         "projets_liste_it.html",
-        projets=projets,
+        projets=pagination.items,
         page=page,
-        total_pages=total_pages,
+        total_pages=pagination.total_pages,
+        next_cursor=pagination.next_cursor,
         search=search,
         incomplets=incomplets
     )
 
 
-@demande_it_bp.route("/liste_demandes_it")
-def liste_demandes_it():
-    page = request.args.get("page", 1, type=int)
-    per_page = 10
-    offset = (page - 1) * per_page
-    search = request.args.get("q", "").strip()
-    incomplets = request.args.get("incomplets", False, type=bool)
-    retenue_filter = request.args.get("retenue", "").strip().lower()
-
-    base_query = """
+# 🔹 Sous-liste des demandes chiffrées IT
+SQL_DEMANDES_CHIFFREES_IT = """
+    SELECT 
+        p.id,
+        p.titre_projet AS titre,
+        p.score_complexite,
+        p.estimation_jh,
+        p.retenue
+    FROM Projet p
+    LEFT JOIN programme prog ON p.id_programme = prog.id
+    LEFT JOIN domaines d ON p.id_domaine = d.id
+    LEFT JOIN Statut_demande sd ON sd.id = p.id_statut_demande 
+    WHERE sd.nom = 'Chiffré' AND p.type = 'it'
+    ORDER BY p.id DESC
+"""
+
+
+def requete_liste_demandes_it(search="", incomplets=False, retenue_filter=""):
+    """(requête, paramètres, tri) des demandes IT ; plans contrôlés par benchmarks/check_query_plans.py."""
+    # 🔍 Recherche plein texte (titre, programme, domaine) classée par pertinence
+    jointure_fts, rang, args = filtre_fts("projet_fts", "p.id", search)
+
+    base_query = f"""
         SELECT 
             p.id,
             p.titre_projet AS titre,
@@ -86,37 +116,16 @@ def liste_demandes_it():
             IFNULL(p.estimation_jh, 0) AS estimation_jh,
             IFNULL(p.date_mep, '-') AS date_mep,
             p.retenue,
-            p.priority,p.score_wsjf
+            p.priority,p.score_wsjf,
+            {rang} AS rang
         FROM Projet p
+        {jointure_fts}
         LEFT JOIN programme prog ON prog.id = p.id_programme
         LEFT JOIN domaines d ON d.id = p.id_domaine
         LEFT JOIN categorie cat ON cat.id = p.id_categorie
         LEFT JOIN statut_demande s ON s.id = p.retenue
        WHERE p.type = 'it' 
     """
-    args = []
-
-    # 🔹 Sous-liste des demandes chiffrées IT
-    demandes = query_db("""
-        SELECT 
-            p.id,
-            p.titre_projet AS titre,
-            p.score_complexite,
-            p.estimation_jh,
-            p.retenue
-        FROM Projet p
-        LEFT JOIN programme prog ON p.id_programme = prog.id
-        LEFT JOIN domaines d ON p.id_domaine = d.id
-        LEFT JOIN Statut_demande sd ON sd.id = p.id_statut_demande 
-        WHERE sd.nom = 'Chiffré' AND p.type = 'it'
-        ORDER BY p.id DESC
-    """)
-
-    # 🔍 Recherche
-    if search:
-        base_query += " AND (p.titre_projet LIKE ? OR prog.nom LIKE ? OR d.nom LIKE ?)"
-        like = f"%{search}%"
-        args.extend([like, like, like])
 
     # ⚠️ Filtre incomplets
     if incomplets:
@@ -130,17 +139,40 @@ def liste_demandes_it():
     elif retenue_filter == "null":
         base_query += " AND p.retenue IS NULL"
 
-    # 📄 Pagination
-    total = query_db(f"SELECT COUNT(*) AS count FROM ({base_query})", args, one=True)["count"]
-    projets = query_db(f"{base_query} ORDER BY p.priority ASC LIMIT ? OFFSET ?", args + [per_page, offset])
-    total_pages = (total // per_page) + (1 if total % per_page else 0)
+    # 📄 Pagination par priorité (priorités ≥ 1, NULL en tête comme avant),
+    #     précédée de la pertinence en cas de recherche
+    tri = [("IFNULL(priority, 0)", "ASC"), ("id", "ASC")]
+    if jointure_fts:
+        tri.insert(0, ("rang", "ASC"))
+    return base_query, args, tri
+
+
+@demande_it_bp.route("/liste_demandes_it")
+def liste_demandes_it():
+    page = request.args.get("page", 1, type=int)
+    per_page = 10
+    search = request.args.get("q", "").strip()
+    incomplets = request.args.get("incomplets", False, type=bool)
+    retenue_filter = request.args.get("retenue", "").strip().lower()
+
+    base_query, args, tri = requete_liste_demandes_it(search, incomplets, retenue_filter)
+
+    # 🔹 Sous-liste des demandes chiffrées IT
+    demandes = query_db(SQL_DEMANDES_CHIFFREES_IT)
+
+    pagination = paginer(
+        base_query, args, tri=tri,
+        page=page, per_page=per_page,
+        apres=request.args.get("apres"), tables=TABLES_LISTE_DEMANDES
+    )
 
     # 🔁 Rendu HTML
     return render_template(
         "liste_demandes_it.html",
-        projets=projets,
+        projets=pagination.items,
         page=page,
-        total_pages=total_pages,
+        total_pages=pagination.total_pages,
+        next_cursor=pagination.next_cursor,
         search=search,
         incomplets=incomplets,
         demandes=demandes,
@@ -186,10 +218,7 @@ def modifier_projet_it(projet_id):
         return redirect(url_for("demande_it.liste_projets_it"))
 
     # --- Données de référence ---
-    programmes = query_db("SELECT id, nom, type FROM programme ORDER BY nom")
-    domaines = query_db("SELECT id, nom FROM domaines ORDER BY nom")
-    categories = query_db("SELECT id, nom FROM categorie ORDER BY nom")
-    statuts = query_db("SELECT id, nom FROM statut ORDER BY nom")
+    programmes, domaines, categories, statuts = referentiels("programmes", "domaines", "categories", "statuts")
 
     # --- Gestion POST ---
     if request.method == "POST":
@@ -253,6 +282,7 @@ def modifier_projet_it(projet_id):
                                 p["phase_id"]
                             ))
                         conn.commit()
+                        rafraichir_projet(projet_id)
                         flash("🔁 Dates des phases réajustées selon la nouvelle date MEP et la charge estimée.", "info")
 
                 else:
@@ -326,6 +356,8 @@ def update_phases_dates_it(projet_id):
         else:
             flash("⚠️ Dates mises à jour, mais estimation non recalculée (informations incomplètes).", "warning")
 
+        rafraichir_projet(projet_id)
+
     except Exception as e:
         conn.rollback()
         flash(f"❌ Erreur lors de la mise à jour des phases : {e}", "error")
@@ -403,6 +435,7 @@ def phases_programme_it(programme_id):
             })
 
         conn.commit()
+        rafraichir_projet(projet_id)
 
         return jsonify({
             "success": True,
@@ -423,6 +456,7 @@ def supprimer_projet_it(projet_id):
     cur = conn.cursor()
     cur.execute("DELETE FROM Projet WHERE type ='it' and id = ?", [projet_id])
     conn.commit()
+    rafraichir_projet(projet_id)
     flash("🗑️ Projet supprimé avec succès.", "success")
     return redirect(url_for("demande_it.liste_projets_it"))
 
@@ -446,10 +480,7 @@ def modifier_demande_it(projet_id):
     ancien_score_complexite = demande["score_complexite"]
 
     # --- 🔹 Données de référence
-    programmes = query_db("SELECT id, nom FROM programme ORDER BY nom")
-    domaines = query_db("SELECT id, nom FROM domaines ORDER BY nom")
-    # categories = query_db("SELECT id, nom FROM categorie ORDER BY nom")
-    statuts = query_db("SELECT id, nom FROM statut_demande where nom in ('Retenu','Non Retenue') ORDER BY nom")
+    programmes, domaines, statuts = referentiels("programmes", "domaines", "statuts_retenue")
     statut_demande = query_db("""
         SELECT p.*, s.nom AS nom_statut_demande
         FROM Projet p
@@ -471,52 +502,23 @@ def modifier_demande_it(projet_id):
         """, [projet_id])
 
     # 🔹 Dropdowns : toutes les options disponibles groupées par libellé
-    all_options = query_db("""
-            SELECT id, libelle, type_libelle, valeur_libelle
-            FROM valeur_metier
-            ORDER BY libelle, type_libelle, valeur_libelle
-        """)
-
-    # On crée un dictionnaire : { "libelle" : [liste des options correspondantes] }
-    dropdowns = {}
-    for opt in all_options:
-        lib = opt["libelle"]
-        dropdowns.setdefault(lib, []).append(opt)
+    # { "libelle" : [liste des options correspondantes] }
+    dropdowns = referentiel("dropdowns")
     # --- 🔹 Complexités disponibles
-    libelles_complexite = query_db("""
-        SELECT DISTINCT libelle FROM complexite
-        WHERE libelle IS NOT NULL AND libelle <> ''
-        ORDER BY libelle
-    """)
+    libelles_complexite = referentiel("libelles_complexite")
+    complexites_choisies = charger_criteres(projet_id)["complexite"]
     complexites = []
     for l in libelles_complexite:
         lib = l["libelle"]
-        valeur_existante = query_db("""
-            SELECT c.id AS id_complexite, c.libelle, c.type_libelle, c.valeur_libelle
-            FROM complexite_projet cp
-            JOIN complexite c ON c.id = cp.id_complexite
-            WHERE cp.id_projet = ? AND c.libelle = ?
-            LIMIT 1
-        """, [projet_id, lib], one=True)
-        if valeur_existante:
-            complexites.append(valeur_existante)
-        else:
-            complexites.append({
-                "libelle": lib,
-                "id_complexite": None,
-                "type_libelle": None,
-                "valeur_libelle": None
-            })
+        choix = complexites_choisies.get(lib)
+        complexites.append({
+            "libelle": lib,
+            "id_complexite": choix["id_critere"] if choix else None,
+            "type_libelle": choix["type_libelle"] if choix else None,
+            "valeur_libelle": choix["valeur_libelle"] if choix else None
+        })
 
-    complexite_possibles = query_db("""
-        SELECT DISTINCT libelle, id, type_libelle, valeur_libelle
-        FROM complexite
-        WHERE type_libelle IS NOT NULL AND type_libelle <> ''
-        ORDER BY id
-    """)
-    dropdowns_complexite = {}
-    for c in complexite_possibles:
-        dropdowns_complexite.setdefault(c["libelle"], []).append(dict(c))
+    dropdowns_complexite = referentiel("dropdowns_complexite")
 
     # --- 🔹 Enregistrement
     if request.method == "POST":
@@ -586,6 +588,7 @@ def modifier_demande_it(projet_id):
         else:
             flash("ℹ️ Aucune modification détectée sur le domaine ou la complexité — pas de recalcul.", "info")
 
+        rafraichir_projet(projet_id)
         return redirect(url_for("demande_it.modifier_demande_it", projet_id=projet_id))
 
 
@@ -609,50 +612,10 @@ def update_all_complexites_demande_it(projet_id):
     conn = get_db()
     cur = conn.cursor()
 
-    # --- 🔹 Récupération des complexités
-    libelles_complexite = query_db("SELECT DISTINCT libelle FROM complexite WHERE libelle <> ''")
-    nb_total = len(libelles_complexite)
-    nb_remplies = 0
-    toutes_remplies = True
-    changements = False
-
-    for l in libelles_complexite:
-        lib = l["libelle"]
-        valeur_id = request.form.get(f"complexite_{lib}")
-        print(f"➡️  {lib} → valeur_id = {valeur_id}")
-
-        if not valeur_id:
-            toutes_remplies = False
-            continue
-        else:
-            nb_remplies += 1
-
-        # Vérifie si déjà présent
-        existing = query_db("""
-            SELECT cp.id_complexite 
-            FROM complexite_projet cp
-            JOIN complexite c ON c.id = cp.id_complexite
-            WHERE cp.id_projet = ? AND c.libelle = ?
-        """, [projet_id, lib], one=True)
-
-        if existing:
-            if str(existing["id_complexite"]) != str(valeur_id):
-                changements = True
-                cur.execute("""
-                    UPDATE complexite_projet
-                    SET id_complexite = ?, udate = DATETIME('now'), uuser = 1
-                    WHERE id_projet = ? AND id_complexite = ?
-                """, (valeur_id, projet_id, existing["id_complexite"]))
-        else:
-            changements = True
-            cur.execute("""
-                INSERT INTO complexite_projet (id_projet, id_complexite, idate, iuser)
-                VALUES (?, ?, DATETIME('now'), 1)
-            """, (projet_id, valeur_id))
-
-    conn.commit()
-
-    partiellement_remplies = 0 < nb_remplies < nb_total
+    # --- 🔹 Enregistrement des complexités (seules les réponses modifiées sont écrites)
+    saisie = enregistrer_criteres(projet_id, "complexite", request.form)
+    toutes_remplies = saisie["toutes_remplies"]
+    partiellement_remplies = saisie["partiellement_remplies"]
 
     somme_valeur_metier = query_db("""
         SELECT SUM(vm.valeur_libelle * vm.ponderation) AS total
@@ -717,25 +680,14 @@ def update_all_complexites_demande_it(projet_id):
     # --- 🔹 🔥 Nouvelle étape : mise à jour automatique de la priorité
     print(f"[LOG] 🔄 Recalcul des priorités basé sur score_wsjf pour le projet {projet_id}")
 
-    tous_projets = query_db("""
-        SELECT id, score_wsjf
-        FROM Projet
-        WHERE score_wsjf IS NOT NULL
-        ORDER BY score_wsjf DESC
-    """)
-
-    for index, p in enumerate(tous_projets, start=1):
-        cur.execute("""
-            UPDATE Projet
-            SET priority = ?
-            WHERE id = ?
-        """, (index, p["id"]))
+    # Reclassement du portefeuille différé (les enregistrements rapprochés n'en font qu'un)
+    reclasser_plus_tard()
 
-    conn.commit()
+    priorite = rang(projet_id)
+    if priorite is not None:
+        flash(f"🏅 Priorité du projet mise à jour : {priorite}", "success")
 
-    priority_actuelle = query_db("SELECT priority FROM Projet WHERE id = ?", [projet_id], one=True)
-    if priority_actuelle:
-        flash(f"🏅 Priorité du projet mise à jour : {priority_actuelle['priority']}", "success")
+    rafraichir_projet(projet_id)
 
     flash(f"🔄 Score total = {score_complexite}, Estimation = {estimation_jh} JH", "info")
 
@@ -755,6 +707,7 @@ def supprimer_demande_it(projet_id):
         # Puis le projet lui-même
         cur.execute("DELETE FROM Projet WHERE id = ?", [projet_id])
         conn.commit()
+        rafraichir_projet(projet_id)
         flash("✅ Projet supprimé avec succès.", "success")
 
     except sqlite3.IntegrityError:
@@ -881,51 +834,10 @@ def update_all_valeurs_metier_it(projet_id):
     conn = get_db()
     cur = conn.cursor()
 
-    # --- 🔹 Récupération des libellés de valeurs métier
-    libelles_vm = query_db("SELECT DISTINCT libelle FROM valeur_metier WHERE libelle <> ''")
-    nb_total = len(libelles_vm)
-    nb_remplies = 0
-    toutes_remplies = True
-    changements = False
-
-    for l in libelles_vm:
-        lib = l["libelle"]
-        valeur_id = request.form.get(f"valeur_{lib}")
-        print(f"➡️ {lib} → valeur_id = {valeur_id}")
-
-        if not valeur_id:
-            toutes_remplies = False
-            continue
-        else:
-            nb_remplies += 1
-
-        # Vérifie si déjà présente
-        existing = query_db("""
-            SELECT vmp.id_valeur_metier
-            FROM valeur_metier_projet vmp
-            JOIN valeur_metier vm ON vm.id = vmp.id_valeur_metier
-            WHERE vmp.id_projet = ? AND vm.libelle = ?
-        """, [projet_id, lib], one=True)
-
-        if existing:
-            if str(existing["id_valeur_metier"]) != str(valeur_id):
-                changements = True
-                cur.execute("""
-                    UPDATE valeur_metier_projet
-                    SET id_valeur_metier = ?, udate = DATETIME('now'), uuser = 1
-                    WHERE id_projet = ? 
-                      AND id_valeur_metier = ?
-                """, (valeur_id, projet_id, existing["id_valeur_metier"]))
-        else:
-            changements = True
-            cur.execute("""
-                INSERT INTO valeur_metier_projet (id_projet, id_valeur_metier, idate, iuser)
-                VALUES (?, ?, DATETIME('now'), 1)
-            """, (projet_id, valeur_id))
-
-    conn.commit()
-
-    partiellement_remplies = 0 < nb_remplies < nb_total
+    # --- 🔹 Enregistrement des valeurs métier (seules les réponses modifiées sont écrites)
+    saisie = enregistrer_criteres(projet_id, "valeur_metier", request.form)
+    toutes_remplies = saisie["toutes_remplies"]
+    partiellement_remplies = saisie["partiellement_remplies"]
 
     # --- 🔹 Calcul du score global (facultatif, si tu veux un total VM)
     score_valeur_metier = query_db("""
@@ -3,7 +3,8 @@
 # ==========================================
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from utils.db_utils import query_db, get_db
-from utils.calcul_utils import calculer_charge_estimee
+from services.caf_requise_semaine import rafraichir_projets
+from services.reestimation import reestimer_domaine
 
 domaines_bp = Blueprint("domaines", __name__, url_prefix="/domaines")
 
@@ -65,29 +66,10 @@ def modifier_domaine(id):
     """, (nom, coefficient, id))
     conn.commit()
 
-    projets = query_db("""
-        SELECT id, score_complexite
-        FROM "Projet"
-        WHERE id_domaine = ?
-    """, [id])
-
-    nb_recalcules = 0
-    for p in projets:
-        score = p["score_complexite"]
-        if not score:
-            continue
-
-        resultat = calculer_charge_estimee(score, id)
-        estimation_jh = resultat.get("charge_estimee", 0) if isinstance(resultat, dict) else 0
-
-        cur.execute("""
-            UPDATE "Projet"
-            SET estimation_jh = ?, uuser = 1, udate = DATETIME('now')
-            WHERE id = ?
-        """, (estimation_jh, p["id"]))
-        nb_recalcules += 1
-
-    conn.commit()
+    # ✅ Ré-estimation ensembliste des projets du domaine (un seul UPDATE)
+    resultat = reestimer_domaine(id)
+    nb_recalcules = resultat["evalues"]
+    rafraichir_projets([pid for pid, _, _ in resultat["changements"]])
 
     if nb_recalcules > 0:
         flash(f"♻️ {nb_recalcules} projet(s) recalculé(s) suite à la mise à jour du domaine.", "info")
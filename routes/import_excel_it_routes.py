@@ -1,12 +1,14 @@
 # routes/import_excel_it_routes.py
 from datetime import datetime
 import os
-import pandas as pd
 from flask import Blueprint, render_template, request, flash, redirect, url_for
 from werkzeug.utils import secure_filename
-import unicodedata
-from difflib import SequenceMatcher
 from utils.db_utils import get_db
+from utils.text_utils import normalize_text
+from services.valeur_metier_index import IndexValeursMetier
+from services.jobs import lancer as lancer_job
+from utils.auth_utils import jwt_requete
+from routes.jobs_routes import reponse_job
 
 # ------------------------------------------------------------
 # 📦 Blueprint & dossier uploads
@@ -16,31 +18,6 @@ UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "..", "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 
-# ------------------------------------------------------------
-# 🔠 Fonctions utilitaires
-# ------------------------------------------------------------
-def normalize_text(text):
-    """Nettoie et normalise les textes (accents, espaces, majuscules...)."""
-    if text is None:
-        return ""
-    text = str(text).strip()
-    if text.lower() == "nan":
-        return ""
-    text = text.lower()
-    text = unicodedata.normalize("NFD", text)
-    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
-    text = text.replace("_", " ").replace("-", " ").replace("’", "'").replace("œ", "oe")
-    text = " ".join(text.split())
-    return text
-
-
-def similar(a, b, seuil=0.9):
-    """Retourne True si deux chaînes sont suffisamment similaires."""
-    if not a or not b:
-        return False
-    return SequenceMatcher(None, a, b).ratio() >= seuil
-
-
 # ------------------------------------------------------------
 # 🔧 ROUTE PRINCIPALE : Import Excel IT
 # ------------------------------------------------------------
@@ -61,182 +38,174 @@ def import_excel_it():
         filepath = os.path.join(UPLOAD_FOLDER, unique_name)
         file.save(filepath)
 
-        # 📖 Lecture Excel
-        try:
-            df = pd.read_excel(filepath)
-        except Exception as e:
-            flash(f"❌ Erreur de lecture Excel : {e}", "error")
-            return redirect(url_for("import_excel_it.import_excel_it"))
-
         log_path = os.path.join(UPLOAD_FOLDER, f"import_debug_it_{timestamp}.txt")
+
+        # ⏳ Traitement en arrière-plan
+        job_id = lancer_job(
+            "import_it", unique_name, log_path,
+            executer_import_it, filepath, log_path,
+            redirection=url_for("projet.liste_projets"),
+            iuser=jwt_requete()[0],
+        )
+        return reponse_job(job_id)
+
+    return render_template("import_excel_it.html")
+
+
+# ------------------------------------------------------------
+# ⚙️ Traitement de l'import IT (exécuté par le job)
+# ------------------------------------------------------------
+def executer_import_it(job, filepath, log_path):
+    """Lit le fichier, insère projets et valeurs métier ; retourne (message, catégorie flash)."""
+    import pandas as pd
+    from utils.excel_stream import LecteurBlocsProjets
+    # 📖 Lecture Excel (en flux : les blocs sont produits au fil de la lecture)
+    try:
+        lecteur = LecteurBlocsProjets(filepath, normaliser=normalize_text)
+    except Exception as e:
         with open(log_path, "w", encoding="utf-8") as debug:
-            debug.write("=== DEBUG IMPORT IT ===\n\n")
-
-            # ------------------------------------------------------------
-            # 🧩 Normalisation colonnes
-            # ------------------------------------------------------------
-            df.columns = [normalize_text(c) for c in df.columns]
-            debug.write(f"🔎 Colonnes normalisées : {df.columns.tolist()}\n\n")
-
-            required = [
-                "ref ogp",
-                "nomencalture du projet",
-                "description du projet",
-                "date de mep prevue",
-            ]
-            missing = [r for r in required if r not in df.columns]
-            if missing:
-                flash(f"❌ Colonnes manquantes : {', '.join(missing)}", "error")
-                debug.write(f"❌ Colonnes manquantes : {missing}\n")
-                return redirect(url_for("import_excel_it.import_excel_it"))
-
-            # ------------------------------------------------------------
-            # 🧠 Détection des blocs projet (1 projet = 3 lignes)
-            # ------------------------------------------------------------
-            projects = []
-            i = 0
-            while i < len(df):
-                ref = str(df.iloc[i].get("ref ogp", "")).strip()
-                if ref and ref.lower() != "nan":
-                    projects.append(df.iloc[i:i + 3])
-                    i += 3
+            debug.write(f"❌ Erreur de lecture Excel : {e}\n")
+        return f"❌ Erreur de lecture Excel : {e}", "error"
+
+    # Log écrit ligne par ligne : lisible pendant le job via /jobs/<id>/log
+    with open(log_path, "w", encoding="utf-8", buffering=1) as debug:
+        debug.write("=== DEBUG IMPORT IT ===\n\n")
+
+        # ------------------------------------------------------------
+        # 🧩 Normalisation colonnes
+        # ------------------------------------------------------------
+        colonnes = lecteur.colonnes
+        debug.write(f"🔎 Colonnes normalisées : {colonnes}\n\n")
+
+        required = [
+            "ref ogp",
+            "nomencalture du projet",
+            "description du projet",
+            "date de mep prevue",
+        ]
+        missing = [r for r in required if r not in colonnes]
+        if missing:
+            lecteur.fermer()
+            debug.write(f"❌ Colonnes manquantes : {missing}\n")
+            return f"❌ Colonnes manquantes : {', '.join(missing)}", "error"
+
+        job.progression(total=lecteur.total_lignes or 0, force=True)
+
+        # ------------------------------------------------------------
+        # 💾 Insertion des projets + valeurs métier
+        # ------------------------------------------------------------
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute("PRAGMA foreign_keys = ON")
+
+        # Charger toutes les valeurs métier
+        vm = pd.read_sql_query(
+            "SELECT id, libelle, type_libelle, valeur_libelle FROM valeur_metier",
+            conn,
+        )
+        for col in ["libelle", "type_libelle", "valeur_libelle"]:
+            vm[col] = vm[col].astype(str).apply(normalize_text)
+        # Index construit une fois, réutilisé pour toutes les lignes
+        vm = IndexValeursMetier(vm.itertuples(index=False, name=None))
+        debug.write(f"📚 {len(vm)} valeurs métier chargées.\n\n")
+
+        inserted_count = 0
+        total_links = 0
+
+        # 🧠 Blocs projet (1 projet = 3 lignes) traités dès leur lecture
+        for p_idx, chunk in enumerate(lecteur, start=1):
+            job.progression(lues=lecteur.lignes_lues, inserees=inserted_count, rejetees=p_idx - 1 - inserted_count)
+            meta = chunk.iloc[0]
+            ref_opg = str(meta.get("ref ogp", "")).strip()
+            titre = str(meta.get("nomencalture du projet", "")).strip()
+            desc = str(meta.get("description du projet", "")).strip()
+
+            # ✅ Conversion de la date Excel
+            date_raw = meta.get("date de mep prevue")
+            if pd.notna(date_raw):
+                if isinstance(date_raw, pd.Timestamp):
+                    date_mep = date_raw.strftime("%Y-%m-%d")
                 else:
-                    i += 1
-            debug.write(f"📊 {len(projects)} blocs projet détectés.\n\n")
-
-            if not projects:
-                flash("❌ Aucun projet détecté dans le fichier.", "error")
-                debug.write("❌ Aucun bloc projet détecté.\n")
-                return redirect(url_for("import_excel_it.import_excel_it"))
-
-            # ------------------------------------------------------------
-            # 💾 Insertion des projets + valeurs métier
-            # ------------------------------------------------------------
-            conn = get_db()
-            cur = conn.cursor()
-            cur.execute("PRAGMA foreign_keys = ON")
-
-            # Charger toutes les valeurs métier
-            vm = pd.read_sql_query(
-                "SELECT id, libelle, type_libelle, valeur_libelle FROM valeur_metier",
-                conn,
-            )
-            for col in ["libelle", "type_libelle", "valeur_libelle"]:
-                vm[col] = vm[col].astype(str).apply(normalize_text)
-            debug.write(f"📚 {len(vm)} valeurs métier chargées.\n\n")
-
-            inserted_count = 0
-            total_links = 0
-
-            for p_idx, chunk in enumerate(projects, start=1):
-                meta = chunk.iloc[0]
-                ref_opg = str(meta.get("ref ogp", "")).strip()
-                titre = str(meta.get("nomencalture du projet", "")).strip()
-                desc = str(meta.get("description du projet", "")).strip()
-
-                # ✅ Conversion de la date Excel
-                date_raw = meta.get("date de mep prevue")
-                if pd.notna(date_raw):
-                    if isinstance(date_raw, pd.Timestamp):
-                        date_mep = date_raw.strftime("%Y-%m-%d")
-                    else:
-                        date_mep = str(date_raw)
-                else:
-                    date_mep = None
+                    date_mep = str(date_raw)
+            else:
+                date_mep = None
+
+            debug.write(f"\n--- Projet {p_idx} : {titre} ({ref_opg}) ---\n")
+
+            # 🔹 Insertion du projet
+            try:
+                cur.execute(
+                    """
+                    INSERT INTO Projet (ref_opg, titre_projet, description, date_mep, idate,type)
+                    VALUES (?, ?, ?, ?, DATETIME('now'),'it')
+                    """,
+                    (ref_opg, titre, desc, date_mep),
+                )
+                conn.commit()
+                id_projet = cur.lastrowid
+                inserted_count += 1
+            except Exception as e:
+                conn.rollback()  # rend le verrou d'écriture avant le bloc suivant
+                debug.write(f"❌ Erreur insertion projet : {e}\n")
+                continue
+
+            # --------------------------------------------------------
+            # 🔍 Lecture des valeurs métier
+            # --------------------------------------------------------
+            for col in colonnes:
+                if col in required or col in ["nom du departement", "type de la demande"]:
+                    continue
+
+                # ligne 0 → type (texte)
+                # ligne 2 → valeur (numérique)
+                type_vals = [
+                    str(v).strip()
+                    for v in chunk.iloc[0:1][col].tolist()
+                    if str(v).strip() and str(v).strip().lower() != "nan"
+                ]
 
-                debug.write(f"\n--- Projet {p_idx} : {titre} ({ref_opg}) ---\n")
+                valeur_vals = [
+                    str(v).strip()
+                    for v in chunk.iloc[2:3][col].tolist()
+                    if str(v).strip() and str(v).strip().lower() != "nan"
+                ]
 
-                # 🔹 Insertion du projet
-                try:
+                type_libelle = " ".join(type_vals)
+                valeur_libelle = " ".join(valeur_vals)
+
+                lib_n = normalize_text(col)
+                type_n = normalize_text(type_libelle)
+                val_n = normalize_text(valeur_libelle)
+
+                if not type_n and not val_n:
+                    continue
+
+                # Recherche exacte, puis floue si rien trouvé
+                vm_id = vm.trouver(lib_n, type_n, val_n)
+
+                if vm_id is not None:
                     cur.execute(
                         """
-                        INSERT INTO Projet (ref_opg, titre_projet, description, date_mep, idate,type)
-                        VALUES (?, ?, ?, ?, DATETIME('now'),'it')
+                        INSERT OR IGNORE INTO valeur_metier_projet (id_projet, id_valeur_metier, idate)
+                        VALUES (?, ?, DATETIME('now'))
                         """,
-                        (ref_opg, titre, desc, date_mep),
+                        (id_projet, vm_id),
                     )
-                    conn.commit()
-                    id_projet = cur.lastrowid
-                    inserted_count += 1
-                except Exception as e:
-                    debug.write(f"❌ Erreur insertion projet : {e}\n")
-                    continue
+                    total_links += 1
+                    debug.write(f"🟩 match valeur_metier id={vm_id}\n")
+                else:
+                    debug.write(f"❌ Aucun match pour {col}\n")
 
-                # --------------------------------------------------------
-                # 🔍 Lecture des valeurs métier
-                # --------------------------------------------------------
-                for col in df.columns:
-                    if col in required or col in ["nom du departement", "type de la demande"]:
-                        continue
-
-                    # ligne 0 → type (texte)
-                    # ligne 2 → valeur (numérique)
-                    type_vals = [
-                        str(v).strip()
-                        for v in chunk.iloc[0:1][col].tolist()
-                        if str(v).strip() and str(v).strip().lower() != "nan"
-                    ]
-
-                    valeur_vals = [
-                        str(v).strip()
-                        for v in chunk.iloc[2:3][col].tolist()
-                        if str(v).strip() and str(v).strip().lower() != "nan"
-                    ]
-
-                    type_libelle = " ".join(type_vals)
-                    valeur_libelle = " ".join(valeur_vals)
-
-                    lib_n = normalize_text(col)
-                    type_n = normalize_text(type_libelle)
-                    val_n = normalize_text(valeur_libelle)
-
-                    if not type_n and not val_n:
-                        continue
-
-                    # Recherche exacte
-                    match = vm[
-                        vm.apply(
-                            lambda r: (
-                                r["libelle"] == lib_n
-                                and (r["type_libelle"] == type_n or not type_n)
-                                and (r["valeur_libelle"] == val_n or not val_n)
-                            ),
-                            axis=1,
-                        )
-                    ]
-
-                    # Recherche floue si rien trouvé
-                    if match.empty:
-                        match = vm[
-                            vm.apply(
-                                lambda r: (
-                                    similar(r["libelle"], lib_n)
-                                    and (not type_n or similar(r["type_libelle"], type_n))
-                                    and (not val_n or similar(r["valeur_libelle"], val_n))
-                                ),
-                                axis=1,
-                            )
-                        ]
-
-                    if not match.empty:
-                        vm_id = int(match.iloc[0]["id"])
-                        cur.execute(
-                            """
-                            INSERT OR IGNORE INTO valeur_metier_projet (id_projet, id_valeur_metier, idate)
-                            VALUES (?, ?, DATETIME('now'))
-                            """,
-                            (id_projet, vm_id),
-                        )
-                        total_links += 1
-                        debug.write(f"🟩 match valeur_metier id={vm_id}\n")
-                    else:
-                        debug.write(f"❌ Aucun match pour {col}\n")
+            conn.commit()
 
-                conn.commit()
+        job.progression(total=lecteur.lignes_lues, lues=lecteur.lignes_lues, inserees=inserted_count,
+                        rejetees=lecteur.nb_blocs - inserted_count, force=True)
+        debug.write(f"📊 {lecteur.nb_blocs} blocs projet détectés.\n\n")
 
-            debug.write(f"\n✅ Import terminé : {inserted_count} projets, {total_links} liens créés.\n")
+        if not lecteur.nb_blocs:
+            debug.write("❌ Aucun bloc projet détecté.\n")
+            return "❌ Aucun projet détecté dans le fichier.", "error"
 
-        flash(f"✅ Import terminé : {inserted_count} projets, {total_links} liens créés.", "success")
-        return redirect(url_for("projet.liste_projets"))
+        debug.write(f"\n✅ Import terminé : {inserted_count} projets, {total_links} liens créés.\n")
 
-    return render_template("import_excel_it.html")
+    return f"✅ Import terminé : {inserted_count} projets, {total_links} liens créés.", "success"
@@ -0,0 +1,110 @@
+# routes/jobs_routes.py
+import os
+import time
+
+from flask import Blueprint, Response, jsonify, redirect, render_template, request, url_for
+
+from services.jobs import STATUTS_FINIS, lire
+from utils.auth_utils import est_admin, jwt_requete
+
+# ------------------------------------------------------------
+# 📦 Blueprint : suivi des jobs d'import en arrière-plan
+# ------------------------------------------------------------
+jobs_bp = Blueprint("jobs", __name__, url_prefix="/jobs")
+
+INTERVALLE_LOG = 0.5  # secondes entre deux lectures du log pendant le job
+DUREE_MAX_LOG = 300  # secondes ; au-delà le flux est coupé, le client reprend à ?offset=
+
+
+def reponse_job(job_id):
+    """
+    Réponse d'un upload : JSON 202 avec l'id du job si le client le demande,
+    sinon redirection vers la page de suivi.
+    """
+    if request.accept_mimetypes.best_match(["text/html", "application/json"]) == "application/json":
+        return jsonify({
+            "job_id": job_id,
+            "status_url": url_for("jobs.statut_job", job_id=job_id),
+            "log_url": url_for("jobs.log_job", job_id=job_id),
+        }), 202
+    return redirect(url_for("jobs.suivi_job", job_id=job_id))
+
+
+def lire_autorise(job_id):
+    """
+    Job visible par l'utilisateur courant : celui qu'il a lancé (tous pour
+    un admin). Le log contient les données importées. None sinon.
+    """
+    job = lire(job_id)
+    if job and (est_admin() or (job["iuser"] and job["iuser"] == jwt_requete()[0])):
+        return job
+    return None
+
+
+# ------------------------------------------------------------
+# 📊 État du job (JSON, interrogé par la page de suivi)
+# ------------------------------------------------------------
+@jobs_bp.route("/<job_id>")
+def statut_job(job_id):
+    job = lire_autorise(job_id)
+    if not job:
+        return jsonify({"error": "job introuvable"}), 404
+    return jsonify({
+        "id": job["id"],
+        "type": job["type"],
+        "statut": job["statut"],
+        "termine": job["statut"] in STATUTS_FINIS,
+        "fichier": job["fichier"],
+        "total": job["total"],
+        "lignes_lues": job["lignes_lues"],
+        "lignes_inserees": job["lignes_inserees"],
+        "lignes_rejetees": job["lignes_rejetees"],
+        "message": job["message"],
+        "categorie": job["categorie"],
+        "redirection": job["redirection"],
+        "log_url": url_for("jobs.log_job", job_id=job_id),
+        "idate": job["idate"],
+        "udate": job["udate"],
+    })
+
+
+# ------------------------------------------------------------
+# 📜 Log du job diffusé au fil de l'eau (text/plain)
+# ------------------------------------------------------------
+@jobs_bp.route("/<job_id>/log")
+def log_job(job_id):
+    job = lire_autorise(job_id)
+    if not job:
+        return jsonify({"error": "job introuvable"}), 404
+    log_path = job["log_path"]
+    position = request.args.get("offset", 0, type=int)
+
+    def generer():
+        pos = position
+        fin = time.monotonic() + DUREE_MAX_LOG
+        while True:
+            fini = (lire(job_id) or {}).get("statut") in STATUTS_FINIS
+            if log_path and os.path.exists(log_path):
+                with open(log_path, "rb") as f:
+                    f.seek(pos)
+                    morceau = f.read()
+                if morceau:
+                    pos += len(morceau)
+                    yield morceau
+            if fini or time.monotonic() >= fin:
+                return
+            time.sleep(INTERVALLE_LOG)
+
+    return Response(generer(), mimetype="text/plain; charset=utf-8",
+                    headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"})
+
+
+# ------------------------------------------------------------
+# 🖥️ Page de suivi (barre de progression + log)
+# ------------------------------------------------------------
+@jobs_bp.route("/<job_id>/suivi")
+def suivi_job(job_id):
+    job = lire_autorise(job_id)
+    if not job:
+        return render_template("job_suivi.html", job=None), 404
+    return render_template("job_suivi.html", job=job)
@@ -122,26 +122,28 @@ def modifier_profil(id):
 # ===============================
 # 📌 Supprimer un profil (+ suppression en cascade manuelle)
 # 📌 Suppression avec détection automatique des dépendances réelles
+TABLES_DEPENDANTES_PROFIL = {
+    "collaborateurs": "Collaborateurs",
+    "disponibilites": "Disponibilités",
+    "phase_profils_programme": "Phases / Profils Programme",
+    "hypotheses_profils": "Hypothèses Profils",
+    "profil_hypotheses": "Profils Hypothèses",
+    "programme_profil_hypotheses": "Programmes / Profils / Hypothèses",
+    "programme_profils": "Programmes Profils"
+}
+SQL_DEPENDANCES_PROFIL = "SELECT COUNT(*) AS total FROM {table} WHERE profil_id = ?"
+
+
 @profils_bp.route("/supprimer/<int:id>", methods=["POST"])
 def supprimer_profil(id):
     conn = get_db()
     cur = conn.cursor()
 
-    tables_dependantes = {
-        "collaborateurs": "Collaborateurs",
-        "disponibilites": "Disponibilités",
-        "phase_profils_programme": "Phases / Profils Programme",
-        "hypotheses_profils": "Hypothèses Profils",
-        "profil_hypotheses": "Profils Hypothèses",
-        "programme_profil_hypotheses": "Programmes / Profils / Hypothèses",
-        "programme_profils": "Programmes Profils"
-    }
-
     dependances_trouvees = []
 
-    for table, label in tables_dependantes.items():
+    for table, label in TABLES_DEPENDANTES_PROFIL.items():
         try:
-            result = query_db(f"SELECT COUNT(*) AS total FROM {table} WHERE profil_id = ?", [id], one=True)
+            result = query_db(SQL_DEPENDANCES_PROFIL.format(table=table), [id], one=True)
             if result and result["total"] > 0:
                 dependances_trouvees.append(f"{label} ({result['total']})")
         except Exception:
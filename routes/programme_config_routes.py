@@ -1,7 +1,5 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, send_file
 from utils.db_utils import query_db, get_db
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
 from flask import send_file
 import io
 programme_config_bp = Blueprint("programme_config", __name__, url_prefix="/programme_config")
@@ -257,14 +255,17 @@ def supprimer_profil(id):
 # ============================================================== #
 # 🔹 PROJETS (UPDATE sur Projet)
 # ============================================================== #
+SQL_PROJETS_PROGRAMME = """
+    SELECT id, titre_projet
+    FROM Projet
+    WHERE id_programme = ?
+    ORDER BY id DESC
+"""
+
+
 @programme_config_bp.route("/get_projets/<int:programme_id>")
 def get_projets(programme_id):
-    projets = query_db("""
-        SELECT id, titre_projet
-        FROM Projet
-        WHERE id_programme = ?
-        ORDER BY id DESC
-    """, [programme_id])
+    projets = query_db(SQL_PROJETS_PROGRAMME, [programme_id])
     return jsonify([dict(r) for r in projets])
 
 
@@ -362,6 +363,8 @@ def tableau_charges(programme_id):
 
 @programme_config_bp.route("/exporter_tableau_charges/<int:programme_id>")
 def exporter_tableau_charges(programme_id):
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
     # 🔹 Récupération des phases
     phases = query_db("""
         SELECT f.nom AS phase, ph.poids
@@ -3,6 +3,7 @@ import sqlite3
 import uuid
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from utils.db_utils import query_db, execute_db
+from services.caf_requise_semaine import rafraichir_projet
 
 programmes_bp = Blueprint('programmes', __name__, url_prefix='/programmes')
 
@@ -130,6 +131,15 @@ def gerer_programme(id):
 
 
 # ✅ 4. Gérer les projets d'un programme
+SQL_PROJETS_PROGRAMME = """
+    SELECT p.id, p.titre, p.description, p.date_mep, p.statut, p.score_wsjf, c.nom AS categorie_nom
+    FROM projets p
+    LEFT JOIN categorie c ON p.categorie_id = c.id
+    WHERE p.programme_id = ?
+    ORDER BY p.score_wsjf DESC
+"""
+
+
 @programmes_bp.route('/<int:id>/projets')
 def gerer_projets(id):  # ✅ Renommé ici
     # Récupérer le programme
@@ -139,13 +149,7 @@ def gerer_projets(id):  # ✅ Renommé ici
         return redirect(url_for('priorites'))
 
     # Récupérer les projets liés au programme
-    projets = query_db("""
-        SELECT p.id, p.titre, p.description, p.date_mep, p.statut, p.score_wsjf, c.nom AS categorie_nom
-        FROM projets p
-        LEFT JOIN categorie c ON p.categorie_id = c.id
-        WHERE p.programme_id = ?
-        ORDER BY p.score_wsjf DESC
-    """, [id])
+    projets = query_db(SQL_PROJETS_PROGRAMME, [id])
 
     return render_template(
         'programmes/gerer_projets.html',
@@ -224,6 +228,7 @@ def modifier_projet(id):
                                       statut = ?, categorie_id = ?
                     WHERE id = ?
                 """, [titre, description, date_mep, statut, categorie_id, str(id)])
+                rafraichir_projet(str(id))
                 flash("✅ Projet mis à jour", "success")
                 return redirect(url_for('programmes.gerer_projets', id=programme_id))
             except Exception as e:
@@ -246,6 +251,7 @@ def supprimer_projet(id):
     else:
         try:
             execute_db("DELETE FROM projets WHERE id = ?", [str(id)])
+            rafraichir_projet(str(id))
             flash("🗑️ Projet supprimé", "success")
         except Exception as e:
             flash(f"❌ Erreur : {e}", "danger")
@@ -297,6 +303,7 @@ def gerer_phases_projet(programme_id, projet_id):
                 except Exception as e:
                     flash(f"❌ Erreur pour la phase {phase_id}: {e}", "danger")
 
+        rafraichir_projet(projet_id_str)
         flash("✅ Phases mises à jour", "success")
         return redirect(url_for('programmes.gerer_phases_projet', programme_id=programme_id, projet_id=projet_id))
 
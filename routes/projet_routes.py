@@ -5,23 +5,29 @@ import sqlite3
 from datetime import datetime, timedelta
 from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
 from utils.db_utils import query_db, get_db
+from utils.pagination import paginer
+from utils.search_utils import filtre_fts
+from utils.referentiel import referentiel, referentiels
 from utils.calcul_utils import calculer_charge_estimee
+from services.caf_requise_semaine import rafraichir_projet
+from services.priorites import reclasser_plus_tard
+from services.criteres_projet import charger_criteres, enregistrer_criteres
 
 projet_bp = Blueprint("projet", __name__, url_prefix="/projet")
 
+TABLES_LISTE_PROJETS = ("Projet", "programme", "domaines", "categorie", "statut")
+TABLES_LISTE_DEMANDES = ("Projet", "programme", "domaines", "categorie", "statut_demande")
+
 
 # ==========================================
 # Liste des projets
 # ==========================================
-@projet_bp.route("/liste")
-def liste_projets():
-    page = request.args.get("page", 1, type=int)
-    per_page = 10
-    offset = (page - 1) * per_page
-    search = request.args.get("q", "").strip()
-    incomplets = request.args.get("incomplets", False, type=bool)
+def requete_liste_projets(search="", incomplets=False):
+    """(requête, paramètres, tri) des projets retenus ; plans contrôlés par benchmarks/check_query_plans.py."""
+    # 🔍 Recherche plein texte (titre, programme) classée par pertinence
+    jointure_fts, rang, args = filtre_fts("projet_fts", "p.id", search, colonnes=("titre", "programme"))
 
-    base_query = """
+    base_query = f"""
         SELECT 
             p.id,
             p.titre_projet AS titre,
@@ -32,8 +38,10 @@ def liste_projets():
             IFNULL(s.nom, '-') AS statut,
             IFNULL(p.score_complexite, 0) AS score_complexite,
             IFNULL(p.estimation_jh, 0) AS estimation_jh,
-            IFNULL(p.date_mep, '-') AS date_mep
+            IFNULL(p.date_mep, '-') AS date_mep,
+            {rang} AS rang
         FROM Projet p
+        {jointure_fts}
         LEFT JOIN programme prog ON prog.id = p.id_programme
         LEFT JOIN domaines d ON d.id = p.id_domaine
         LEFT JOIN categorie cat ON cat.id = p.id_categorie
@@ -41,39 +49,44 @@ def liste_projets():
         WHERE (p.type IS NULL OR p.type != 'it')
           AND p.retenue = 1
     """
-    args = []
-
-    if search:
-        base_query += " AND (p.titre_projet LIKE ? OR prog.nom LIKE ?)"
-        args.extend([f"%{search}%", f"%{search}%"])
 
     if incomplets:
         base_query += " AND (p.id_programme IS NULL OR p.id_domaine IS NULL)"
 
-    total = query_db(f"SELECT COUNT(*) as count FROM ({base_query})", args, one=True)["count"]
-    projets = query_db(f"{base_query} ORDER BY p.id DESC LIMIT ? OFFSET ?", args + [per_page, offset])
-    total_pages = (total // per_page) + (1 if total % per_page else 0)
+    tri = [("rang", "ASC"), ("-id", "ASC")] if jointure_fts else [("id", "DESC")]
+    return base_query, args, tri
+
+
+@projet_bp.route("/liste")
+def liste_projets():
+    page = request.args.get("page", 1, type=int)
+    per_page = 10
+    search = request.args.get("q", "").strip()
+    incomplets = request.args.get("incomplets", False, type=bool)
+
+    base_query, args, tri = requete_liste_projets(search, incomplets)
+    pagination = paginer(
+        base_query, args, tri=tri, page=page, per_page=per_page,
+        apres=request.args.get("apres"), tables=TABLES_LISTE_PROJETS
+    )
 
     return render_template(
         "projets_liste.html",
-        projets=projets,
+        projets=pagination.items,
         page=page,
-        total_pages=total_pages,
+        total_pages=pagination.total_pages,
+        next_cursor=pagination.next_cursor,
         search=search,
         incomplets=incomplets
     )
 
 
-@projet_bp.route("/liste_demandes")
-def liste_demandes():
-    page = request.args.get("page", 1, type=int)
-    per_page = 10
-    offset = (page - 1) * per_page
-    search = request.args.get("q", "").strip()
-    incomplets = request.args.get("incomplets", False, type=bool)
-    retenue_filter = request.args.get("retenue", "").strip().lower()
+def requete_liste_demandes(search="", incomplets=False, retenue_filter=""):
+    """(requête, paramètres, tri) des demandes ; plans contrôlés par benchmarks/check_query_plans.py."""
+    # 🔍 Recherche plein texte (titre, programme, domaine) classée par pertinence
+    jointure_fts, rang, args = filtre_fts("projet_fts", "p.id", search)
 
-    base_query = """
+    base_query = f"""
         SELECT 
             p.id,
             p.titre_projet AS titre,
@@ -85,21 +98,16 @@ def liste_demandes():
             IFNULL(p.score_complexite, 0) AS score_complexite,
             IFNULL(p.estimation_jh, 0) AS estimation_jh,
             IFNULL(p.date_mep, '-') AS date_mep,
-            p.retenue
+            p.retenue,
+            {rang} AS rang
         FROM Projet p
+        {jointure_fts}
         LEFT JOIN programme prog ON prog.id = p.id_programme
         LEFT JOIN domaines d ON d.id = p.id_domaine
         LEFT JOIN categorie cat ON cat.id = p.id_categorie
         LEFT JOIN statut_demande s ON s.id = p.retenue
         WHERE (p.type IS NULL OR p.type != 'it')
     """
-    args = []
-
-    # 🔍 Recherche
-    if search:
-        base_query += " AND (p.titre_projet LIKE ? OR prog.nom LIKE ? OR d.nom LIKE ?)"
-        like = f"%{search}%"
-        args.extend([like, like, like])
 
     # ⚠️ Filtre incomplets
     if incomplets:
@@ -113,17 +121,32 @@ def liste_demandes():
     elif retenue_filter == "null":
         base_query += " AND p.retenue IS NULL"
 
-    # 📄 Pagination
-    total = query_db(f"SELECT COUNT(*) as count FROM ({base_query})", args, one=True)["count"]
-    projets = query_db(f"{base_query} ORDER BY p.id DESC LIMIT ? OFFSET ?", args + [per_page, offset])
-    total_pages = (total // per_page) + (1 if total % per_page else 0)
+    # 📄 Pagination (curseur « apres » pour la page suivante)
+    tri = [("rang", "ASC"), ("-id", "ASC")] if jointure_fts else [("id", "DESC")]
+    return base_query, args, tri
+
+
+@projet_bp.route("/liste_demandes")
+def liste_demandes():
+    page = request.args.get("page", 1, type=int)
+    per_page = 10
+    search = request.args.get("q", "").strip()
+    incomplets = request.args.get("incomplets", False, type=bool)
+    retenue_filter = request.args.get("retenue", "").strip().lower()
+
+    base_query, args, tri = requete_liste_demandes(search, incomplets, retenue_filter)
+    pagination = paginer(
+        base_query, args, tri=tri, page=page, per_page=per_page,
+        apres=request.args.get("apres"), tables=TABLES_LISTE_DEMANDES
+    )
 
     # 🔁 Rendu HTML
     return render_template(
         "liste_demandes.html",
-        projets=projets,
+        projets=pagination.items,
         page=page,
-        total_pages=total_pages,
+        total_pages=pagination.total_pages,
+        next_cursor=pagination.next_cursor,
         search=search,
         incomplets=incomplets,
         retenue_filter=retenue_filter
@@ -183,10 +206,7 @@ def modifier_projet(projet_id):
         ORDER BY nom
     """)
     # --- Données de référence ---
-    programmes = query_db("SELECT id, nom FROM programme ORDER BY nom")
-    domaines = query_db("SELECT id, nom FROM domaines ORDER BY nom")
-    categories = query_db("SELECT id, nom FROM categorie ORDER BY nom")
-    statuts = query_db("SELECT id, nom FROM statut ORDER BY nom")
+    programmes, domaines, categories, statuts = referentiels("programmes", "domaines", "categories", "statuts")
 
 
 
@@ -251,6 +271,7 @@ def modifier_projet(projet_id):
                                 p["phase_id"]
                             ))
                         conn.commit()
+                        rafraichir_projet(projet_id)
                         flash("🔁 Dates des phases réajustées selon la nouvelle date MEP et la charge estimée.", "info")
 
                 # ❌ Sinon, on ne fait rien
@@ -280,31 +301,7 @@ def update_all_complexites(projet_id):
     cur = conn.cursor()
 
     # --- Mise à jour des complexités ---
-    libelles_complexite = query_db("SELECT DISTINCT libelle FROM complexite WHERE libelle <> ''")
-    for l in libelles_complexite:
-        lib = l["libelle"]
-        valeur_id = request.form.get(f"complexite_{lib}")
-        if not valeur_id:
-            continue
-
-        existing = query_db("""
-            SELECT cp.id_complexite FROM complexite_projet cp
-            JOIN complexite c ON c.id = cp.id_complexite
-            WHERE cp.id_projet = ? AND c.libelle = ?
-        """, [projet_id, lib], one=True)
-
-        if existing:
-            cur.execute("""
-                UPDATE complexite_projet
-                SET id_complexite = ?, udate = DATETIME('now'), uuser = 1
-                WHERE id_projet = ? AND id_complexite = ?
-            """, (valeur_id, projet_id, existing["id_complexite"]))
-        else:
-            cur.execute("""
-                INSERT INTO complexite_projet (id_projet, id_complexite, idate, iuser)
-                VALUES (?, ?, DATETIME('now'), 1)
-            """, (projet_id, valeur_id))
-    conn.commit()
+    enregistrer_criteres(projet_id, "complexite", request.form)
 
     # --- Recalcul du score total ---
     score_complexite = query_db("""
@@ -334,6 +331,8 @@ def update_all_complexites(projet_id):
     """, (score_complexite, estimation_jh, projet_id))
     conn.commit()
 
+    rafraichir_projet(projet_id)
+
     flash(f"✅ Complexités mises à jour (Score={score_complexite}, Estimation={estimation_jh} JH)", "success")
     return redirect(url_for("projet.modifier_projet", projet_id=projet_id))
 
@@ -391,6 +390,8 @@ def update_phases_dates(projet_id):
         else:
             flash("⚠️ Dates mises à jour, mais estimation non recalculée (informations incomplètes).", "warning")
 
+        rafraichir_projet(projet_id)
+
     except Exception as e:
         conn.rollback()
         flash(f"❌ Erreur lors de la mise à jour des phases : {e}", "error")
@@ -468,6 +469,7 @@ def phases_programme(programme_id):
             })
 
         conn.commit()
+        rafraichir_projet(projet_id)
 
         return jsonify({
             "success": True,
@@ -558,6 +560,7 @@ def supprimer_projet(projet_id):
     cur = conn.cursor()
     cur.execute("DELETE FROM Projet WHERE id = ?", [projet_id])
     conn.commit()
+    rafraichir_projet(projet_id)
     flash("🗑️ Projet supprimé avec succès.", "success")
     return redirect(url_for("projet.liste_projets"))
 
@@ -580,9 +583,7 @@ def modifier_demande(projet_id):
     ancien_score_complexite = demande["score_complexite"]
 
     # --- 🔹 Données de référence
-    programmes = query_db("SELECT id, nom, type FROM programme ORDER BY nom")
-    domaines = query_db("SELECT id, nom FROM domaines ORDER BY nom")
-    statuts = query_db("SELECT id, nom FROM statut_demande WHERE nom IN ('Retenu','Non Retenue') ORDER BY nom")
+    programmes, domaines, statuts = referentiels("programmes", "domaines", "statuts_retenue")
 
     statut_demande = query_db("""
         SELECT p.*, s.nom AS nom_statut_demande
@@ -592,41 +593,21 @@ def modifier_demande(projet_id):
     """, [projet_id], one=True)
 
     # --- 🔹 Complexités disponibles
-    libelles_complexite = query_db("""
-        SELECT DISTINCT libelle FROM complexite
-        WHERE libelle IS NOT NULL AND libelle <> ''
-        ORDER BY libelle
-    """)
+    libelles_complexite = referentiel("libelles_complexite")
 
+    complexites_choisies = charger_criteres(projet_id)["complexite"]
     complexites = []
     for l in libelles_complexite:
         lib = l["libelle"]
-        valeur_existante = query_db("""
-            SELECT c.id AS id_complexite, c.libelle, c.type_libelle, c.valeur_libelle
-            FROM complexite_projet cp
-            JOIN complexite c ON c.id = cp.id_complexite
-            WHERE cp.id_projet = ? AND c.libelle = ?
-            LIMIT 1
-        """, [projet_id, lib], one=True)
-        if valeur_existante:
-            complexites.append(valeur_existante)
-        else:
-            complexites.append({
-                "libelle": lib,
-                "id_complexite": None,
-                "type_libelle": None,
-                "valeur_libelle": None
-            })
+        choix = complexites_choisies.get(lib)
+        complexites.append({
+            "libelle": lib,
+            "id_complexite": choix["id_critere"] if choix else None,
+            "type_libelle": choix["type_libelle"] if choix else None,
+            "valeur_libelle": choix["valeur_libelle"] if choix else None
+        })
 
-    complexite_possibles = query_db("""
-        SELECT DISTINCT libelle, id, type_libelle, valeur_libelle
-        FROM complexite
-        WHERE type_libelle IS NOT NULL AND type_libelle <> ''
-        ORDER BY id
-    """)
-    dropdowns_complexite = {}
-    for c in complexite_possibles:
-        dropdowns_complexite.setdefault(c["libelle"], []).append(dict(c))
+    dropdowns_complexite = referentiel("dropdowns_complexite")
 
     # --- 🔹 Enregistrement
     if request.method == "POST":
@@ -719,6 +700,7 @@ def modifier_demande(projet_id):
         else:
             flash("ℹ️ Aucune modification détectée sur le domaine ou la complexité — pas de recalcul.", "info")
 
+        rafraichir_projet(projet_id)
         return redirect(url_for("projet.modifier_demande", projet_id=projet_id))
 
     # --- 🔹 Affichage du template
@@ -739,50 +721,10 @@ def update_all_complexites_demande(projet_id):
     cur = conn.cursor()
 
 
-    # --- 🔹 Récupération des complexités
-    libelles_complexite = query_db("SELECT DISTINCT libelle FROM complexite WHERE libelle <> ''")
-    nb_total = len(libelles_complexite)
-    nb_remplies = 0
-    toutes_remplies = True
-    changements = False
-
-    for l in libelles_complexite:
-        lib = l["libelle"]
-        valeur_id = request.form.get(f"complexite_{lib}")
-
-        if not valeur_id:
-            toutes_remplies = False
-            continue
-        else:
-            nb_remplies += 1
-
-        # Vérifie si déjà présent
-        existing = query_db("""
-            SELECT cp.id_complexite 
-            FROM complexite_projet cp
-            JOIN complexite c ON c.id = cp.id_complexite
-            WHERE cp.id_projet = ? AND c.libelle = ?
-        """, [projet_id, lib], one=True)
-
-        if existing:
-            if str(existing["id_complexite"]) != str(valeur_id):
-                changements = True
-                cur.execute("""
-                    UPDATE complexite_projet
-                    SET id_complexite = ?, udate = DATETIME('now'), uuser = 1
-                    WHERE id_projet = ? AND id_complexite = ?
-                """, (valeur_id, projet_id, existing["id_complexite"]))
-        else:
-            changements = True
-
-            cur.execute("""
-                INSERT INTO complexite_projet (id_projet, id_complexite, idate, iuser)
-                VALUES (?, ?, DATETIME('now'), 1)
-            """, (projet_id, valeur_id))
-
-    conn.commit()
-
-    partiellement_remplies = 0 < nb_remplies < nb_total
+    # --- 🔹 Enregistrement des complexités (seules les réponses modifiées sont écrites)
+    saisie = enregistrer_criteres(projet_id, "complexite", request.form)
+    toutes_remplies = saisie["toutes_remplies"]
+    partiellement_remplies = saisie["partiellement_remplies"]
 
 
     # --- 🔹 Recalcul du score total
@@ -838,6 +780,11 @@ def update_all_complexites_demande(projet_id):
 
     conn.commit()
 
+    # --- 🔹 Mise à jour de la priorité (rangs WSJF du portefeuille, en différé)
+    reclasser_plus_tard()
+
+    rafraichir_projet(projet_id)
+
     flash(f"🔄 Score total = {score_complexite}, Estimation = {estimation_jh} JH", "info")
 
     # ✅ Ce return est OBLIGATOIRE
@@ -856,6 +803,7 @@ def supprimer_demande(projet_id):
         # Puis le projet lui-même
         cur.execute("DELETE FROM Projet WHERE id = ?", [projet_id])
         conn.commit()
+        rafraichir_projet(projet_id)
         flash("✅ Projet supprimé avec succès.", "success")
 
     except sqlite3.IntegrityError:
@@ -972,22 +920,28 @@ def toggle_retenue(projet_id):
         else:
             flash("⚠️ Impossible de calculer les phases — programme, estimation JH ou MEP manquants.", "warning")
 
+    rafraichir_projet(projet_id)
+
     flash(f"✅ La demande #{projet_id} a été marquée comme {'Retenue' if nouvelle_valeur == 1 else 'Non retenue'}.", "success")
     return redirect(url_for("projet.demandes_retenues"))
 
+# Demandes chiffrées en attente de décision
+SQL_DEMANDES_A_RETENIR = """
+    SELECT 
+        id,
+        titre_projet AS titre,
+        score_complexite,
+        estimation_jh,
+        retenue
+    FROM Projet
+    WHERE id_statut_demande = ?
+    ORDER BY id DESC
+"""
+
+
 @projet_bp.route("/demandes_retenues")
 def demandes_retenues():
     chiffre = query_db("SELECT id FROM statut_demande where nom ='Chiffré'", one=True)
     retenu_id = chiffre["id"]
-    demandes = query_db("""
-            SELECT 
-                id,
-                titre_projet AS titre,
-                score_complexite,
-                estimation_jh,
-                retenue
-            FROM Projet
-            WHERE id_statut_demande = ?
-            ORDER BY id DESC
-        """, [retenu_id])
+    demandes = query_db(SQL_DEMANDES_A_RETENIR, [retenu_id])
     return render_template("liste_demande_a_retenir.html", demandes=demandes)
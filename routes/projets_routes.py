@@ -1,6 +1,7 @@
 # routes/projets_routes.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from utils.db_utils import query_db, execute_db
+from services.caf_requise_semaine import rafraichir_projet
 
 projets_bp = Blueprint('projets', __name__, url_prefix='/projets')
 
@@ -54,6 +55,7 @@ def gerer_phases_projet(programme_id, projet_id):
                 except Exception as e:
                     flash(f"❌ Erreur pour la phase {phase_id}: {e}", "danger")
 
+        rafraichir_projet(projet_id_str)
         flash("✅ Phases mises à jour", "success")
         return redirect(url_for('programmes.gerer_phases_projet', programme_id=programme_id, projet_id=projet_id))
 
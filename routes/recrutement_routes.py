@@ -3,6 +3,7 @@
 # ==========================================
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, make_response
 from utils.db_utils import query_db, execute_db
+from utils.referentiel import referentiels
 from datetime import date
 
 recrutement_bp = Blueprint("recrutement", __name__, url_prefix="/recrutement")
@@ -55,8 +56,7 @@ def liste_recrutement():
         LIMIT ? OFFSET ?
     """, args + [per_page, offset])
 
-    profils = query_db("SELECT id, nom FROM profils ORDER BY nom")
-    sous_domaines = query_db("SELECT id, nom FROM sous_domaine_collaborateur ORDER BY nom")
+    profils, sous_domaines = referentiels("profils", "sous_domaines")
 
     return render_template(
         "recrutement_list.html",
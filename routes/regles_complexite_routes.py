@@ -4,7 +4,8 @@
 from math import ceil
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from utils.db_utils import query_db, get_db
-from utils.calcul_utils import calculer_charge_estimee
+from services.caf_requise_semaine import rafraichir_projets
+from services.reestimation import reestimer_plages
 
 regles_complexite_bp = Blueprint("regles_complexite", __name__, url_prefix="/regles_complexite")
 
@@ -86,31 +87,10 @@ def ajouter_regle():
     """, (fibo, score_min, score_max, valeur_base))
     conn.commit()
 
-    # ✅ Mise à jour automatique des projets impactés par cette nouvelle règle
-    projets = query_db("""
-        SELECT id, score_complexite, id_domaine
-        FROM "Projet"
-        WHERE score_complexite BETWEEN ? AND ?
-    """, [score_min, score_max])
-
-    nb_recalcules = 0
-    for p in projets:
-        score = p["score_complexite"]
-        id_domaine = p["id_domaine"]
-        if not id_domaine or not score:
-            continue
-
-        resultat = calculer_charge_estimee(score, id_domaine)
-        estimation_jh = resultat.get("charge_estimee", 0) if isinstance(resultat, dict) else 0
-
-        cur.execute("""
-            UPDATE "Projet"
-            SET estimation_jh = ?, uuser = 1, udate = DATETIME('now')
-            WHERE id = ?
-        """, (estimation_jh, p["id"]))
-        nb_recalcules += 1
-
-    conn.commit()
+    # ✅ Mise à jour automatique des projets impactés par cette nouvelle règle (un seul UPDATE)
+    resultat = reestimer_plages((score_min, score_max))
+    nb_recalcules = resultat["evalues"]
+    rafraichir_projets([pid for pid, _, _ in resultat["changements"]])
 
     flash(f"✅ Règle ajoutée et {nb_recalcules} projet(s) recalculé(s).", "success")
     return redirect(url_for("regles_complexite.liste_regles"))
@@ -129,6 +109,9 @@ def modifier_regle(id):
     conn = get_db()
     cur = conn.cursor()
 
+    # Ancienne plage : les projets qui en sortent doivent aussi être réestimés
+    ancienne = query_db('SELECT score_min, score_max FROM "regle_complexite" WHERE id = ?', [id], one=True)
+
     cur.execute("""
         UPDATE "regle_complexite"
         SET fibo = ?, score_min = ?, score_max = ?, valeur_base = ?,
@@ -137,31 +120,11 @@ def modifier_regle(id):
     """, (fibo, score_min, score_max, valeur_base, id))
     conn.commit()
 
-    projets = query_db("""
-        SELECT id, score_complexite, id_domaine
-        FROM "Projet"
-        WHERE score_complexite BETWEEN ? AND ?
-    """, [score_min, score_max])
-
-    nb_recalcules = 0
-    for p in projets:
-        score = p["score_complexite"]
-        id_domaine = p["id_domaine"]
-
-        if not id_domaine or not score:
-            continue
-
-        resultat = calculer_charge_estimee(score, id_domaine)
-        estimation_jh = resultat.get("charge_estimee", 0) if isinstance(resultat, dict) else 0
-
-        cur.execute("""
-            UPDATE "Projet"
-            SET estimation_jh = ?, uuser = 1, udate = DATETIME('now')
-            WHERE id = ?
-        """, (estimation_jh, p["id"]))
-        nb_recalcules += 1
-
-    conn.commit()
+    # ✅ Ré-estimation ensembliste des projets de l'ancienne et de la nouvelle plage
+    resultat = reestimer_plages((ancienne["score_min"], ancienne["score_max"]) if ancienne else (None, None),
+                                (score_min, score_max))
+    nb_recalcules = resultat["evalues"]
+    rafraichir_projets([pid for pid, _, _ in resultat["changements"]])
 
     flash(f"♻️ Règle modifiée et {nb_recalcules} projet(s) recalculé(s).", "info")
     return redirect(url_for("regles_complexite.liste_regles"))
@@ -180,30 +143,10 @@ def supprimer_regle(id):
 
         cur.execute('DELETE FROM "regle_complexite" WHERE id = ?', [id])
 
-        projets = query_db("""
-            SELECT id, id_domaine, score_complexite
-            FROM "Projet"
-            WHERE score_complexite BETWEEN ? AND ?
-        """, [score_min, score_max])
-
-        nb_modifies = 0
-        for p in projets:
-            id_domaine = p["id_domaine"]
-            score = p["score_complexite"]
-            if not id_domaine or not score:
-                continue
-
-            resultat = calculer_charge_estimee(score, id_domaine)
-            estimation_jh = resultat.get("charge_estimee", 0) if isinstance(resultat, dict) else 0
-
-            cur.execute("""
-                UPDATE "Projet"
-                SET estimation_jh = ?, uuser = 1, udate = DATETIME('now')
-                WHERE id = ?
-            """, (estimation_jh, p["id"]))
-            nb_modifies += 1
-
-        conn.commit()
+        # ✅ Ré-estimation ensembliste des projets impactés (un seul UPDATE)
+        resultat = reestimer_plages((score_min, score_max))
+        nb_modifies = resultat["evalues"]
+        rafraichir_projets([pid for pid, _, _ in resultat["changements"]])
         flash(f"🗑️ Règle supprimée. ♻️ {nb_modifies} projet(s) réévalué(s).", "success")
 
     except Exception as e:
@@ -0,0 +1,118 @@
+# services/caf_allocator.py
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from utils.calendrier import calendrier
+
+
+# ============================================================
+# 📅 Semaines de l'année (calendrier partagé : utils/calendrier.py)
+# ============================================================
+def semaines_annee(annee):
+    """Ordinaux (date.toordinal) des lundis S1..Sn (tableau partagé, lecture seule)."""
+    return calendrier(annee).debuts
+
+
+@lru_cache(maxsize=8192)
+def date_ordinal(value):
+    """'YYYY-MM-DD' → ordinal (None si la date est absente ou invalide)."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date().toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+# ============================================================
+# 🧱 Préparation des intervalles de phases
+# ============================================================
+def preparer_intervalles(lignes, champ_charge="duree_estimee_jh"):
+    """
+    Convertit les lignes projet × phase × profil en tableaux NumPy.
+
+    Chaque ligne doit exposer date_debut, date_fin, pourcentage, profil_id
+    et la charge totale (`champ_charge`). La charge affectée au profil vaut
+    charge × pourcentage / 100 (pourcentage vide → 100 %). Les lignes dont
+    les dates sont illisibles sont ignorées, comme dans l'ancienne boucle.
+    """
+    debuts, fins, charges, profils = [], [], [], []
+    for ligne in lignes:
+        debut = date_ordinal(ligne["date_debut"])
+        fin = date_ordinal(ligne["date_fin"])
+        if debut is None or fin is None:
+            print(f"⚠️ Erreur parsing projet {ligne['id']} : dates invalides "
+                  f"({ligne['date_debut']} → {ligne['date_fin']})")
+            continue
+        pourcentage = ligne["pourcentage"] or 100
+        debuts.append(debut)
+        fins.append(fin)
+        charges.append((ligne[champ_charge] or 0) * (pourcentage / 100))
+        profils.append(ligne["profil_id"])
+
+    return (
+        np.asarray(debuts, dtype=np.int64),
+        np.asarray(fins, dtype=np.int64),
+        np.asarray(charges, dtype=np.float64),
+        profils,
+    )
+
+
+# ============================================================
+# ⚙️ Allocation hebdomadaire (une seule opération vectorisée)
+# ============================================================
+def allouer(debuts, fins, charges, groupes, nb_groupes, debuts_semaines, arrondi=None):
+    """
+    Répartit la charge de chaque intervalle au prorata des jours qui
+    chevauchent chaque semaine, puis agrège par groupe (profil).
+
+    debuts / fins : ordinaux inclusifs, shape (n,)
+    charges       : JH à répartir sur l'intervalle, shape (n,)
+    groupes       : indice de groupe 0..nb_groupes-1 de chaque intervalle
+    arrondi       : si fourni, chaque part est arrondie avant agrégation
+                    (comportement historique du dashboard)
+
+    Retourne une matrice (nb_groupes, nb_semaines).
+    """
+    nb_semaines = len(debuts_semaines)
+    if len(debuts) == 0 or nb_groupes == 0:
+        return np.zeros((nb_groupes, nb_semaines))
+
+    debuts = debuts[:, None]
+    fins = fins[:, None]
+    ws = debuts_semaines[None, :]
+    we = ws + 6
+
+    jours = np.minimum(fins, we) - np.maximum(debuts, ws) + 1
+    total_jours = fins - debuts + 1
+    valides = (jours > 0) & (total_jours > 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        parts = np.where(valides, charges[:, None] * jours / total_jours, 0.0)
+    if arrondi is not None:
+        parts = np.round(parts, arrondi)
+
+    groupes = np.asarray(groupes, dtype=np.int64)
+    index = (groupes[:, None] * nb_semaines + np.arange(nb_semaines)).ravel()
+    matrice = np.bincount(index, weights=parts.ravel(), minlength=nb_groupes * nb_semaines)
+    return matrice.reshape(nb_groupes, nb_semaines)
+
+
+def charge_par_profil(lignes, annee, profil_ids, champ_charge="duree_estimee_jh", arrondi=None):
+    """
+    Matrice de charge requise profil × semaine pour `annee`.
+
+    Retourne (matrice, autre) : `matrice[i]` correspond à `profil_ids[i]`,
+    `autre` cumule la charge des profils absents de `profil_ids`
+    (profils supprimés).
+    """
+    debuts, fins, charges, profils = preparer_intervalles(lignes, champ_charge)
+    position = {pid: i for i, pid in enumerate(profil_ids)}
+    autre = len(profil_ids)
+    groupes = [position.get(pid, autre) for pid in profils]
+
+    matrice = allouer(
+        debuts, fins, charges, groupes, autre + 1,
+        semaines_annee(annee), arrondi=arrondi
+    )
+    return matrice[:autre], matrice[autre]
@@ -0,0 +1,210 @@
+# services/caf_requise_semaine.py
+import time
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+
+from services.caf_allocator import allouer, preparer_intervalles, semaines_annee
+from utils.db_utils import get_db, query_db
+
+# ============================================================
+# 🗄️ CAF requise matérialisée (profil × semaine)
+#
+# caf_requise_projet  : contribution de chaque projet (détail)
+# caf_requise_semaine : somme des contributions, lue par les vues CAF
+#
+# jh         → répartition brute (vue /caf/caf-requise)
+# jh_arrondi → parts arrondies à 2 décimales avant cumul (dashboard)
+# ============================================================
+SQL_LIGNES = """
+    SELECT
+        pp.projet_id, p.id, p.titre, p.duree_estimee_jh,
+        pp.date_debut, pp.date_fin,
+        pph.profil_id, pph.pourcentage
+    FROM projets p
+    JOIN projet_phases pp ON p.id = pp.projet_id
+    JOIN phase_profils_programme pph ON pp.phase_id = pph.phase_id
+    WHERE p.statut IN ('En attente', 'À planifier', 'En cours')
+"""
+
+
+def lignes_source(projet_id=None):
+    """Lignes projet × phase × profil actives (un seul projet si précisé)."""
+    if projet_id is None:
+        return query_db(SQL_LIGNES)
+    return query_db(SQL_LIGNES + " AND pp.projet_id = ?", [projet_id])
+
+
+# ============================================================
+# ⚙️ Contribution d'un projet
+# ============================================================
+def contributions(lignes):
+    """
+    Cellules (annee, semaine, profil_id, jh, jh_arrondi) non nulles
+    produites par les lignes d'un projet, sur toutes les années
+    couvertes par ses phases.
+    """
+    debuts, fins, charges, profils = preparer_intervalles(lignes)
+    if len(debuts) == 0:
+        return []
+
+    profil_ids = sorted(set(profils))
+    position = {pid: i for i, pid in enumerate(profil_ids)}
+    groupes = [position[pid] for pid in profils]
+
+    # La dernière semaine d'une année peut déborder sur janvier suivant
+    an_min = max(1, date.fromordinal(int(debuts.min())).year - 1)
+    an_max = max(an_min, date.fromordinal(int(fins.max())).year)
+    annees, numeros, lundis = [], [], []
+    for annee in range(an_min, an_max + 1):
+        semaines = semaines_annee(annee)
+        annees.append(np.full(len(semaines), annee))
+        numeros.append(np.arange(1, len(semaines) + 1))
+        lundis.append(semaines)
+    annees = np.concatenate(annees)
+    numeros = np.concatenate(numeros)
+    lundis = np.concatenate(lundis)
+
+    brut = allouer(debuts, fins, charges, groupes, len(profil_ids), lundis)
+    arrondi = allouer(debuts, fins, charges, groupes, len(profil_ids), lundis, arrondi=2)
+
+    g, s = np.nonzero((brut != 0) | (arrondi != 0))
+    return [
+        (int(annees[j]), int(numeros[j]), profil_ids[i], float(brut[i, j]), float(arrondi[i, j]))
+        for i, j in zip(g.tolist(), s.tolist())
+    ]
+
+
+# ============================================================
+# 🔁 Rafraîchissement incrémental
+# ============================================================
+def rafraichir_projet(projet_id):
+    """Retire puis ré-ajoute la contribution d'un seul projet."""
+    rafraichir_projets([projet_id])
+
+
+def rafraichir_projets(projet_ids):
+    """
+    Rafraîchit plusieurs projets ; seules les cellules touchées sont recalculées.
+    Les projets restés en attente après un échec précédent sont repris au passage.
+    """
+    projet_ids = [pid for pid in dict.fromkeys(projet_ids) if pid is not None]
+    if not projet_ids:
+        return
+    en_attente = [r["projet_id"] for r in query_db("SELECT projet_id FROM caf_requise_a_rafraichir")]
+    projet_ids = list(dict.fromkeys(projet_ids + en_attente))
+
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        touchees = set()
+        for projet_id in projet_ids:
+            anciennes = cur.execute("""
+                SELECT annee, semaine, profil_id FROM caf_requise_projet WHERE projet_id = ?
+            """, [projet_id]).fetchall()
+            touchees.update(tuple(c) for c in anciennes)
+            cur.execute("DELETE FROM caf_requise_projet WHERE projet_id = ?", [projet_id])
+
+            cellules = contributions(lignes_source(projet_id))
+            cur.executemany("""
+                INSERT INTO caf_requise_projet (projet_id, annee, semaine, profil_id, jh, jh_arrondi)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(projet_id, *c) for c in cellules])
+            touchees.update(c[:3] for c in cellules)
+
+        cur.executemany("""
+            INSERT OR REPLACE INTO caf_requise_semaine (annee, semaine, profil_id, jh, jh_arrondi)
+            SELECT ?, ?, ?, TOTAL(jh), TOTAL(jh_arrondi)
+            FROM caf_requise_projet
+            WHERE annee = ? AND semaine = ? AND profil_id = ?
+        """, [(*c, *c) for c in touchees])
+        cur.executemany("""
+            DELETE FROM caf_requise_semaine
+            WHERE annee = ? AND semaine = ? AND profil_id = ? AND jh = 0 AND jh_arrondi = 0
+        """, list(touchees))
+        cur.executemany("DELETE FROM caf_requise_a_rafraichir WHERE projet_id = ?",
+                        [(pid,) for pid in en_attente])
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Erreur rafraîchissement CAF requise {projet_ids} : {e}")
+        _marquer_a_rafraichir(conn, projet_ids)
+
+
+def _marquer_a_rafraichir(conn, projet_ids):
+    """Note les projets non rafraîchis ; sans cette trace la table dériverait : l'erreur remonte."""
+    try:
+        conn.executemany("INSERT OR IGNORE INTO caf_requise_a_rafraichir (projet_id) VALUES (?)",
+                         [(pid,) for pid in projet_ids])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def reconstruire(conn=None):
+    """
+    Recalcule entièrement les deux tables (initialisation / réparation).
+    Avec `conn` (migration), la transaction est laissée à l'appelant.
+    """
+    transaction = conn is None
+    conn = conn or get_db()
+    par_projet = defaultdict(list)
+    for ligne in conn.execute(SQL_LIGNES):
+        par_projet[ligne["projet_id"]].append(ligne)
+
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM caf_requise_projet")
+        cur.execute("DELETE FROM caf_requise_semaine")
+        cur.execute("DELETE FROM caf_requise_a_rafraichir")
+        for projet_id, lignes in par_projet.items():
+            cur.executemany("""
+                INSERT INTO caf_requise_projet (projet_id, annee, semaine, profil_id, jh, jh_arrondi)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(projet_id, *c) for c in contributions(lignes)])
+        cur.execute("""
+            INSERT INTO caf_requise_semaine (annee, semaine, profil_id, jh, jh_arrondi)
+            SELECT annee, semaine, profil_id, SUM(jh), SUM(jh_arrondi)
+            FROM caf_requise_projet
+            GROUP BY annee, semaine, profil_id
+        """)
+        if transaction:
+            conn.commit()
+    except Exception:
+        if transaction:
+            conn.rollback()
+        raise
+
+
+# ============================================================
+# 📖 Lecture (requête indexée sur l'année)
+# ============================================================
+def matrice_annee(annee, profil_ids, arrondi=False):
+    """
+    Matrice profil × semaine de `annee`, même format que
+    caf_allocator.charge_par_profil : (matrice, autre).
+    """
+    num_weeks = len(semaines_annee(annee))
+    colonne = "jh_arrondi" if arrondi else "jh"
+    position = {pid: i for i, pid in enumerate(profil_ids)}
+    autre = len(profil_ids)
+
+    matrice = np.zeros((autre + 1, num_weeks))
+    for row in query_db(f"""
+        SELECT semaine, profil_id, {colonne} AS jh
+        FROM caf_requise_semaine
+        WHERE annee = ?
+    """, [annee]):
+        matrice[position.get(row["profil_id"], autre), row["semaine"] - 1] += row["jh"]
+    return matrice[:autre], matrice[autre]
+
+
+# ============================================================
+# 🛠️ Réparation manuelle : python -m services.caf_requise_semaine
+# ============================================================
+if __name__ == "__main__":
+    debut = time.perf_counter()
+    reconstruire()
+    print(f"✅ CAF requise reconstruite en {time.perf_counter() - debut:.1f} s.")
@@ -0,0 +1,95 @@
+# services/criteres_projet.py
+from utils.db_utils import get_db, query_db
+from utils.referentiel import referentiel
+
+# ============================================================
+# 🧩 Critères d'un projet (complexités / valeurs métier choisies)
+#
+# Une seule requête charge toutes les réponses du projet, indexées
+# par libellé. L'enregistrement compare le formulaire à cet état :
+# seules les réponses nouvelles ou modifiées sont écrites, par
+# executemany, dans une seule transaction.
+# ============================================================
+
+# critère → (table des valeurs, table de liaison, colonne de liaison, libellés, préfixe du formulaire)
+CRITERES = {
+    "complexite": ("complexite", "complexite_projet", "id_complexite", "libelles_complexite", "complexite_"),
+    "valeur_metier": ("valeur_metier", "valeur_metier_projet", "id_valeur_metier", "libelles_valeur_metier", "valeur_"),
+}
+
+
+def _select_critere(critere):
+    table, liaison, colonne, _, _ = CRITERES[critere]
+    return f"""
+        SELECT '{critere}' AS critere, l.id AS id_lien, l.{colonne} AS id_critere,
+               t.libelle, t.type_libelle, t.valeur_libelle
+        FROM {liaison} l
+        JOIN {table} t ON t.id = l.{colonne}
+        WHERE l.id_projet = ?
+    """
+
+
+def charger_criteres(projet_id):
+    """
+    Réponses du projet : { "complexite": {libelle: ligne}, "valeur_metier": {libelle: ligne} }.
+    Ligne : id_lien, id_critere, libelle, type_libelle, valeur_libelle
+    (première liaison trouvée si un libellé en a plusieurs).
+    """
+    rows = query_db(
+        " UNION ALL ".join(_select_critere(c) for c in CRITERES) + " ORDER BY critere, id_lien",
+        [projet_id] * len(CRITERES)
+    )
+    criteres = {c: {} for c in CRITERES}
+    for r in rows:
+        criteres[r["critere"]].setdefault(r["libelle"], r)
+    return criteres
+
+
+def enregistrer_criteres(projet_id, critere, form, reponses=None):
+    """
+    Enregistre les réponses du formulaire (champs « <préfixe><libellé> ») pour un critère.
+    `reponses` : état déjà chargé par charger_criteres (relu sinon).
+    Retourne nb_total, nb_remplies, toutes_remplies, partiellement_remplies, changements.
+    """
+    _, liaison, colonne, libelles, prefixe = CRITERES[critere]
+    if reponses is None:
+        reponses = charger_criteres(projet_id)
+    existantes = reponses[critere]
+
+    libelles = [l["libelle"] for l in referentiel(libelles)]
+    mises_a_jour, insertions = [], []
+    for lib in libelles:
+        valeur_id = form.get(f"{prefixe}{lib}")
+        if not valeur_id:
+            continue
+        existante = existantes.get(lib)
+        if existante is None:
+            insertions.append((projet_id, valeur_id))
+        elif str(existante["id_critere"]) != str(valeur_id):
+            mises_a_jour.append((valeur_id, projet_id, existante["id_critere"]))
+
+    conn = get_db()
+    try:
+        conn.executemany(f"""
+            UPDATE {liaison}
+            SET {colonne} = ?, udate = DATETIME('now'), uuser = 1
+            WHERE id_projet = ? AND {colonne} = ?
+        """, mises_a_jour)
+        conn.executemany(f"""
+            INSERT INTO {liaison} (id_projet, {colonne}, idate, iuser)
+            VALUES (?, ?, DATETIME('now'), 1)
+        """, insertions)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    nb_total = len(libelles)
+    nb_remplies = sum(1 for lib in libelles if form.get(f"{prefixe}{lib}"))
+    return {
+        "nb_total": nb_total,
+        "nb_remplies": nb_remplies,
+        "toutes_remplies": nb_remplies == nb_total,
+        "partiellement_remplies": 0 < nb_remplies < nb_total,
+        "changements": bool(mises_a_jour or insertions),
+    }
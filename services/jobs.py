@@ -0,0 +1,206 @@
+# services/jobs.py
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.db_utils import close_db, get_connection
+
+# ============================================================
+# ⏳ Jobs d'import en arrière-plan
+#
+# L'upload crée une ligne import_jobs puis rend la main ; le
+# traitement tourne dans un pool de threads et met à jour la
+# progression (lignes lues / insérées / rejetées) au fil de l'eau.
+# Le pool est propre au processus : un job en cours lors d'un
+# redémarrage ne reprendra jamais, il est marqué en erreur au
+# démarrage ; un job resté sans nouvelles plus de JOBS_DELAI_ABANDON
+# secondes aussi, à sa prochaine lecture.
+# Surchargeable par JOBS_MAX_WORKERS / JOBS_DELAI_ABANDON dans .env.
+# ============================================================
+JOBS_MAX_WORKERS = 2
+JOBS_DELAI_ABANDON = 600
+INTERVALLE_MAJ = 0.5  # secondes minimum entre deux écritures de progression
+MESSAGE_ABANDON = "❌ Import interrompu (serveur redémarré ou job sans nouvelles)."
+
+STATUTS_FINIS = ("termine", "erreur")
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Pool de threads du processus courant (recréé après un fork)."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("JOBS_MAX_WORKERS", JOBS_MAX_WORKERS)),
+                thread_name_prefix="import-job",
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _maj(job_id, **champs):
+    """Écrit l'état du job sur une connexion dédiée (indépendante de l'import)."""
+    colonnes = ", ".join(f"{c} = ?" for c in champs)
+    conn = get_connection()
+    try:
+        conn.execute(
+            f"UPDATE import_jobs SET {colonnes}, udate = DATETIME('now') WHERE id = ?",
+            [*champs.values(), job_id],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ============================================================
+# 📊 Suivi d'un job (côté worker)
+# ============================================================
+class Job:
+    """Compteurs de progression transmis à la fonction d'import."""
+
+    def __init__(self, job_id, log_path):
+        self.id = job_id
+        self.log_path = log_path
+        self.total = 0
+        self.lues = 0
+        self.inserees = 0
+        self.rejetees = 0
+        self._derniere_maj = 0.0
+
+    def progression(self, total=None, lues=None, inserees=None, rejetees=None, force=False):
+        """Met à jour les compteurs ; écrit en base au plus toutes les INTERVALLE_MAJ s."""
+        if total is not None:
+            self.total = total
+        if lues is not None:
+            self.lues = lues
+        if inserees is not None:
+            self.inserees = inserees
+        if rejetees is not None:
+            self.rejetees = rejetees
+
+        maintenant = time.monotonic()
+        if force or maintenant - self._derniere_maj >= INTERVALLE_MAJ:
+            self._derniere_maj = maintenant
+            _maj(self.id, **self._compteurs())
+
+    def _compteurs(self):
+        return {
+            "total": self.total,
+            "lignes_lues": self.lues,
+            "lignes_inserees": self.inserees,
+            "lignes_rejetees": self.rejetees,
+        }
+
+
+# ============================================================
+# 🚀 Lancement / exécution
+# ============================================================
+def lancer(type_job, fichier, log_path, fonction, *args, redirection=None, iuser=None):
+    """
+    Enregistre le job puis soumet `fonction(job, *args)` au pool.
+    La fonction retourne (message, catégorie flash) ; une catégorie
+    'error' / 'danger' ou une exception marque le job en erreur.
+    Retourne l'identifiant du job immédiatement.
+    """
+    job_id = uuid.uuid4().hex
+    conn = get_connection()
+    try:
+        conn.execute("""
+            INSERT INTO import_jobs (id, type, statut, fichier, log_path, redirection, iuser, idate, udate)
+            VALUES (?, ?, 'en_attente', ?, ?, ?, ?, DATETIME('now'), DATETIME('now'))
+        """, [job_id, type_job, fichier, log_path, redirection, iuser])
+        conn.commit()
+    finally:
+        conn.close()
+
+    _get_executor().submit(_executer, job_id, log_path, fonction, args)
+    return job_id
+
+
+def _executer(job_id, log_path, fonction, args):
+    job = Job(job_id, log_path)
+    _maj(job_id, statut="en_cours")
+    try:
+        message, categorie = fonction(job, *args)
+        statut = "erreur" if categorie in ("error", "danger") else "termine"
+    except Exception as e:
+        traceback.print_exc()
+        message, categorie, statut = f"❌ Erreur lors de l’import : {e}", "danger", "erreur"
+    finally:
+        close_db()  # rend la connexion du thread au pool
+
+    try:
+        _maj(job_id, statut=statut, message=message, categorie=categorie, **job._compteurs())
+    except Exception as e:
+        print(f"❌ Erreur mise à jour job {job_id} : {e}")
+
+
+# ============================================================
+# 🧹 Jobs abandonnés
+# ============================================================
+def _delai_abandon():
+    return int(os.environ.get("JOBS_DELAI_ABANDON", JOBS_DELAI_ABANDON))
+
+
+def marquer_abandonnes(conn, delai_s, job_id=None):
+    """
+    Passe en erreur les jobs non terminés sans mise à jour depuis plus de
+    `delai_s` secondes (0 : tous), ou seulement `job_id`. Retourne leur nombre.
+    """
+    sql = f"""
+        UPDATE import_jobs
+        SET statut = 'erreur', categorie = 'danger', message = ?, udate = DATETIME('now')
+        WHERE statut NOT IN ({", ".join("?" * len(STATUTS_FINIS))})
+          AND udate <= DATETIME('now', ?)
+    """
+    params = [MESSAGE_ABANDON, *STATUTS_FINIS, f"-{int(delai_s)} seconds"]
+    if job_id is not None:
+        sql += " AND id = ?"
+        params.append(job_id)
+    try:
+        nb = conn.execute(sql, params).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return nb
+
+
+def init_jobs():
+    """Au démarrage : les jobs laissés en cours par le processus précédent passent en erreur."""
+    conn = get_connection()
+    try:
+        nb = marquer_abandonnes(conn, 0)
+    finally:
+        conn.close()
+    if nb:
+        print(f"⚠️ {nb} job(s) d'import interrompu(s) marqué(s) en erreur.")
+
+
+# ============================================================
+# 🔍 Lecture
+# ============================================================
+def lire(job_id):
+    """État du job (dict) ou None s'il n'existe pas ; un job abandonné est marqué en erreur."""
+    conn = get_connection()
+    try:
+        row = conn.execute("""
+            SELECT *, udate <= DATETIME('now', ?) AS abandonne FROM import_jobs WHERE id = ?
+        """, [f"-{_delai_abandon()} seconds", job_id]).fetchone()
+        if row and row["abandonne"] and row["statut"] not in STATUTS_FINIS:
+            marquer_abandonnes(conn, _delai_abandon(), job_id)
+            row = conn.execute("SELECT * FROM import_jobs WHERE id = ?", [job_id]).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    job = dict(row)
+    job.pop("abandonne", None)
+    return job
@@ -0,0 +1,92 @@
+# services/priorites.py
+import os
+import threading
+
+from utils.db_utils import close_db, get_db, query_db
+
+# ============================================================
+# 🏅 Priorités du portefeuille (rang par score WSJF décroissant)
+#
+# Un seul UPDATE ... FROM calcule les rangs par ROW_NUMBER() et ne
+# réécrit que les projets dont le rang change. Les enregistrements
+# ne l'attendent pas : `reclasser_plus_tard` le diffère de
+# RECLASSEMENT_DELAI et fusionne les demandes rapprochées ; `rang`
+# donne tout de suite le rang d'un projet.
+# ============================================================
+RECLASSEMENT_DELAI = 2.0  # secondes
+
+SQL_RECLASSEMENT = """
+    UPDATE Projet
+    SET priority = r.rang
+    FROM (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY score_wsjf DESC, id) AS rang
+        FROM Projet
+        WHERE score_wsjf IS NOT NULL
+    ) AS r
+    WHERE Projet.id = r.id
+      AND Projet.priority IS NOT r.rang
+"""
+
+# Rang d'un projet : nombre de projets mieux classés + 1 (même ordre que SQL_RECLASSEMENT)
+SQL_RANG = """
+    SELECT 1 + (
+        SELECT COUNT(*) FROM Projet
+        WHERE score_wsjf > p.score_wsjf
+           OR (score_wsjf = p.score_wsjf AND id < p.id)
+    ) AS rang
+    FROM Projet p
+    WHERE p.id = ? AND p.score_wsjf IS NOT NULL
+"""
+
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def reclasser():
+    """
+    Recalcule les priorités (1 = meilleur score WSJF, égalités départagées par id).
+    Retourne le nombre de projets dont la priorité a changé.
+    """
+    conn = get_db()
+    try:
+        cur = conn.execute(SQL_RECLASSEMENT)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return cur.rowcount
+
+
+def rang(projet_id):
+    """Rang du projet d'après les scores actuels (None sans score WSJF), sans attendre le reclassement."""
+    row = query_db(SQL_RANG, [projet_id], one=True)
+    return row["rang"] if row else None
+
+
+def reclasser_plus_tard(delai=None):
+    """
+    Planifie un recalcul en arrière-plan ; toutes les demandes reçues
+    avant son exécution sont fusionnées en un seul recalcul.
+    """
+    global _timer
+    if delai is None:
+        delai = float(os.environ.get("RECLASSEMENT_DELAI", RECLASSEMENT_DELAI))
+    with _timer_lock:
+        if _timer is not None:
+            return
+        _timer = threading.Timer(delai, _reclasser_differe)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _reclasser_differe():
+    global _timer
+    with _timer_lock:
+        _timer = None
+    try:
+        nb = reclasser()
+        print(f"[LOG] 🔄 Reclassement différé : {nb} priorité(s) modifiée(s)")
+    except Exception as e:
+        print(f"❌ Erreur reclassement différé : {e}")
+    finally:
+        close_db()  # rend la connexion du thread au pool
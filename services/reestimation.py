@@ -0,0 +1,77 @@
+# services/reestimation.py
+from utils.db_utils import get_db
+
+# ============================================================
+# ♻️ Ré-estimation en masse de estimation_jh (règles / domaines modifiés)
+#
+# Un seul UPDATE ... FROM recalcule la charge de tous les projets
+# concernés : même règle que calculer_charge_estimee (première règle
+# de la table dont l'intervalle contient le score, coefficient du
+# domaine, 0 sans règle). Seuls les projets dont l'estimation change
+# sont réécrits ; les changements (id, ancienne, nouvelle) sont retournés.
+# ============================================================
+
+SQL_REESTIMATION = """
+    UPDATE Projet
+    SET estimation_jh = n.nouvelle, uuser = 1, udate = DATETIME('now')
+    FROM (
+        SELECT p.id,
+               COALESCE(arrondi_py(r.valeur_base * (1 + COALESCE(d.coefficient, 0) / 100.0)), 0) AS nouvelle
+        FROM Projet p
+        LEFT JOIN regle_complexite r ON r.id = (
+            SELECT r2.id FROM regle_complexite r2
+            WHERE p.score_complexite BETWEEN r2.score_min AND r2.score_max
+            ORDER BY r2.id
+            LIMIT 1
+        )
+        LEFT JOIN domaines d ON d.id = p.id_domaine
+        WHERE p.id_domaine AND p.score_complexite AND ({filtre})
+    ) AS n
+    WHERE Projet.id = n.id
+      AND Projet.estimation_jh IS NOT n.nouvelle
+    RETURNING Projet.id, Projet.estimation_jh
+"""
+
+
+def _arrondi_py(valeur):
+    # round() Python (arrondi au pair) : ROUND() SQLite arrondit 0.5 vers le haut
+    return None if valeur is None else round(valeur, 0)
+
+
+def reestimer(filtre, args=()):
+    """
+    Recalcule estimation_jh des projets (alias p) vérifiant `filtre`.
+    Retourne {"evalues": nb projets recalculés, "changements": [(id, ancienne, nouvelle), ...]}.
+    Validé (commit) sur la connexion courante, avec les écritures en cours.
+    """
+    conn = get_db()
+    conn.create_function("arrondi_py", 1, _arrondi_py, deterministic=True)
+    try:
+        anciennes = dict(conn.execute(f"""
+            SELECT p.id, p.estimation_jh FROM Projet p
+            WHERE p.id_domaine AND p.score_complexite AND ({filtre})
+        """, list(args)).fetchall())
+        nouvelles = conn.execute(SQL_REESTIMATION.format(filtre=filtre), list(args)).fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    changements = sorted((pid, anciennes.get(pid), valeur) for pid, valeur in nouvelles)
+    for pid, ancienne, nouvelle in changements:
+        print(f"[LOG] ♻️ Projet {pid} : estimation {ancienne} → {nouvelle} JH")
+    return {"evalues": len(anciennes), "changements": changements}
+
+
+def reestimer_plages(*plages):
+    """Projets dont le score est dans l'une des plages (score_min, score_max)."""
+    plages = [(a, b) for a, b in plages if a is not None and b is not None]
+    if not plages:
+        return {"evalues": 0, "changements": []}
+    filtre = " OR ".join("p.score_complexite BETWEEN ? AND ?" for _ in plages)
+    return reestimer(filtre, [v for plage in plages for v in plage])
+
+
+def reestimer_domaine(id_domaine):
+    """Projets rattachés au domaine."""
+    return reestimer("p.id_domaine = ?", [id_domaine])
@@ -0,0 +1,38 @@
+# services/repartitions.py
+from collections import defaultdict
+
+from utils.db_utils import query_db
+
+# Limite de paramètres par requête (SQLITE_MAX_VARIABLE_NUMBER des anciennes versions)
+TAILLE_LOT = 900
+
+SQL_REPARTITIONS = """
+    SELECT cr.*, p.nom AS profil_nom
+    FROM collaborateur_repartition cr
+    LEFT JOIN profils p ON p.id = cr.profil_id
+    WHERE cr.collaborateur_id IN ({marqueurs})
+    ORDER BY cr.id
+"""
+
+
+# ============================================================
+# 👥 Répartitions secondaires des collaborateurs (chargement groupé)
+# ============================================================
+def charger_repartitions(matricules):
+    """
+    Répartitions de plusieurs collaborateurs en une requête IN (...)
+    par lot de TAILLE_LOT matricules.
+
+    Retourne {matricule: [dict(cr.*, profil_nom), ...]} ; les
+    collaborateurs sans répartition sont absents du dictionnaire.
+    """
+    matricules = list(dict.fromkeys(m for m in matricules if m is not None))
+    repartitions = defaultdict(list)
+
+    for i in range(0, len(matricules), TAILLE_LOT):
+        lot = matricules[i:i + TAILLE_LOT]
+        rows = query_db(SQL_REPARTITIONS.format(marqueurs=",".join("?" * len(lot))), lot)
+        for r in rows:
+            repartitions[r["collaborateur_id"]].append(dict(r))
+
+    return dict(repartitions)
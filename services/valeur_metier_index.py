@@ -0,0 +1,88 @@
+# services/valeur_metier_index.py
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+# ============================================================
+# 🧭 Index des valeurs métier (import Excel IT)
+#
+# Construit une fois par import, puis interrogé pour chaque
+# (colonne, type, valeur) d'un projet. Le résultat est celui de
+# l'ancien parcours complet : la première valeur métier (ordre de
+# la table) qui correspond exactement, sinon la première qui
+# correspond par similarité.
+# ============================================================
+SEUIL_SIMILARITE = 0.9
+
+
+@lru_cache(maxsize=65536)
+def similaire(a, b, seuil=SEUIL_SIMILARITE):
+    """True si deux chaînes sont suffisamment similaires (résultat mis en cache)."""
+    if not a or not b:
+        return False
+    sm = SequenceMatcher(None, a, b)
+    # real_quick_ratio / quick_ratio majorent ratio : rejet sans calcul complet
+    return (sm.real_quick_ratio() >= seuil
+            and sm.quick_ratio() >= seuil
+            and sm.ratio() >= seuil)
+
+
+class IndexValeursMetier:
+    """Recherche exacte par dictionnaire + candidats flous regroupés par libellé."""
+
+    def __init__(self, rows):
+        """
+        `rows` : (id, libelle, type_libelle, valeur_libelle) déjà normalisés,
+        dans l'ordre de la table.
+        """
+        self.exact = {}       # (libelle, type, valeur) → id
+        self.par_type = {}    # (libelle, type) → id      (valeur absente du fichier)
+        self.par_valeur = {}  # (libelle, valeur) → id    (type absent du fichier)
+        self.par_libelle = {}  # libelle → [(position, id, type, valeur), ...]
+        self._resultats = {}
+
+        rows = list(rows)
+        for position, (vm_id, lib, typ, val) in enumerate(rows):
+            vm_id = int(vm_id)
+            self.exact.setdefault((lib, typ, val), vm_id)
+            self.par_type.setdefault((lib, typ), vm_id)
+            self.par_valeur.setdefault((lib, val), vm_id)
+            self.par_libelle.setdefault(lib, []).append((position, vm_id, typ, val))
+
+        self.taille = len(rows)
+
+    def __len__(self):
+        return self.taille
+
+    def trouver(self, lib_n, type_n, val_n):
+        """Id de la valeur métier correspondante (textes déjà normalisés), ou None."""
+        cle = (lib_n, type_n, val_n)
+        if cle not in self._resultats:
+            vm_id = self._exacte(lib_n, type_n, val_n)
+            if vm_id is None:
+                vm_id = self._floue(lib_n, type_n, val_n)
+            self._resultats[cle] = vm_id
+        return self._resultats[cle]
+
+    def _exacte(self, lib_n, type_n, val_n):
+        if type_n and val_n:
+            return self.exact.get((lib_n, type_n, val_n))
+        if type_n:
+            return self.par_type.get((lib_n, type_n))
+        if val_n:
+            return self.par_valeur.get((lib_n, val_n))
+        candidats = self.par_libelle.get(lib_n)
+        return candidats[0][1] if candidats else None
+
+    def _floue(self, lib_n, type_n, val_n):
+        meilleur = None
+        for libelle, candidats in self.par_libelle.items():
+            if not similaire(libelle, lib_n):
+                continue
+            for position, vm_id, typ, val in candidats:
+                if meilleur is not None and position >= meilleur[0]:
+                    break
+                if ((not type_n or similaire(typ, type_n))
+                        and (not val_n or similaire(val, val_n))):
+                    meilleur = (position, vm_id)
+                    break
+        return meilleur[1] if meilleur else None
@@ -1,4 +1,8 @@
 # services/wsjf_calculator.py
+import numpy as np
+import pandas as pd
+
+from utils.db_utils import get_db
 
 POINTS_CONFIG = {
     # Champs du numérateur (Valeur métier)
@@ -27,29 +31,48 @@ POINTS_CONFIG = {
     'q10': {'evolution_systeme': 2, 'integration_partenaire': 13, 'creation_nouveau': 21}
 }
 
-def calculate_wsjf(form_data):
-    # Liste des champs numérateur (Valeur métier)
-    numerateur_fields = [
-        'alignement_strategic', 'impact_pnb', 'impact_satisfaction',
-        'conquerir_client', 'maitrise_couts', 'attenuation_menaces',
-        'creation_opportunites', 'conditions_techniques', 'deadline_reglementaire',
-        'pression_concurrence', 'echeances_strategiques', 'urgence_obsolescence'
-    ]
+# Liste des champs numérateur (Valeur métier)
+NUMERATEUR_FIELDS = [
+    'alignement_strategic', 'impact_pnb', 'impact_satisfaction',
+    'conquerir_client', 'maitrise_couts', 'attenuation_menaces',
+    'creation_opportunites', 'conditions_techniques', 'deadline_reglementaire',
+    'pression_concurrence', 'echeances_strategiques', 'urgence_obsolescence'
+]
+
+# Liste des champs dénominateur (Complexité / Coût d'implémentation)
+DENOMINATEUR_FIELDS = ['q1', 'q2', 'q3', 'q4', 'q5', 'q6', 'q7', 'q8', 'q9', 'q10']
+
+# Estimation en Jours-Homme selon la complexité (1 Faible, 2 Moyenne, 3 Élevée)
+JH_PAR_COMPLEXITE = {1: 20, 2: 40, 3: 60}
+JH_DEFAUT = 30
+
+
+def get_complexite_label(score):
+    if score < 50:
+        return 1  # Faible
+    elif 50 <= score <= 100:
+        return 2  # Moyenne
+    else:
+        return 3  # Élevée
+
+
+def _entier_q2(valeur):
+    # q2 est saisi librement : entier, sinon 0
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        return 0
 
-    # Liste des champs dénominateur (Complexité / Coût d'implémentation)
-    denominateur_fields = ['q1', 'q2', 'q3', 'q4', 'q5', 'q6', 'q7', 'q8', 'q9', 'q10']
 
+def calculate_wsjf(form_data):
     # Calcul du numérateur
-    numerateur = sum(POINTS_CONFIG[field].get(form_data.get(field, ''), 0) for field in numerateur_fields)
+    numerateur = sum(POINTS_CONFIG[field].get(form_data.get(field, ''), 0) for field in NUMERATEUR_FIELDS)
 
     # Calcul du dénominateur
     denominateur = 0
-    for field in denominateur_fields:
+    for field in DENOMINATEUR_FIELDS:
         if field == 'q2':
-            try:
-                denominateur += int(form_data.get(field, '0'))
-            except ValueError:
-                denominateur += 0
+            denominateur += _entier_q2(form_data.get(field, '0'))
         else:
             denominateur += POINTS_CONFIG[field].get(form_data.get(field, ''), 0)
 
@@ -58,27 +81,89 @@ def calculate_wsjf(form_data):
 
     # Estimation de la complexité
     complexite_score = denominateur
-
-    def get_complexite_label(score):
-        if score < 50:
-            return 1  # Faible
-        elif 50 <= score <= 100:
-            return 2  # Moyenne
-        else:
-            return 3  # Élevée
-
     complexite = get_complexite_label(complexite_score)
-
-    # Estimation en Jours-Homme selon la complexité
-    jh_estime = {
-        1: 20,
-        2: 40,
-        3: 60
-    }.get(complexite, 30)
+    jh_estime = JH_PAR_COMPLEXITE.get(complexite, JH_DEFAUT)
 
     return {
         'score_wsjf': round(wsjf, 2),
         'complexite_score': complexite_score,
         'complexite': complexite,
         'jh_estime': jh_estime
-    }
\ No newline at end of file
+    }
+
+
+# ============================================================
+# 📊 Calcul en lot (tout le portefeuille en une passe)
+#
+# Chaque critère est une colonne qui ne prend que quelques valeurs :
+# la colonne est factorisée, la règle est appliquée une fois par valeur
+# distincte (POINTS_CONFIG, int() pour q2, round() pour le score),
+# puis redistribuée par indexation NumPy, sans boucle par projet.
+# ============================================================
+def _par_valeur(serie, regle, defaut=0):
+    """Applique `regle` à chaque valeur distincte de la série (valeurs manquantes → defaut)."""
+    codes, uniques = pd.factorize(serie, use_na_sentinel=True)
+    valeurs = np.array([regle(v) for v in uniques] + [defaut])
+    return valeurs[codes]  # code -1 → dernière case (defaut)
+
+
+def _colonne(df, field, regle):
+    if field not in df.columns:
+        return np.zeros(len(df), dtype=np.int64)
+    return _par_valeur(df[field], regle).astype(np.int64)
+
+
+def calculate_wsjf_batch(records):
+    """
+    Calcule le WSJF de plusieurs projets (liste de dicts ou DataFrame, un projet par ligne).
+    Retourne un DataFrame (même index) : numerateur, denominateur, score_wsjf,
+    complexite_score, complexite, jh_estime — mêmes valeurs que calculate_wsjf.
+    """
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(list(records))
+
+    numerateur = np.zeros(len(df), dtype=np.int64)
+    for field in NUMERATEUR_FIELDS:
+        numerateur += _colonne(df, field, lambda v, points=POINTS_CONFIG[field]: points.get(v, 0))
+
+    denominateur = np.zeros(len(df), dtype=np.int64)
+    for field in DENOMINATEUR_FIELDS:
+        if field == 'q2':
+            denominateur += _colonne(df, field, _entier_q2)
+        else:
+            denominateur += _colonne(df, field, lambda v, points=POINTS_CONFIG[field]: points.get(v, 0))
+
+    # Même division que calculate_wsjf (entiers < 2**53 : résultat flottant identique)
+    wsjf = np.divide(numerateur * 2, denominateur, out=np.zeros(len(df)), where=denominateur != 0)
+
+    complexite = np.select([denominateur < 50, denominateur <= 100], [1, 2], default=3)
+    jh = np.array([JH_PAR_COMPLEXITE.get(c, JH_DEFAUT) for c in (0, 1, 2, 3)])[complexite]
+
+    return pd.DataFrame({
+        'numerateur': numerateur,
+        'denominateur': denominateur,
+        'score_wsjf': _par_valeur(pd.Series(wsjf), lambda v: round(v, 2)).astype(float),
+        'complexite_score': denominateur,
+        'complexite': complexite,
+        'jh_estime': jh,
+    }, index=df.index)
+
+
+def rescorer_projets():
+    """
+    Recalcule score_wsjf de tous les projets (table projets) après un changement
+    de POINTS_CONFIG. Retourne le nombre de projets dont le score a changé.
+    """
+    conn = get_db()
+    df = pd.read_sql_query("SELECT * FROM projets", conn)
+    if df.empty:
+        return 0
+    resultats = calculate_wsjf_batch(df)
+    changes = df["score_wsjf"].ne(resultats["score_wsjf"])
+    maj = list(zip(resultats.loc[changes, "score_wsjf"].tolist(), df.loc[changes, "id"].tolist()))
+    try:
+        conn.executemany("UPDATE projets SET score_wsjf = ? WHERE id = ?", maj)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(maj)
@@ -5,7 +5,7 @@ import os
 from datetime import timedelta
 from functools import wraps
 from flask import (
-    request, redirect, url_for, flash, g, make_response, session
+    request, redirect, url_for, flash, g, make_response, session, jsonify
 )
 from flask_jwt_extended import (
     JWTManager,
@@ -74,6 +74,39 @@ def init_jwt(app):
     return jwt
 
 
+# ==========================================
+# 🎫 Lecture unique du JWT par requête
+# ==========================================
+def _utilisateur(identity, claims):
+    return {
+        "username": identity,
+        "prenom": claims.get("prenom"),
+        "nom": claims.get("nom"),
+        "email": claims.get("email"),
+        "role": claims.get("role", "user"),
+    }
+
+
+def jwt_requete():
+    """
+    Décode et valide le cookie JWT une seule fois par requête.
+    Le résultat est gardé sur g (jwt_identity, jwt_claims, jwt_erreur, user)
+    et réutilisé par les middlewares, décorateurs et context processors.
+    Retourne (identity, claims) ; (None, {}) si absent, invalide ou expiré.
+    """
+    if "jwt_identity" not in g:
+        try:
+            verify_jwt_in_request(optional=True)
+            g.jwt_identity = get_jwt_identity()
+            g.jwt_claims = get_jwt() if g.jwt_identity else {}
+            g.jwt_erreur = None
+        except Exception as e:
+            g.jwt_identity, g.jwt_claims, g.jwt_erreur = None, {}, e
+        if g.jwt_identity:
+            g.user = _utilisateur(g.jwt_identity, g.jwt_claims)
+    return g.jwt_identity, g.jwt_claims
+
+
 # ==========================================
 # 🧱 Décorateur login_required
 # ==========================================
@@ -84,32 +117,40 @@ def login_required(view_func):
     """
     @wraps(view_func)
     def wrapper(*args, **kwargs):
-        try:
-            # Vérifie présence + validité du JWT
-            verify_jwt_in_request()
-            identity = get_jwt_identity()
-            claims = get_jwt()
-
-            # Injecter les infos utilisateur dans g.user + session
-            g.user = {
-                "username": identity,
-                "prenom": claims.get("prenom"),
-                "nom": claims.get("nom"),
-                "email": claims.get("email"),
-                "role": claims.get("role", "user"),
-            }
-
-            # Synchroniser avec session pour affichage UI
-            session["user"] = g.user
-            return view_func(*args, **kwargs)
-
-        except Exception:
+        # Vérifie présence + validité du JWT (déjà lu par le middleware)
+        identity, _ = jwt_requete()
+        if not identity:
             flash("⚠️ Session expirée ou non authentifiée. Veuillez vous reconnecter.", "warning")
             resp = make_response(redirect(url_for("auth.login", expired="true")))
             unset_jwt_cookies(resp)
             session.clear()
             return resp
 
+        # Synchroniser avec session pour affichage UI (cookie réécrit seulement si changé)
+        if session.get("user") != g.user:
+            session["user"] = g.user
+        return view_func(*args, **kwargs)
+
+    return wrapper
+
+
+# ==========================================
+# 🛡️ Décorateur admin_required (routes /admin/*)
+# ==========================================
+def est_admin():
+    """True si l'utilisateur de la requête a le rôle admin."""
+    identity, claims = jwt_requete()
+    return bool(identity) and claims.get("role") == "admin"
+
+
+def admin_required(view_func):
+    """Réserve la route au rôle admin (403 JSON sinon)."""
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        if not est_admin():
+            return jsonify({"error": "accès réservé aux administrateurs"}), 403
+        return view_func(*args, **kwargs)
+
     return wrapper
 
 
@@ -170,10 +211,9 @@ def register_jwt_protection(app):
         if any(request.path.startswith(p) for p in public_paths):
             return
 
-        # Vérifie JWT avant d’entrer dans la route
-        try:
-            verify_jwt_in_request(optional=False)
-        except Exception:
+        # Vérifie JWT avant d’entrer dans la route (lu une fois, gardé sur g)
+        identity, _ = jwt_requete()
+        if not identity:
             flash("⚠️ Veuillez vous reconnecter pour continuer.", "warning")
             session.clear()
             resp = make_response(redirect(url_for("auth.login", expired="true")))
@@ -0,0 +1,228 @@
+# utils/cache_vues.py
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import g, make_response, request, session
+
+from utils.auth_utils import jwt_requete
+from utils.db_utils import versions_tables
+
+# ============================================================
+# 🗃️ Cache des vues CAF (résultats calculés + réponses rendues)
+#
+# Les matrices CAF ne changent que lorsqu'un projet, une phase ou un
+# collaborateur est modifié. Clé = (vue, paramètres, versions des
+# tables lues) ; les versions viennent de table_versions, incrémentée
+# par trigger à chaque écriture : toute route d'écriture, tout import
+# invalide donc le cache sans appel explicite.
+#   - résultats : données calculées, partagées entre utilisateurs ;
+#   - réponses  : HTML rendu, par utilisateur (la barre de navigation
+#     affiche son nom), servi avec ETag / Last-Modified → 304.
+# Budget mémoire commun, éviction LRU.
+# (surchargés par CACHE_VUES / CACHE_VUES_MO dans .env)
+# ============================================================
+CACHE_VUES = True
+CACHE_VUES_MO = 32
+
+# Redémarrage = templates potentiellement modifiés : anciens ETag invalides
+_DEMARRAGE = str(time.time())
+
+
+def _taille(objet, _vus=None):
+    """Estimation (octets) de la mémoire occupée par un résultat."""
+    if _vus is None:
+        _vus = set()
+    if id(objet) in _vus:
+        return 0
+    _vus.add(id(objet))
+    if hasattr(objet, "nbytes"):  # tableaux NumPy
+        return int(objet.nbytes)
+    taille = sys.getsizeof(objet)
+    if isinstance(objet, dict):
+        taille += sum(_taille(k, _vus) + _taille(v, _vus) for k, v in objet.items())
+    elif isinstance(objet, (list, tuple, set, frozenset)):
+        taille += sum(_taille(v, _vus) for v in objet)
+    return taille
+
+
+class CacheLRU:
+    """Dictionnaire borné en octets ; les entrées les moins récemment lues sont évincées."""
+
+    def __init__(self, budget_octets):
+        self.budget = budget_octets
+        self.octets = 0
+        self.evictions = 0
+        self.compteurs = {}  # type → {"hits", "misses", ...}
+        self._entrees = OrderedDict()  # clé → (valeur, taille, créée le)
+        self._lock = threading.Lock()
+
+    def compter(self, type_, evenement):
+        with self._lock:
+            compteurs = self.compteurs.setdefault(type_, {"hits": 0, "misses": 0})
+            compteurs[evenement] = compteurs.get(evenement, 0) + 1
+
+    def lire(self, cle):
+        """(valeur, créée le) ou None ; compte le hit / miss sous cle[0]."""
+        with self._lock:
+            entree = self._entrees.get(cle)
+            compteurs = self.compteurs.setdefault(cle[0], {"hits": 0, "misses": 0})
+            if entree is None:
+                compteurs["misses"] += 1
+                return None
+            self._entrees.move_to_end(cle)
+            compteurs["hits"] += 1
+            return entree[0], entree[2]
+
+    def ecrire(self, cle, valeur, taille):
+        """Ajoute l'entrée (ignorée si elle dépasse le budget à elle seule)."""
+        if taille > self.budget:
+            return time.time()
+        cree_le = time.time()
+        with self._lock:
+            ancienne = self._entrees.pop(cle, None)
+            if ancienne is not None:
+                self.octets -= ancienne[1]
+            self._entrees[cle] = (valeur, taille, cree_le)
+            self.octets += taille
+            while self.octets > self.budget:
+                _, (_, taille_evincee, _) = self._entrees.popitem(last=False)
+                self.octets -= taille_evincee
+                self.evictions += 1
+        return cree_le
+
+    def vider(self, compteurs=False):
+        with self._lock:
+            self._entrees.clear()
+            self.octets = 0
+            if compteurs:
+                self.compteurs.clear()
+                self.evictions = 0
+
+    def statistiques(self):
+        with self._lock:
+            par_type = {}
+            for type_, c in self.compteurs.items():
+                lectures = c["hits"] + c["misses"]
+                par_type[type_] = {**c, "taux_hit": round(c["hits"] / lectures, 3) if lectures else None}
+            return {
+                "entrees": len(self._entrees),
+                "octets": self.octets,
+                "budget_octets": self.budget,
+                "evictions": self.evictions,
+                **par_type,
+            }
+
+
+_cache = CacheLRU(CACHE_VUES_MO * 1024 * 1024)
+
+
+def init_cache_vues():
+    """Lit la configuration (.env)."""
+    global CACHE_VUES
+    CACHE_VUES = os.environ.get("CACHE_VUES", "1") == "1"
+    _cache.budget = int(float(os.environ.get("CACHE_VUES_MO", CACHE_VUES_MO)) * 1024 * 1024)
+
+
+# --------------------------------------------------------------------
+# 🔢 Versions des tables (lues une fois par requête HTTP)
+# --------------------------------------------------------------------
+def _versions(tables):
+    lues = g.setdefault("versions_vues", {})
+    if tables not in lues:
+        lues[tables] = versions_tables(tables)
+    return lues[tables]
+
+
+def _utilisateur():
+    """Ce qui, dans la page rendue, dépend de l'utilisateur connecté."""
+    identity, claims = jwt_requete()
+    if identity:
+        return (identity, claims.get("prenom"), claims.get("nom"), claims.get("email"), claims.get("role"))
+    user = session.get("user") or {}
+    return tuple(sorted((k, str(v)) for k, v in user.items()))
+
+
+# --------------------------------------------------------------------
+# 🧮 Résultats (partagés entre utilisateurs)
+# --------------------------------------------------------------------
+def resultat(nom, cle, tables, calculer):
+    """
+    Résultat de calculer() pour (nom, cle), recalculé seulement quand une
+    des `tables` a changé. La valeur retournée est partagée : ne pas la modifier.
+    """
+    versions = _versions(tables)
+    if not CACHE_VUES or None in versions:
+        return calculer()
+    cle_cache = ("resultats", nom, cle, versions)
+    entree = _cache.lire(cle_cache)
+    if entree is not None:
+        return entree[0]
+    valeur = calculer()
+    _cache.ecrire(cle_cache, valeur, _taille(valeur))
+    return valeur
+
+
+# --------------------------------------------------------------------
+# 📄 Réponses (par utilisateur, ETag / Last-Modified)
+# --------------------------------------------------------------------
+def _reponse_conditionnelle(corps, mimetype, etag, modifiee_le):
+    reponse = make_response(corps)
+    reponse.mimetype = mimetype
+    reponse.set_etag(etag, weak=True)
+    if modifiee_le is not None:
+        reponse.last_modified = datetime.fromtimestamp(int(modifiee_le), tz=timezone.utc)
+    # Le navigateur revalide à chaque affichage (304 si rien n'a changé)
+    reponse.headers["Cache-Control"] = "private, no-cache"
+    return reponse.make_conditional(request)
+
+
+def vue_cachee(tables, cle=lambda: ()):
+    """
+    Décorateur : sert la page depuis le cache tant que les `tables` n'ont pas
+    changé. `cle()` retourne les paramètres qui distinguent les pages
+    (année, mois...). Pages avec messages flash en attente : jamais cachées.
+    """
+    def decorateur(vue):
+        @wraps(vue)
+        def enveloppe(*args, **kwargs):
+            if not CACHE_VUES or session.get("_flashes"):
+                return vue(*args, **kwargs)
+            versions = _versions(tables)
+            if None in versions:
+                return vue(*args, **kwargs)
+
+            cle_cache = ("reponses", request.endpoint, cle(), versions, _utilisateur())
+            etag = hashlib.sha1(repr((_DEMARRAGE, cle_cache)).encode()).hexdigest()[:20]
+
+            entree = _cache.lire(cle_cache)
+            if request.if_none_match.contains_weak(etag):
+                # Page identique à celle du navigateur : 304 sans rien rendre
+                _cache.compter("reponses", "non_modifiees")
+                return _reponse_conditionnelle(b"", "text/html", etag, entree[1] if entree else None)
+            if entree is not None:
+                (corps, mimetype), cree_le = entree
+                return _reponse_conditionnelle(corps, mimetype, etag, cree_le)
+
+            reponse = make_response(vue(*args, **kwargs))
+            if reponse.status_code != 200 or reponse.is_streamed:
+                return reponse
+            corps = reponse.get_data()
+            cree_le = _cache.ecrire(cle_cache, (corps, reponse.mimetype), len(corps))
+            return _reponse_conditionnelle(corps, reponse.mimetype, etag, cree_le)
+        return enveloppe
+    return decorateur
+
+
+def statistiques():
+    return {"actif": CACHE_VUES, **_cache.statistiques()}
+
+
+def vider(compteurs=False):
+    """Oublie toutes les entrées (et remet les compteurs à zéro si demandé)."""
+    _cache.vider(compteurs)
@@ -1,27 +1,121 @@
-from utils.db_utils import query_db
+import threading
+from bisect import bisect_left
 
+from utils.db_utils import query_db, versions_tables
+
+# ============================================================
+# 🧮 Moteur d'estimation de charge (règles + coefficients en mémoire)
+#
+# Les règles regle_complexite sont découpées en segments élémentaires
+# (bornes triées) : chaque recherche est un bisect. La règle retenue est
+# celle de l'ancienne requête « WHERE ? BETWEEN score_min AND score_max
+# LIMIT 1 » : la première dans l'ordre de la table si plusieurs se
+# chevauchent. Le moteur est reconstruit dès que regle_complexite ou
+# domaines changent (versions incrémentées par trigger).
+# ============================================================
+TABLES_MOTEUR = ("regle_complexite", "domaines")
+
+_moteur = None
+_moteur_versions = None
+_moteur_lock = threading.Lock()
+
+
+def _score(valeur):
+    """Score comparable comme le ferait SQLite (texte numérique converti, sinon hors règles)."""
+    if valeur is None or isinstance(valeur, bool):
+        return None if valeur is None else int(valeur)
+    if isinstance(valeur, (int, float)):
+        return None if valeur != valeur else valeur  # NaN → NULL
+    try:
+        return float(valeur)
+    except (TypeError, ValueError):
+        return None
+
+
+def _cle_domaine(valeur):
+    try:
+        f = float(valeur)
+    except (TypeError, ValueError):
+        return valeur
+    return int(f) if f.is_integer() else f
+
+
+class MoteurCharge:
+    def __init__(self, regles, coefficients):
+        self.coefficients = coefficients
+        self.bornes = sorted({r["score_min"] for r in regles} | {r["score_max"] for r in regles})
+
+        def gagnante(x):
+            couvrantes = [r for r in regles if r["score_min"] <= x <= r["score_max"]]
+            return couvrantes[0] if couvrantes else None  # règles triées par id
+
+        # points[i] : règle pour x == bornes[i] ; intervalles[i] : pour bornes[i] < x < bornes[i+1]
+        self.points = [gagnante(b) for b in self.bornes]
+        self.intervalles = [gagnante((a + b) / 2) for a, b in zip(self.bornes, self.bornes[1:])]
+
+    def regle(self, score):
+        """Règle applicable au score, ou None."""
+        x = _score(score)
+        if x is None:
+            return None
+        i = bisect_left(self.bornes, x)
+        if i < len(self.bornes) and self.bornes[i] == x:
+            return self.points[i]
+        if 0 < i < len(self.bornes):
+            return self.intervalles[i - 1]
+        return None
+
+    def estimer(self, score_complexite, id_domaine):
+        # 1️⃣ Trouver la règle correspondant au score
+        regle = self.regle(score_complexite)
+        if not regle:
+            return {"erreur": "Aucune règle trouvée pour ce score"}
+
+        # 2️⃣ Récupérer le coefficient du domaine
+        coef = self.coefficients.get(_cle_domaine(id_domaine), 0)
+
+        # 3️⃣ Calcul
+        charge = regle["valeur_base"] * (1 + coef / 100.0)
+
+        return {
+            "score": score_complexite,
+            "fibonacci": regle["fibo"],
+            "valeur_base": regle["valeur_base"],
+            "coefficient": coef,
+            "charge_estimee": round(charge, 0)
+        }
+
+
+def _charger_moteur():
+    regles = [dict(r) for r in query_db("SELECT * FROM regle_complexite ORDER BY id")]
+    coefficients = {r["id"]: r["coefficient"] for r in query_db("SELECT id, coefficient FROM domaines")}
+    return MoteurCharge(regles, coefficients)
+
+
+def moteur_charge():
+    """Moteur courant, rechargé si les règles ou les domaines ont été modifiés."""
+    global _moteur, _moteur_versions
+    versions = versions_tables(TABLES_MOTEUR)
+    if None in versions:
+        # Tables non suivies (base pas encore migrée) : pas de cache possible
+        return _charger_moteur()
+    with _moteur_lock:
+        if _moteur is not None and _moteur_versions == versions:
+            return _moteur
+    moteur = _charger_moteur()
+    with _moteur_lock:
+        _moteur, _moteur_versions = moteur, versions
+    return moteur
+
+
+# ============================================================
+# 📐 API
+# ============================================================
 def calculer_charge_estimee(score_complexite, id_domaine):
-    # 1️⃣ Trouver la règle correspondant au score
-    regle = query_db("""
-        SELECT * FROM regle_complexite
-        WHERE ? BETWEEN score_min AND score_max
-        LIMIT 1
-    """, [score_complexite], one=True)
-
-    if not regle:
-        return {"erreur": "Aucune règle trouvée pour ce score"}
-
-    # 2️⃣ Récupérer le coefficient du domaine
-    domaine = query_db("SELECT coefficient FROM domaines WHERE id = ?", [id_domaine], one=True)
-    coef = domaine["coefficient"] if domaine else 0
-
-    # 3️⃣ Calcul
-    charge = regle["valeur_base"] * (1 + coef / 100.0)
-
-    return {
-        "score": score_complexite,
-        "fibonacci": regle["fibo"],
-        "valeur_base": regle["valeur_base"],
-        "coefficient": coef,
-        "charge_estimee": round(charge, 0)
-    }
+    return moteur_charge().estimer(score_complexite, id_domaine)
+
+
+def estimate_many(scores, domaines):
+    """Estimations de plusieurs projets (listes parallèles score / id_domaine), moteur chargé une fois."""
+    moteur = moteur_charge()
+    return [moteur.estimer(score, id_domaine) for score, id_domaine in zip(scores, domaines)]
@@ -0,0 +1,156 @@
+# utils/calendrier.py
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+
+# ============================================================
+# 📅 Calendrier des semaines CAF (tables précalculées par année)
+#
+# Règle unique utilisée par toutes les vues CAF et la planification :
+#   - S1 commence le premier lundi de l'année ;
+#   - 53 semaines si le 31 décembre est en semaine ISO 53, sinon 52
+#     (la dernière semaine peut donc déborder sur janvier suivant).
+# C'est la numérotation des données déjà matérialisées
+# (caf_requise_semaine) ; le numéro ISO de chaque semaine est exposé
+# à part (iso).
+# Chaque année est calculée une fois puis mémorisée ; les tableaux
+# retournés sont partagés et en lecture seule.
+# ============================================================
+
+MOIS_FR = (
+    "Janvier", "Février", "Mars", "Avril", "Mai", "Juin",
+    "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre",
+)
+
+
+# --------------------------------------------------------------------
+# 🇹🇳 Jours fériés tunisiens
+# --------------------------------------------------------------------
+FERIES_FIXES = (
+    (1, 1, "Jour de l'An"),
+    (3, 20, "Fête de l'Indépendance"),
+    (4, 9, "Journée des Martyrs"),
+    (5, 1, "Fête du Travail"),
+    (7, 25, "Fête de la République"),
+    (8, 13, "Fête de la Femme"),
+    (10, 15, "Fête de l'Évacuation"),
+)
+
+# Fêtes religieuses : dates officielles annoncées (observation du croissant),
+# à compléter chaque année ; une année absente n'a que les fériés fixes.
+# Les deux jours de l'Aïd sont chômés.
+FERIES_ANNONCES = (
+    ("2023-04-21", "Aïd El Fitr"),
+    ("2023-04-22", "Aïd El Fitr (2e jour)"),
+    ("2023-06-28", "Aïd El Idha"),
+    ("2023-06-29", "Aïd El Idha (2e jour)"),
+    ("2023-07-19", "Ras El Am El Hijri"),
+    ("2023-09-27", "Mouled"),
+    ("2024-04-10", "Aïd El Fitr"),
+    ("2024-04-11", "Aïd El Fitr (2e jour)"),
+    ("2024-06-16", "Aïd El Idha"),
+    ("2024-06-17", "Aïd El Idha (2e jour)"),
+    ("2024-07-07", "Ras El Am El Hijri"),
+    ("2024-09-15", "Mouled"),
+    ("2025-03-30", "Aïd El Fitr"),
+    ("2025-03-31", "Aïd El Fitr (2e jour)"),
+    ("2025-06-06", "Aïd El Idha"),
+    ("2025-06-07", "Aïd El Idha (2e jour)"),
+    ("2025-06-26", "Ras El Am El Hijri"),
+    ("2025-09-04", "Mouled"),
+)
+
+
+@lru_cache(maxsize=64)
+def jours_feries(annee):
+    """{ ordinal : libellé } des jours fériés de l'année."""
+    feries = {date(annee, m, j).toordinal(): libelle for m, j, libelle in FERIES_FIXES}
+    # Fête de la Révolution : 14 janvier jusqu'en 2021, 17 décembre depuis
+    if annee <= 2021:
+        feries[date(annee, 1, 14).toordinal()] = "Fête de la Révolution et de la Jeunesse"
+    if annee >= 2021:
+        feries[date(annee, 12, 17).toordinal()] = "Fête de la Révolution"
+
+    for jour, libelle in FERIES_ANNONCES:
+        d = date.fromisoformat(jour)
+        if d.year == annee:
+            feries.setdefault(d.toordinal(), libelle)
+    return feries
+
+
+# --------------------------------------------------------------------
+# 🗓️ Tables d'une année
+# --------------------------------------------------------------------
+def _lecture_seule(tableau):
+    tableau.flags.writeable = False
+    return tableau
+
+
+class CalendrierAnnee:
+    """Semaines S1..Sn d'une année et leurs attributs, sous forme de tableaux alignés."""
+
+    def __init__(self, annee):
+        self.annee = annee
+
+        premier = date(annee, 1, 1).toordinal()
+        premier_lundi = premier + (-date(annee, 1, 1).weekday()) % 7
+        self.nb_semaines = 53 if date(annee, 12, 31).isocalendar()[1] == 53 else 52
+        self.libelles = tuple(f"S{i}" for i in range(1, self.nb_semaines + 1))
+
+        # Ordinaux (date.toordinal) des lundis et des dimanches
+        self.debuts = _lecture_seule(premier_lundi + 7 * np.arange(self.nb_semaines, dtype=np.int64))
+        self.fins = _lecture_seule(self.debuts + 6)
+
+        lundis = [date.fromordinal(int(o)) for o in self.debuts]
+        # Mois (0-11) du lundi de chaque semaine et numéro ISO
+        self.mois = _lecture_seule(np.array([d.month - 1 for d in lundis], dtype=np.int64))
+        self.iso = _lecture_seule(np.array([d.isocalendar()[1] for d in lundis], dtype=np.int64))
+
+        # Jours fériés de chaque semaine (la dernière peut être à cheval sur deux années)
+        feries = {**jours_feries(annee), **jours_feries(annee + 1)}
+        self.feries = tuple(
+            tuple((o, feries[o]) for o in range(int(d), int(d) + 7) if o in feries)
+            for d in self.debuts
+        )
+        # Jours ouvrés (lundi-vendredi hors fériés)
+        self.jours_ouvres = _lecture_seule(np.array(
+            [5 - sum(1 for o, _ in f if (o - int(d)) < 5) for d, f in zip(self.debuts, self.feries)],
+            dtype=np.int64,
+        ))
+
+    def semaine(self, jour):
+        """Indice 0..n-1 de la semaine contenant `jour` (date ou ordinal), None hors de l'année."""
+        ordinal = jour if isinstance(jour, int) else jour.toordinal()
+        i = int(np.searchsorted(self.debuts, ordinal, side="right")) - 1
+        return i if 0 <= i < self.nb_semaines and ordinal <= self.fins[i] else None
+
+    def semaine_to_mois(self, libelles_mois=MOIS_FR):
+        """{ 'S1' : 'Janvier', ... }"""
+        return {s: libelles_mois[m] for s, m in zip(self.libelles, self.mois.tolist())}
+
+    def mois_to_semaines(self, libelles_mois=MOIS_FR):
+        """{ 'Janvier' : ['S1', ...], ... } pour les douze mois, dans l'ordre."""
+        groupes = {m: [] for m in libelles_mois}
+        for s, m in zip(self.libelles, self.mois.tolist()):
+            groupes[libelles_mois[m]].append(s)
+        return groupes
+
+
+@lru_cache(maxsize=64)
+def calendrier(annee):
+    """Tables de l'année (calculées une fois par processus)."""
+    return CalendrierAnnee(annee)
+
+
+def semaine_de(jour):
+    """
+    (annee, indice de semaine) de la semaine CAF contenant `jour` (date).
+    None pour les quelques jours de début janvier qui ne sont couverts ni
+    par S1 ni par la dernière semaine de l'année précédente.
+    """
+    for annee in (jour.year, jour.year - 1):
+        i = calendrier(annee).semaine(jour)
+        if i is not None:
+            return annee, i
+    return None
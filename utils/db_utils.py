@@ -1,7 +1,15 @@
+import hashlib
+import itertools
 import os
 import sqlite3
+import threading
 import time
 
+from flask import g, has_app_context
+
+from utils import sql_stats
+from utils.migrations import MIGRATIONS, SCHEMA_VERSION_TABLE, appliquer_migrations
+
 # --------------------------------------------------------------------
 # 📁 Chemin vers la base SQLite
 # --------------------------------------------------------------------
@@ -9,19 +17,112 @@ database_path = os.path.join(os.path.dirname(__file__), '..', 'database', 'proje
 os.makedirs(os.path.dirname(database_path), exist_ok=True)
 DB_PATH = database_path
 
+# Taille du pool et attente max (secondes) avant connexion de débordement
+# (surchargées par DB_POOL_SIZE / DB_POOL_TIMEOUT dans .env)
+DB_POOL_SIZE = 8
+DB_POOL_TIMEOUT = 5.0
+
+
+# --------------------------------------------------------------------
+# 📊 Connexion / curseur instrumentés (voir utils/sql_stats.py)
+# --------------------------------------------------------------------
+class CurseurInstrumente(sqlite3.Cursor):
+    """Mesure chaque instruction, exécution et lecture des lignes (fetch*) comprises."""
+
+    _suivi = None
+
+    def _mesurer(self, debut, sql=None, params=None):
+        duree = (time.perf_counter() - debut) * 1000
+        if sql is not None:
+            self._suivi = sql_stats.enregistrer(self.connection, sql, params, duree)
+        elif self._suivi is not None:
+            self._suivi.ajouter(duree)
+
+    def execute(self, sql, params=()):
+        debut = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._mesurer(debut, sql, params)
+
+    def executemany(self, sql, seq_params):
+        # Premier jeu de paramètres gardé pour l'EXPLAIN (sans matérialiser un générateur)
+        if isinstance(seq_params, (list, tuple)):
+            premier = seq_params[0] if seq_params else ()
+        else:
+            seq_params = iter(seq_params)
+            premier = next(seq_params, None)
+            seq_params = itertools.chain([premier], seq_params) if premier is not None else []
+        debut = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_params)
+        finally:
+            self._mesurer(debut, sql, premier or ())
+
+    def executescript(self, script):
+        debut = time.perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            self._mesurer(debut, script)
+
+    def fetchone(self):
+        debut = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._mesurer(debut)
+
+    def fetchmany(self, *args, **kwargs):
+        debut = time.perf_counter()
+        try:
+            return super().fetchmany(*args, **kwargs)
+        finally:
+            self._mesurer(debut)
+
+    def fetchall(self):
+        debut = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._mesurer(debut)
+
+
+class ConnexionInstrumentee(sqlite3.Connection):
+    """Connexion dont tous les curseurs (y compris conn.execute) sont instrumentés."""
+
+    def cursor(self, factory=CurseurInstrumente):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_params):
+        return self.cursor().executemany(sql, seq_params)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
 
 # --------------------------------------------------------------------
 # 🔌 Connexion SQLite robuste (avec WAL, timeout, foreign keys)
 # --------------------------------------------------------------------
-def get_connection():
-    """Retourne une connexion SQLite robuste."""
-    conn = sqlite3.connect(
-        DB_PATH,
-        timeout=60,
-        check_same_thread=False
-    )
-    conn.row_factory = sqlite3.Row
+class PooledConnection(ConnexionInstrumentee):
+    """
+    Connexion rendue au pool en fin de requête.
+    close() est neutralisé : les routes qui ferment « leur » connexion
+    ne cassent pas les requêtes suivantes de la même requête HTTP.
+    """
+
+    def close(self):
+        pass
 
+    def really_close(self):
+        super().close()
+
+
+def _configure(conn):
+    conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute("PRAGMA synchronous=NORMAL;")
     conn.execute("PRAGMA foreign_keys = ON;")
@@ -29,11 +130,196 @@ def get_connection():
     return conn
 
 
+def get_connection():
+    """Retourne une connexion SQLite robuste (hors pool)."""
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=60,
+        check_same_thread=False,
+        factory=ConnexionInstrumentee,
+    )
+    return _configure(conn)
+
+
+# --------------------------------------------------------------------
+# 🏊 Pool de connexions pré-configurées
+# --------------------------------------------------------------------
+class ConnectionPool:
+    """
+    Pool borné de connexions SQLite déjà configurées (PRAGMA exécutés
+    une seule fois à la création). Si le pool est saturé au-delà de
+    `timeout`, une connexion de débordement est ouverte puis fermée
+    à sa restitution.
+    """
+
+    def __init__(self, db_path, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.db_path = db_path
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._idle = []
+        self._created = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "waits": 0,
+            "wait_time_total_ms": 0.0,
+            "wait_time_max_ms": 0.0,
+            "overflow": 0,
+        }
+
+    def _new_connection(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=60,
+            check_same_thread=False,
+            factory=PooledConnection,
+        )
+        return _configure(conn)
+
+    def acquire(self):
+        with self._cond:
+            if self._idle:
+                self._stats["hits"] += 1
+                return self._idle.pop()
+            if self._created < self.size:
+                self._created += 1
+                self._stats["misses"] += 1
+                create = True
+            else:
+                create = False
+                start = time.perf_counter()
+                self._stats["waits"] += 1
+                self._cond.wait_for(lambda: self._idle, timeout=self.timeout)
+                waited = (time.perf_counter() - start) * 1000
+                self._stats["wait_time_total_ms"] += waited
+                self._stats["wait_time_max_ms"] = max(self._stats["wait_time_max_ms"], waited)
+                if self._idle:
+                    self._stats["hits"] += 1
+                    return self._idle.pop()
+                self._stats["overflow"] += 1
+
+        if create:
+            try:
+                return self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                raise
+
+        conn = self._new_connection()
+        conn._overflow = True
+        return conn
+
+    def release(self, conn):
+        if conn is None:
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Connexion inutilisable → on la remplace au prochain acquire
+            conn.really_close()
+            if not getattr(conn, "_overflow", False):
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+            return
+
+        if getattr(conn, "_overflow", False):
+            conn.really_close()
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            for conn in self._idle:
+                conn.really_close()
+            self._created -= len(self._idle)
+            self._idle = []
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data.update({
+                "size": self.size,
+                "created": self._created,
+                "idle": len(self._idle),
+                "in_use": self._created - len(self._idle),
+            })
+        total = data["hits"] + data["misses"]
+        data["hit_rate"] = round(data["hits"] / total, 4) if total else 0.0
+        data["wait_time_total_ms"] = round(data["wait_time_total_ms"], 3)
+        data["wait_time_max_ms"] = round(data["wait_time_max_ms"], 3)
+        return data
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_pool():
+    """Pool du processus courant (recréé après un fork ou un changement de DB_PATH)."""
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid() or pool.db_path != DB_PATH:
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid() or _pool.db_path != DB_PATH:
+                _pool = ConnectionPool(
+                    DB_PATH,
+                    size=int(os.environ.get("DB_POOL_SIZE", DB_POOL_SIZE)),
+                    timeout=float(os.environ.get("DB_POOL_TIMEOUT", DB_POOL_TIMEOUT)),
+                )
+            pool = _pool
+    return pool
+
+
+def pool_stats():
+    """Compteurs hit/miss/attente du pool, pour dimensionner DB_POOL_SIZE."""
+    return get_pool().stats()
+
+
 # --------------------------------------------------------------------
-# 🧩 Alias pour compatibilité Flask
+# 🧩 Connexion de la requête Flask (ou du thread hors requête)
 # --------------------------------------------------------------------
 def get_db():
-    return get_connection()
+    """
+    Retourne la connexion de la requête courante (stockée dans `g`),
+    ou celle du thread courant hors contexte Flask.
+    """
+    if has_app_context():
+        if "db_conn" not in g:
+            g.db_pool = get_pool()
+            g.db_conn = g.db_pool.acquire()
+        return g.db_conn
+
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        _local.pool = get_pool()
+        conn = _local.conn = _local.pool.acquire()
+    return conn
+
+
+def close_db(exc=None):
+    """Rend la connexion de la requête (ou du thread) au pool."""
+    if has_app_context():
+        conn = g.pop("db_conn", None)
+        pool = g.pop("db_pool", None)
+    else:
+        conn = getattr(_local, "conn", None)
+        pool = getattr(_local, "pool", None)
+        _local.conn = None
+    if conn is not None and pool is not None:
+        pool.release(conn)
+
+
+def init_db_pool(app):
+    """Branche la restitution des connexions sur la fin de chaque requête."""
+    app.teardown_appcontext(close_db)
 
 
 # --------------------------------------------------------------------
@@ -42,11 +328,10 @@ def get_db():
 def query_db(query, args=(), one=False, retries=3, delay=1):
     for attempt in range(retries):
         try:
-            conn = get_connection()
+            conn = get_db()
             cur = conn.execute(query, args)
             rows = cur.fetchall()
             cur.close()
-            conn.close()
             return (rows[0] if rows else None) if one else rows
         except sqlite3.OperationalError as e:
             if "locked" in str(e).lower() and attempt < retries - 1:
@@ -61,7 +346,7 @@ def query_db(query, args=(), one=False, retries=3, delay=1):
 def execute_db(query, args=(), many=False, retries=3, delay=1):
     for attempt in range(retries):
         try:
-            conn = get_connection()
+            conn = get_db()
             cur = conn.cursor()
             if many:
                 cur.executemany(query, args)
@@ -70,7 +355,6 @@ def execute_db(query, args=(), many=False, retries=3, delay=1):
             conn.commit()
             last_id = cur.lastrowid
             cur.close()
-            conn.close()
             return last_id
         except sqlite3.OperationalError as e:
             if "locked" in str(e).lower() and attempt < retries - 1:
@@ -79,12 +363,241 @@ def execute_db(query, args=(), many=False, retries=3, delay=1):
             raise
 
 
+# --------------------------------------------------------------------
+# 🔢 Versions de tables (incrémentées par trigger à chaque écriture)
+# --------------------------------------------------------------------
+TABLES_VERSIONNEES = [
+    "Projet", "collaborateurs", "collaborateur_repartition", "profils",
+    "affectation", "programme", "domaines", "categorie", "statut", "statut_demande",
+    "regle_complexite", "sous_domaine_collaborateur", "valeur_metier", "complexite",
+    "caf_requise_semaine",
+]
+
+
+def _installer_versions_tables(cur):
+    """
+    Crée table_versions et les triggers INSERT/UPDATE/DELETE des tables suivies.
+    Retourne False si certaines tables suivies n'existent pas encore.
+    """
+    complet = True
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            nom TEXT PRIMARY KEY COLLATE NOCASE,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    for table in TABLES_VERSIONNEES:
+        existe = cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ? COLLATE NOCASE", [table]
+        ).fetchone()
+        if not existe:
+            complet = False
+            continue
+        cur.execute("INSERT OR IGNORE INTO table_versions (nom, version) VALUES (?, 0)", [table])
+        for evenement in ("INSERT", "UPDATE", "DELETE"):
+            cur.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_version_{table.lower()}_{evenement.lower()}
+                AFTER {evenement} ON "{table}"
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE nom = '{table}';
+                END
+            """)
+    return complet
+
+
+def versions_tables(tables):
+    """Tuple des versions courantes des tables (clé d'invalidation des caches)."""
+    if not tables:
+        return ()
+    rows = query_db(
+        f"SELECT nom, version FROM table_versions WHERE nom IN ({','.join('?' * len(tables))})",
+        list(tables)
+    )
+    versions = {r["nom"].lower(): r["version"] for r in rows}
+    return tuple(versions.get(t.lower()) for t in tables)
+
+
+# --------------------------------------------------------------------
+# 🔎 Index plein texte FTS5 (projets / collaborateurs)
+# --------------------------------------------------------------------
+# unicode61 + remove_diacritics : insensible à la casse et aux accents ;
+# « œ » n'est pas une diacritique → remplacé par « oe » comme utils.text_utils.normalize_text.
+FTS_TOKENIZE = "unicode61 remove_diacritics 2"
+
+
+def _fts(expr):
+    return f"replace(replace({expr}, 'œ', 'oe'), 'Œ', 'OE')"
+
+
+FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS projet_fts
+    USING fts5(titre, programme, domaine, tokenize="{FTS_TOKENIZE}");
+
+CREATE VIRTUAL TABLE IF NOT EXISTS collaborateur_fts
+    USING fts5(matricule, nom, prenom, profil, affectation, tokenize="{FTS_TOKENIZE}");
+
+-- Projet → projet_fts (rowid = Projet.id)
+CREATE TRIGGER IF NOT EXISTS trg_projet_fts_insert AFTER INSERT ON "Projet"
+BEGIN
+    INSERT INTO projet_fts (rowid, titre, programme, domaine) VALUES (
+        new.id, {_fts("new.titre_projet")},
+        {_fts('(SELECT nom FROM "Programme" WHERE id = new.id_programme)')},
+        {_fts("(SELECT nom FROM domaines WHERE id = new.id_domaine)")}
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS trg_projet_fts_update
+AFTER UPDATE OF id, titre_projet, id_programme, id_domaine ON "Projet"
+BEGIN
+    DELETE FROM projet_fts WHERE rowid = old.id;
+    INSERT INTO projet_fts (rowid, titre, programme, domaine) VALUES (
+        new.id, {_fts("new.titre_projet")},
+        {_fts('(SELECT nom FROM "Programme" WHERE id = new.id_programme)')},
+        {_fts("(SELECT nom FROM domaines WHERE id = new.id_domaine)")}
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS trg_projet_fts_delete AFTER DELETE ON "Projet"
+BEGIN
+    DELETE FROM projet_fts WHERE rowid = old.id;
+END;
+
+-- Programme / domaines → colonnes dénormalisées de projet_fts
+CREATE TRIGGER IF NOT EXISTS trg_programme_fts_update AFTER UPDATE OF nom ON "Programme"
+BEGIN
+    UPDATE projet_fts SET programme = {_fts("new.nom")}
+    WHERE rowid IN (SELECT id FROM "Projet" WHERE id_programme = new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_programme_fts_delete AFTER DELETE ON "Programme"
+BEGIN
+    UPDATE projet_fts SET programme = NULL
+    WHERE rowid IN (SELECT id FROM "Projet" WHERE id_programme = old.id);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_domaine_fts_update AFTER UPDATE OF nom ON domaines
+BEGIN
+    UPDATE projet_fts SET domaine = {_fts("new.nom")}
+    WHERE rowid IN (SELECT id FROM "Projet" WHERE id_domaine = new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_domaine_fts_delete AFTER DELETE ON domaines
+BEGIN
+    UPDATE projet_fts SET domaine = NULL
+    WHERE rowid IN (SELECT id FROM "Projet" WHERE id_domaine = old.id);
+END;
+
+-- collaborateurs → collaborateur_fts (rowid = collaborateurs.rowid)
+CREATE TRIGGER IF NOT EXISTS trg_collaborateur_fts_insert AFTER INSERT ON collaborateurs
+BEGIN
+    INSERT INTO collaborateur_fts (rowid, matricule, nom, prenom, profil, affectation) VALUES (
+        new.rowid, new.matricule, {_fts("new.nom")}, {_fts("new.prenom")},
+        {_fts("(SELECT nom FROM profils WHERE id = new.profil_id)")},
+        {_fts("(SELECT nom FROM affectation WHERE id = new.affectation_id)")}
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS trg_collaborateur_fts_update
+AFTER UPDATE OF matricule, nom, prenom, profil_id, affectation_id ON collaborateurs
+BEGIN
+    DELETE FROM collaborateur_fts WHERE rowid = old.rowid;
+    INSERT INTO collaborateur_fts (rowid, matricule, nom, prenom, profil, affectation) VALUES (
+        new.rowid, new.matricule, {_fts("new.nom")}, {_fts("new.prenom")},
+        {_fts("(SELECT nom FROM profils WHERE id = new.profil_id)")},
+        {_fts("(SELECT nom FROM affectation WHERE id = new.affectation_id)")}
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS trg_collaborateur_fts_delete AFTER DELETE ON collaborateurs
+BEGIN
+    DELETE FROM collaborateur_fts WHERE rowid = old.rowid;
+END;
+
+-- profils / affectation → colonnes dénormalisées de collaborateur_fts
+CREATE TRIGGER IF NOT EXISTS trg_profil_fts_update AFTER UPDATE OF nom ON profils
+BEGIN
+    UPDATE collaborateur_fts SET profil = {_fts("new.nom")}
+    WHERE rowid IN (SELECT rowid FROM collaborateurs WHERE profil_id = new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_affectation_fts_update AFTER UPDATE OF nom ON affectation
+BEGIN
+    UPDATE collaborateur_fts SET affectation = {_fts("new.nom")}
+    WHERE rowid IN (SELECT rowid FROM collaborateurs WHERE affectation_id = new.id);
+END;
+"""
+
+FTS_REMPLISSAGE = {
+    "projet_fts": ('"Projet"', f"""
+        INSERT INTO projet_fts (rowid, titre, programme, domaine)
+        SELECT p.id, {_fts("p.titre_projet")}, {_fts("prog.nom")}, {_fts("d.nom")}
+        FROM "Projet" p
+        LEFT JOIN "Programme" prog ON prog.id = p.id_programme
+        LEFT JOIN domaines d ON d.id = p.id_domaine
+    """),
+    "collaborateur_fts": ("collaborateurs", f"""
+        INSERT INTO collaborateur_fts (rowid, matricule, nom, prenom, profil, affectation)
+        SELECT c.rowid, c.matricule, {_fts("c.nom")}, {_fts("c.prenom")}, {_fts("p.nom")}, {_fts("a.nom")}
+        FROM collaborateurs c
+        LEFT JOIN profils p ON p.id = c.profil_id
+        LEFT JOIN affectation a ON a.id = c.affectation_id
+    """),
+}
+
+
+def _installer_fts(cur):
+    """
+    Tables FTS5 + triggers de synchronisation ; (re)remplissage si désynchronisées.
+    Retourne False si les tables sources sont absentes.
+    """
+    tables = {r[0].lower() for r in cur.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if not {"projet", "programme", "domaines", "collaborateurs", "profils", "affectation"} <= tables:
+        print("⚠️ Index FTS non installé : tables sources absentes.")
+        return False
+
+    cur.executescript(FTS_SCHEMA)
+    for table_fts, (source, remplissage) in FTS_REMPLISSAGE.items():
+        nb_fts = cur.execute(f"SELECT COUNT(*) FROM {table_fts}").fetchone()[0]
+        nb_source = cur.execute(f"SELECT COUNT(*) FROM {source}").fetchone()[0]
+        if nb_fts != nb_source:
+            cur.execute(f"DELETE FROM {table_fts}")
+            cur.execute(remplissage)
+    return True
+
+
+# --------------------------------------------------------------------
+# 🏷️ Version du schéma (initialisation sautée si déjà appliquée)
+# --------------------------------------------------------------------
+# À incrémenter quand les ALTER TABLE d'init_db changent ; le texte des
+# scripts SCHEMA / FTS, la liste des tables versionnées et les
+# migrations (utils/migrations.py) sont déjà pris en compte par l'empreinte.
+SCHEMA_VERSION = 1
+
+
+def _signature_schema(schema):
+    contenu = "\n".join([schema, FTS_SCHEMA, ",".join(TABLES_VERSIONNEES), ",".join(m[0] for m in MIGRATIONS)])
+    return f"{SCHEMA_VERSION}-{hashlib.sha1(contenu.encode()).hexdigest()[:12]}"
+
+
+def _version_installee(cur, nom="init"):
+    try:
+        row = cur.execute("SELECT version FROM schema_version WHERE nom = ?", [nom]).fetchone()
+    except sqlite3.OperationalError:
+        return None  # table pas encore créée
+    return row[0] if row else None
+
+
+def _enregistrer_version(cur, version, nom="init"):
+    cur.execute(SCHEMA_VERSION_TABLE)
+    cur.execute("""
+        INSERT INTO schema_version (nom, version) VALUES (?, ?)
+        ON CONFLICT(nom) DO UPDATE SET version = excluded.version, appliquee_le = CURRENT_TIMESTAMP
+    """, [nom, version])
+
+
 # --------------------------------------------------------------------
 # 🏗️ Initialisation de la base
 # --------------------------------------------------------------------
-def init_db():
-    """Initialise la base et configure WAL."""
+def init_db(force=False):
+    """
+    Initialise la base et configure WAL.
+    Sautée si la version de schéma enregistrée correspond déjà
+    (force=True ou INIT_DB_FORCE=1 pour la rejouer).
+    """
     try:
+        debut = time.perf_counter()
         conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
         conn.row_factory = sqlite3.Row
         cur = conn.cursor()
@@ -280,8 +793,65 @@ def init_db():
             udate DATETIME DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (profil_id) REFERENCES profils(id)
         );
+
+        -- CAF requise matérialisée : contribution par projet
+        CREATE TABLE IF NOT EXISTS caf_requise_projet (
+            projet_id INTEGER NOT NULL,
+            annee INTEGER NOT NULL,
+            semaine INTEGER NOT NULL,
+            profil_id INTEGER NOT NULL,
+            jh REAL NOT NULL DEFAULT 0,
+            jh_arrondi REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (projet_id, annee, semaine, profil_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_caf_requise_projet_cellule
+            ON caf_requise_projet (annee, semaine, profil_id);
+
+        -- CAF requise matérialisée : total profil × semaine
+        CREATE TABLE IF NOT EXISTS caf_requise_semaine (
+            annee INTEGER NOT NULL,
+            semaine INTEGER NOT NULL,
+            profil_id INTEGER NOT NULL,
+            jh REAL NOT NULL DEFAULT 0,
+            jh_arrondi REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (annee, semaine, profil_id)
+        );
+
+        -- CAF requise matérialisée : projets dont le rafraîchissement a échoué
+        -- (repris au rafraîchissement suivant)
+        CREATE TABLE IF NOT EXISTS caf_requise_a_rafraichir (
+            projet_id INTEGER NOT NULL UNIQUE,
+            idate DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Jobs d'import Excel exécutés en arrière-plan
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            statut TEXT NOT NULL DEFAULT 'en_attente',
+            fichier TEXT,
+            log_path TEXT,
+            redirection TEXT,
+            total INTEGER DEFAULT 0,
+            lignes_lues INTEGER DEFAULT 0,
+            lignes_inserees INTEGER DEFAULT 0,
+            lignes_rejetees INTEGER DEFAULT 0,
+            message TEXT,
+            categorie TEXT,
+            iuser TEXT,
+            idate DATETIME DEFAULT CURRENT_TIMESTAMP,
+            udate DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
         """
 
+        signature = _signature_schema(SCHEMA)
+        force = force or os.environ.get("INIT_DB_FORCE", "0") == "1"
+        if not force and _version_installee(cur) == signature:
+            cur.close()
+            conn.close()
+            print(f"✅ Schéma à jour (version {signature}) : initialisation ignorée.")
+            return
+
         cur.executescript(SCHEMA)
 
         # ================================================================
@@ -312,10 +882,17 @@ def init_db():
         if cur.fetchone()[0] == 0:
             cur.execute("ALTER TABLE accompagnement_externe ADD COLUMN date_productivite DATE;")
 
+        versions_ok = _installer_versions_tables(cur)
+        fts_ok = _installer_fts(cur)
+        migrations_ok = appliquer_migrations(conn)
+        # Version enregistrée seulement si tout a pu être installé
+        if versions_ok and fts_ok and migrations_ok:
+            _enregistrer_version(cur, signature)
+
         conn.commit()
         cur.close()
         conn.close()
-        print("✅ Base initialisée et configurée avec succès (WAL activé).")
+        print(f"✅ Base initialisée et configurée avec succès (WAL activé) en {(time.perf_counter() - debut) * 1000:.0f} ms.")
 
     except Exception as e:
         print(f"❌ Erreur init_db: {e}")
@@ -0,0 +1,193 @@
+# utils/excel_stream.py
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# 📖 Lecture en flux des classeurs Excel (imports volumineux)
+#
+# Les lignes de la première feuille sont lues une à une
+# (openpyxl read_only pour .xlsx/.xlsm, pyxlsb pour .xlsb) au lieu de
+# charger toute la feuille avec pd.read_excel. Les valeurs sont
+# converties comme le fait pandas : cellules vides et textes « NA »
+# → NaN, flottants entiers → int, dates → pd.Timestamp, colonnes sans
+# titre → « Unnamed: i », titres en double → « titre.1 ».
+# ============================================================
+
+# Valeurs considérées comme manquantes par pd.read_excel (na_values par défaut)
+VALEURS_NA = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+}
+
+
+def _convertir(valeur):
+    if valeur is None:
+        return np.nan
+    if isinstance(valeur, bool):
+        return valeur
+    if isinstance(valeur, float):
+        return int(valeur) if valeur.is_integer() else valeur
+    if isinstance(valeur, datetime.datetime):
+        return pd.Timestamp(valeur)
+    if isinstance(valeur, str) and valeur in VALEURS_NA:
+        return np.nan
+    return valeur
+
+
+def _est_vide(ligne):
+    return all(v is None or v == "" for v in ligne)
+
+
+# ============================================================
+# 🔌 Lecteurs bruts par format (valeurs non converties)
+# ============================================================
+def _lignes_openpyxl(filepath, dimensions):
+    from openpyxl import load_workbook
+    from openpyxl.cell.cell import TYPE_ERROR
+
+    wb = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        dimensions["lignes"] = ws.max_row
+        # Dimensions parfois fausses dans le fichier : lecture jusqu'à la dernière ligne réelle
+        ws.reset_dimensions()
+        for row in ws.rows:
+            yield [None if c.data_type == TYPE_ERROR else c.value for c in row]
+    finally:
+        wb.close()
+
+
+def _lignes_pyxlsb(filepath, dimensions):
+    from pyxlsb import open_workbook
+
+    with open_workbook(filepath) as wb:
+        with wb.get_sheet(1) as sheet:
+            dimensions["lignes"] = sheet.dimension.h if sheet.dimension else None
+            precedente = -1
+            for row in sheet.rows(sparse=True):
+                if not row:
+                    continue
+                numero = row[0].r
+                # Lignes vides absentes en mode sparse : on les restitue
+                for _ in range(numero - precedente - 1):
+                    yield []
+                ligne = []
+                for cell in row:
+                    ligne.extend([None] * (cell.c - len(ligne)))
+                    ligne.append(cell.v)
+                yield ligne
+                precedente = numero
+
+
+def _lignes_pandas(filepath, dimensions):
+    """Formats non lisibles en flux (.xls) : lecture complète, restituée ligne par ligne."""
+    df = pd.read_excel(filepath, header=None, dtype=object)
+    dimensions["lignes"] = len(df)
+    for ligne in df.itertuples(index=False, name=None):
+        yield [None if pd.isna(v) else v for v in ligne]
+
+
+def lire_lignes(filepath, dimensions=None):
+    """
+    Itère les lignes de la première feuille, valeurs converties.
+    Les lignes vides en fin de feuille sont ignorées (comme pandas).
+    `dimensions` (dict) reçoit le nombre de lignes annoncé par le fichier.
+    """
+    dimensions = {} if dimensions is None else dimensions
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        brutes = _lignes_openpyxl(filepath, dimensions)
+    elif ext == ".xlsb":
+        brutes = _lignes_pyxlsb(filepath, dimensions)
+    else:
+        brutes = _lignes_pandas(filepath, dimensions)
+
+    vides = 0
+    for ligne in brutes:
+        if _est_vide(ligne):
+            vides += 1
+            continue
+        # Lignes vides intermédiaires conservées (elles comptent dans les blocs)
+        for _ in range(vides):
+            yield []
+        vides = 0
+        yield [_convertir(v) for v in ligne]
+
+
+def _noms_colonnes(entete):
+    """Titres de colonnes comme pandas : « Unnamed: i » et suffixes .1, .2 des doublons."""
+    noms, vus = [], {}
+    for i, v in enumerate(entete):
+        nom = f"Unnamed: {i}" if v is None or v == "" or (isinstance(v, float) and np.isnan(v)) else v
+        if nom in vus:
+            vus[nom] += 1
+            nom_unique = f"{nom}.{vus[nom]}"
+            while nom_unique in vus:
+                vus[nom] += 1
+                nom_unique = f"{nom}.{vus[nom]}"
+            vus[nom_unique] = 0
+            nom = nom_unique
+        else:
+            vus[nom] = 0
+        noms.append(nom)
+    return noms
+
+
+# ============================================================
+# 🧱 Blocs projet (1 projet = 3 lignes, repéré par la colonne « ref ogp »)
+# ============================================================
+class LecteurBlocsProjets:
+    """
+    Lit le classeur en flux et produit les blocs projet au fil de la lecture,
+    sous forme de petits DataFrame (mêmes accès iloc / get qu'avec pd.read_excel).
+
+        lecteur = LecteurBlocsProjets(filepath, normaliser=normalize_text)
+        lecteur.colonnes        → titres normalisés
+        for chunk in lecteur:   → DataFrame de 3 lignes (ou moins en fin de fichier)
+    """
+
+    def __init__(self, filepath, normaliser=None, cle="ref ogp", taille=3):
+        self.dimensions = {}
+        self._lignes = lire_lignes(filepath, self.dimensions)
+        entete = next(self._lignes, [])
+        colonnes = _noms_colonnes(entete)
+        self.colonnes = [normaliser(c) for c in colonnes] if normaliser else colonnes
+        self.cle = cle
+        self.taille = taille
+        self.lignes_lues = 0
+        self.nb_blocs = 0
+
+    @property
+    def total_lignes(self):
+        """Nombre de lignes de données annoncé par le fichier (None si inconnu)."""
+        lignes = self.dimensions.get("lignes")
+        return max(0, lignes - 1) if lignes else None
+
+    def _frame(self, bloc):
+        self.nb_blocs += 1
+        return pd.DataFrame(bloc, columns=self.colonnes, dtype=object)
+
+    def __iter__(self):
+        largeur = len(self.colonnes)
+        pos_cle = self.colonnes.index(self.cle) if self.cle in self.colonnes else None
+        bloc = []
+        for ligne in self._lignes:
+            self.lignes_lues += 1
+            ligne = (ligne + [np.nan] * (largeur - len(ligne)))[:largeur]
+            if not bloc:
+                ref = str(ligne[pos_cle]).strip() if pos_cle is not None else ""
+                if not ref or ref.lower() == "nan":
+                    continue
+            bloc.append(ligne)
+            if len(bloc) == self.taille:
+                yield self._frame(bloc)
+                bloc = []
+        if bloc:
+            yield self._frame(bloc)
+
+    def fermer(self):
+        self._lignes.close()
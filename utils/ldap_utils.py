@@ -1,110 +1,225 @@
 import os
+import queue
+import threading
+import time
 
 import ldap3
-
-
-def ldap_authenticate(username: str, password: str):
+from ldap3.core.exceptions import LDAPBindError, LDAPException
+from ldap3.utils.conv import escape_filter_chars
+
+# ============================================================
+# 🔐 Client LDAP / Active Directory
+#
+# Un seul Server (infos du serveur lues une fois, au premier bind
+# technique), un petit pool de connexions techniques déjà liées,
+# un cache court des recherches sAMAccountName → DN/cn/mail et des
+# délais de connexion / réponse / recherche. Le mot de passe est
+# toujours vérifié par un vrai bind (jamais mis en cache).
+# (surchargés par LDAP_POOL_SIZE / LDAP_CONNECT_TIMEOUT /
+#  LDAP_RECEIVE_TIMEOUT / LDAP_SEARCH_TIMEOUT / LDAP_CACHE_TTL dans .env)
+# ============================================================
+LDAP_POOL_SIZE = 4
+LDAP_CONNECT_TIMEOUT = 5     # secondes
+LDAP_RECEIVE_TIMEOUT = 10    # secondes
+LDAP_SEARCH_TIMEOUT = 5      # secondes (limite côté serveur)
+LDAP_CACHE_TTL = 300         # secondes
+LDAP_CACHE_MAX = 2000        # entrées
+
+ATTRIBUTS = ["cn", "mail", "sAMAccountName", "distinguishedName"]
+
+
+class ClientLDAP:
     """
-
-    Authentifie un utilisateur via Active Directory (LDAP).
-
+    Client réutilisable (un par processus).
+    `server` / `client_strategy` permettent de le brancher sur un serveur
+    ldap3 en mémoire (strategy MOCK_SYNC) pour les essais.
     """
 
-    # 🔹 Chargement des variables d’environnement
-
-    ldap_url = os.getenv("LDAP_URL")
-
-    bind_dn = os.getenv("LDAP_BIND_DN")
-
-    bind_password = os.getenv("LDAP_BIND_PASSWORD")
-
-    base_dn = os.getenv("LDAP_BASE_DN")
-
-    # 🔍 Vérification des paramètres essentiels
-
-    if not ldap_url or not bind_dn or not bind_password or not base_dn:
-        print("❌ Erreur : les variables LDAP ne sont pas correctement chargées depuis le fichier ..env")
-
-        print(f"LDAP_URL={ldap_url}, BIND_DN={bind_dn}, BASE_DN={base_dn}")
-
-        return None
-
-    print(f"🔗 Tentative de connexion LDAP au serveur {ldap_url} …")
-
-    # ✅ Connexion au serveur LDAP avec le compte technique
-
-    server = ldap3.Server(ldap_url, get_info=ldap3.ALL)
-
-    try:
-
-        conn = ldap3.Connection(server, user=bind_dn, password=bind_password, auto_bind=True)
-
-    except Exception as e:
-
-        print(f"❌ Impossible d’établir la connexion LDAP technique : {e}")
-
-        return None
-
-    # 🔍 Recherche de l’utilisateur dans le répertoire AD
-
-    search_filter = f"(sAMAccountName={username})"
-
-    try:
-
-        conn.search(base_dn, search_filter, attributes=["cn", "mail", "sAMAccountName", "distinguishedName"])
-
-    except Exception as e:
-
-        print(f"❌ Erreur lors de la recherche de l’utilisateur {username} : {e}")
-
-        conn.unbind()
-
-        return None
-
-    if not conn.entries:
-        print(f"❌ Utilisateur {username} introuvable dans {base_dn}")
-
+    def __init__(self, url, bind_dn, bind_password, base_dn,
+                 pool_size=LDAP_POOL_SIZE, connect_timeout=LDAP_CONNECT_TIMEOUT,
+                 receive_timeout=LDAP_RECEIVE_TIMEOUT, search_timeout=LDAP_SEARCH_TIMEOUT,
+                 cache_ttl=LDAP_CACHE_TTL, server=None, client_strategy=ldap3.SYNC):
+        self.server = server or ldap3.Server(url, get_info=ldap3.ALL, connect_timeout=connect_timeout)
+        self.bind_dn = bind_dn
+        self.bind_password = bind_password
+        self.base_dn = base_dn
+        self.pool_size = max(1, int(pool_size))
+        self.connect_timeout = connect_timeout
+        self.receive_timeout = receive_timeout
+        self.search_timeout = search_timeout
+        self.cache_ttl = cache_ttl
+        self.client_strategy = client_strategy
+        self._libres = queue.LifoQueue()
+        self._crees = 0
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._infos_lues = False
+
+    # ---------- Pool de connexions techniques ----------
+    def _connexion(self, user, password, lire_infos=False):
+        conn = ldap3.Connection(
+            self.server, user=user, password=password,
+            client_strategy=self.client_strategy, receive_timeout=self.receive_timeout,
+        )
+        conn.open(read_server_info=False)
+        if not conn.bind(read_server_info=lire_infos):
+            conn.unbind()
+            raise LDAPBindError(conn.last_error or f"bind refusé pour {user}")
+        return conn
+
+    def _acquerir(self):
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            creer = self._crees < self.pool_size
+            if creer:
+                self._crees += 1
+                lire_infos = not self._infos_lues
+                self._infos_lues = True
+        if not creer:
+            # Pool saturé : on attend qu'une connexion soit rendue
+            return self._libres.get(timeout=self.connect_timeout + self.receive_timeout)
+        try:
+            return self._connexion(self.bind_dn, self.bind_password, lire_infos=lire_infos)
+        except Exception:
+            with self._lock:
+                self._crees -= 1
+                if lire_infos:
+                    self._infos_lues = False
+            raise
+
+    def _rendre(self, conn, valide=True):
+        if valide:
+            self._libres.put(conn)
+            return
+        try:
+            conn.unbind()
+        except Exception:
+            pass
+        with self._lock:
+            self._crees -= 1
+
+    def fermer(self):
+        """Délie toutes les connexions techniques inactives."""
+        while True:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                return
+            self._rendre(conn, valide=False)
+
+    # ---------- Recherche (avec cache) ----------
+    def rechercher(self, username):
+        """Entrée annuaire {dn, username, fullname, email} du compte, ou None."""
+        cle = username.lower()
+        maintenant = time.monotonic()
+        entree = self._cache.get(cle)
+        if entree and entree[0] > maintenant:
+            return entree[1]
+
+        filtre = f"(sAMAccountName={escape_filter_chars(username)})"
+        for tentative in (1, 2):
+            conn = self._acquerir()
+            try:
+                conn.search(self.base_dn, filtre, attributes=ATTRIBUTS, time_limit=self.search_timeout)
+                entries = list(conn.entries)
+            except LDAPException:
+                # Connexion coupée par le serveur : on la remplace et on réessaie une fois
+                self._rendre(conn, valide=False)
+                if tentative == 2:
+                    raise
+                continue
+            self._rendre(conn)
+            break
+
+        if not entries:
+            return None
+        e = entries[0]
+        attributs = e.entry_attributes_as_dict
+        resultat = {
+            "dn": e.entry_dn,
+            "username": str(e.sAMAccountName),
+            "fullname": str(e.cn),
+            "email": str(attributs["mail"][0]) if attributs.get("mail") else "",
+        }
+        if len(self._cache) >= LDAP_CACHE_MAX:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > maintenant}
+        self._cache[cle] = (maintenant + self.cache_ttl, resultat)
+        return resultat
+
+    def vider_cache(self):
+        self._cache = {}
+
+    # ---------- Authentification ----------
+    def authentifier(self, username, password):
+        """Vérifie le mot de passe par un bind sur le DN de l'utilisateur."""
+        if not password:
+            return None  # un bind sans mot de passe serait anonyme
+        try:
+            compte = self.rechercher(username)
+        except Exception as e:
+            print(f"❌ Erreur lors de la recherche de l’utilisateur {username} : {e}")
+            return None
+        if not compte:
+            print(f"❌ Utilisateur {username} introuvable dans {self.base_dn}")
+            return None
+
+        try:
+            conn = self._connexion(compte["dn"], password)
+        except LDAPBindError:
+            # DN du cache peut-être périmé (compte déplacé) : relu au prochain essai
+            self._cache.pop(username.lower(), None)
+            print(f"❌ Mot de passe incorrect pour {username}")
+            return None
+        except Exception as e:
+            print(f"❌ Erreur inattendue lors de l’authentification de {username} : {e}")
+            return None
         conn.unbind()
 
-        return None
-
-    user_entry = conn.entries[0]
-
-    user_dn = user_entry.entry_dn
-
-    print(f"✅ Utilisateur trouvé : {user_dn}")
-
-    # ✅ Vérification du mot de passe utilisateur (authentification réelle)
-
-    try:
-
-        user_conn = ldap3.Connection(server, user=user_dn, password=password, auto_bind=True)
-
         print(f"✅ Authentification réussie pour {username}")
+        return {"username": compte["username"], "fullname": compte["fullname"], "email": compte["email"]}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def client_ldap():
+    """Client du processus, créé à la première authentification (None si .env incomplet)."""
+    global _client
+    if _client is None:
+        ldap_url = os.getenv("LDAP_URL")
+        bind_dn = os.getenv("LDAP_BIND_DN")
+        bind_password = os.getenv("LDAP_BIND_PASSWORD")
+        base_dn = os.getenv("LDAP_BASE_DN")
+
+        # 🔍 Vérification des paramètres essentiels
+        if not ldap_url or not bind_dn or not bind_password or not base_dn:
+            print("❌ Erreur : les variables LDAP ne sont pas correctement chargées depuis le fichier .env")
+            print(f"LDAP_URL={ldap_url}, BIND_DN={bind_dn}, BASE_DN={base_dn}")
+            return None
+
+        with _client_lock:
+            if _client is None:
+                print(f"🔗 Initialisation du client LDAP ({ldap_url}) …")
+                _client = ClientLDAP(
+                    ldap_url, bind_dn, bind_password, base_dn,
+                    pool_size=int(os.getenv("LDAP_POOL_SIZE", LDAP_POOL_SIZE)),
+                    connect_timeout=float(os.getenv("LDAP_CONNECT_TIMEOUT", LDAP_CONNECT_TIMEOUT)),
+                    receive_timeout=float(os.getenv("LDAP_RECEIVE_TIMEOUT", LDAP_RECEIVE_TIMEOUT)),
+                    search_timeout=int(os.getenv("LDAP_SEARCH_TIMEOUT", LDAP_SEARCH_TIMEOUT)),
+                    cache_ttl=float(os.getenv("LDAP_CACHE_TTL", LDAP_CACHE_TTL)),
+                )
+    return _client
 
-        return {
-
-            "username": str(user_entry.sAMAccountName),
-
-            "fullname": str(user_entry.cn),
-
-            "email": str(user_entry.mail) if "mail" in user_entry else ""
-
-        }
-
-    except ldap3.core.exceptions.LDAPBindError:
-
-        print(f"❌ Mot de passe incorrect pour {username}")
-
-        return None
-
-    except Exception as e:
-
-        print(f"❌ Erreur inattendue lors de l’authentification de {username} : {e}")
 
+def ldap_authenticate(username: str, password: str):
+    """
+    Authentifie un utilisateur via Active Directory (LDAP).
+    """
+    client = client_ldap()
+    if client is None:
         return None
-
-    finally:
-
-        conn.unbind()
-
+    return client.authentifier(username, password)
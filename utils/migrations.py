@@ -0,0 +1,116 @@
+# utils/migrations.py
+import sqlite3
+
+# ============================================================
+# 🧱 Migrations versionnées du schéma
+#
+# Chaque migration est appliquée une seule fois, dans sa propre
+# transaction, puis enregistrée dans schema_version (nom = identifiant).
+# Une migration dont les tables n'existent pas encore reste en attente
+# et sera rejouée au prochain démarrage.
+# Une instruction est du SQL, ou une fonction (conn) pour les données
+# calculées en Python ; elle ne doit pas valider la transaction.
+# Ne jamais modifier une migration livrée : en ajouter une nouvelle.
+# ============================================================
+
+SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        nom TEXT PRIMARY KEY,
+        version TEXT NOT NULL,
+        appliquee_le DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def _reconstruire_caf_requise(conn):
+    from services.caf_requise_semaine import reconstruire
+    reconstruire(conn)
+
+
+# (identifiant, tables requises, instructions)
+MIGRATIONS = [
+    ("0001_index_requetes", ("Projet", "complexite_projet", "valeur_metier_projet",
+                             "collaborateur_repartition", "collaborateurs", "complexite",
+                             "valeur_metier", "projets"), [
+        # Listes projets / demandes IT : type = 'it', retenue = 1|2|NULL
+        "CREATE INDEX IF NOT EXISTS idx_projet_type_retenue ON Projet (type, retenue)",
+        "CREATE INDEX IF NOT EXISTS idx_projet_retenue ON Projet (retenue)",
+        # Demandes à retenir / chiffrées
+        "CREATE INDEX IF NOT EXISTS idx_projet_statut_demande ON Projet (id_statut_demande)",
+        # Reclassement des priorités (ORDER BY score_wsjf DESC, id)
+        "CREATE INDEX IF NOT EXISTS idx_projet_score_wsjf ON Projet (score_wsjf DESC, id)",
+        # Projets d'un programme (configuration, triggers FTS)
+        "CREATE INDEX IF NOT EXISTS idx_projet_programme ON Projet (id_programme)",
+        # Critères d'un projet
+        "CREATE INDEX IF NOT EXISTS idx_complexite_projet_projet ON complexite_projet (id_projet)",
+        "CREATE INDEX IF NOT EXISTS idx_valeur_metier_projet_projet ON valeur_metier_projet (id_projet)",
+        # Répartitions secondaires des collaborateurs
+        "CREATE INDEX IF NOT EXISTS idx_collaborateur_repartition_collab "
+        "ON collaborateur_repartition (collaborateur_id)",
+        # CAF par profil
+        "CREATE INDEX IF NOT EXISTS idx_collaborateurs_profil ON collaborateurs (profil_id)",
+        # Listes déroulantes dépendantes (libellé → type → valeur)
+        "CREATE INDEX IF NOT EXISTS idx_complexite_libelle ON complexite (libelle, type_libelle)",
+        "CREATE INDEX IF NOT EXISTS idx_valeur_metier_libelle ON valeur_metier (libelle, type_libelle)",
+        # Ancienne table projets : projets d'un programme
+        "CREATE INDEX IF NOT EXISTS idx_projets_programme ON projets (programme_id, score_wsjf)",
+    ]),
+    ("0002_caf_requise_remplissage", ("projets", "projet_phases", "phase_profils_programme",
+                                      "caf_requise_projet", "caf_requise_semaine",
+                                      "caf_requise_a_rafraichir"), [
+        # Remplissage initial de la CAF requise matérialisée (hors requêtes HTTP)
+        _reconstruire_caf_requise,
+    ]),
+    ("0003_index_dependances_profil", ("disponibilites", "phase_profils_programme",
+                                       "hypotheses_profils", "programme_profils"), [
+        # Suppression d'un profil : comptage des lignes qui le référencent
+        "CREATE INDEX IF NOT EXISTS idx_disponibilites_profil ON disponibilites (profil_id)",
+        "CREATE INDEX IF NOT EXISTS idx_phase_profils_programme_profil ON phase_profils_programme (profil_id)",
+        "CREATE INDEX IF NOT EXISTS idx_hypotheses_profils_profil ON hypotheses_profils (profil_id)",
+        "CREATE INDEX IF NOT EXISTS idx_programme_profils_profil ON programme_profils (profil_id)",
+    ]),
+]
+
+
+def _tables_absentes(conn, tables):
+    existantes = {r[0].lower() for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return [t for t in tables if t.lower() not in existantes]
+
+
+def migrations_appliquees(conn):
+    """Identifiants des migrations déjà appliquées."""
+    try:
+        return {r[0] for r in conn.execute("SELECT nom FROM schema_version")}
+    except sqlite3.OperationalError:
+        return set()  # table pas encore créée
+
+
+def appliquer_migrations(conn):
+    """
+    Applique les migrations en attente, dans l'ordre.
+    Retourne True si toutes sont appliquées (False si certaines attendent des tables).
+    """
+    conn.commit()  # chaque migration a sa propre transaction
+    conn.execute(SCHEMA_VERSION_TABLE)
+    deja = migrations_appliquees(conn)
+    complet = True
+
+    for numero, (identifiant, tables, instructions) in enumerate(MIGRATIONS, start=1):
+        if identifiant in deja:
+            continue
+        absentes = _tables_absentes(conn, tables)
+        if absentes:
+            print(f"⚠️ Migration {identifiant} en attente : tables absentes ({', '.join(absentes)}).")
+            complet = False
+            continue
+        try:
+            conn.execute("BEGIN")
+            for sql in instructions:
+                sql(conn) if callable(sql) else conn.execute(sql)
+            conn.execute("INSERT INTO schema_version (nom, version) VALUES (?, ?)", [identifiant, str(numero)])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        print(f"🧱 Migration {identifiant} appliquée.")
+    return complet
@@ -0,0 +1,135 @@
+# utils/pagination.py
+import json
+import threading
+from collections import OrderedDict
+
+from utils.db_utils import query_db, versions_tables
+
+# ============================================================
+# 📄 Pagination des listes (page/OFFSET ou curseur « après X »)
+# ============================================================
+COUNT_CACHE_MAX = 512
+
+_count_cache = OrderedDict()
+_count_lock = threading.Lock()
+
+
+class Pagination:
+    """Résultat d'une page : lignes + infos pour les liens précédent / suivant."""
+
+    def __init__(self, items, page, per_page, total, next_cursor):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.total_pages = (total // per_page) + (1 if total % per_page else 0)
+        self.next_cursor = next_cursor
+
+
+# ============================================================
+# 🔢 Total mis en cache, invalidé par les versions de tables
+# ============================================================
+def compter(count_query, args=(), tables=()):
+    """
+    COUNT mis en cache par (requête, paramètres, versions des tables).
+    Toute écriture sur une des `tables` (trigger table_versions)
+    invalide l'entrée ; sans `tables`, le COUNT est toujours exécuté.
+    """
+    if not tables:
+        return query_db(count_query, args, one=True)[0]
+
+    cle = (count_query, tuple(args), versions_tables(tables))
+    with _count_lock:
+        if cle in _count_cache:
+            _count_cache.move_to_end(cle)
+            return _count_cache[cle]
+
+    total = query_db(count_query, args, one=True)[0]
+    with _count_lock:
+        _count_cache[cle] = total
+        while len(_count_cache) > COUNT_CACHE_MAX:
+            _count_cache.popitem(last=False)
+    return total
+
+
+# ============================================================
+# 🧭 Curseur (valeurs de tri de la dernière ligne affichée)
+# ============================================================
+def encoder_curseur(valeurs):
+    return json.dumps(list(valeurs), separators=(",", ":"))
+
+
+def decoder_curseur(curseur, nb_cles):
+    """Curseur d'URL → liste de valeurs (None si absent ou illisible)."""
+    if not curseur:
+        return None
+    try:
+        valeurs = json.loads(curseur)
+    except ValueError:
+        return None
+    if not isinstance(valeurs, list) or len(valeurs) != nb_cles:
+        return None
+    return valeurs
+
+
+# ============================================================
+# 📚 Pagination
+# ============================================================
+def requete_total(base_query, args=(), count_query=None, count_args=None):
+    """(requête, paramètres) du total de la liste."""
+    if count_query is None:
+        return f"SELECT COUNT(*) FROM ({base_query})", list(args)
+    return count_query, list(count_args if count_args is not None else args)
+
+
+def requete_page(base_query, args=(), tri=(("id", "DESC"),), page=1, per_page=10, apres=None):
+    """
+    (requête, paramètres, alias des clés de tri) d'une page : per_page + 1
+    lignes, pour savoir s'il existe une page suivante.
+    """
+    page = max(1, page or 1)
+    sens = {direction.upper() for _, direction in tri}
+    if len(sens) != 1:
+        raise ValueError("paginer : toutes les clés de tri doivent avoir le même sens")
+    sens = sens.pop()
+
+    cles = ", ".join(f"{expr} AS _cle_{i}" for i, (expr, _) in enumerate(tri))
+    alias = [f"_cle_{i}" for i in range(len(tri))]
+    order_by = ", ".join(f"{a} {sens}" for a in alias)
+    sql = f"SELECT * FROM (SELECT *, {cles} FROM ({base_query}))"
+    params = list(args)
+
+    valeurs = decoder_curseur(apres, len(tri))
+    if valeurs is not None:
+        operateur = "<" if sens == "DESC" else ">"
+        sql += f" WHERE ({', '.join(alias)}) {operateur} ({', '.join('?' * len(alias))})"
+        params += valeurs
+        sql += f" ORDER BY {order_by} LIMIT ?"
+        params.append(per_page + 1)
+    else:
+        sql += f" ORDER BY {order_by} LIMIT ? OFFSET ?"
+        params += [per_page + 1, (page - 1) * per_page]
+    return sql, params, alias
+
+
+def paginer(base_query, args=(), tri=(("id", "DESC"),), page=1, per_page=10,
+            apres=None, tables=(), count_query=None, count_args=None):
+    """
+    Pagine `base_query` (SELECT complet, sans ORDER BY ni LIMIT).
+
+    tri    : [(expression, "ASC"|"DESC"), ...] sur les colonnes du SELECT,
+             non NULL, même sens partout ; la dernière clé doit être unique.
+    apres  : curseur renvoyé par la page précédente (`next_cursor`) ;
+             s'il est fourni, la page est lue par comparaison de clés
+             (WHERE (k1, k2) < (?, ?)) au lieu d'un OFFSET.
+    tables : tables lues par la requête, pour le cache du total.
+    """
+    page = max(1, page or 1)
+    sql, params, alias = requete_page(base_query, args, tri, page, per_page, apres)
+    total = compter(*requete_total(base_query, args, count_query, count_args), tables)
+
+    rows = query_db(sql, params)
+    suivante = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = encoder_curseur(rows[-1][a] for a in alias) if suivante and rows else None
+    return Pagination(rows, page, per_page, total, next_cursor)
@@ -0,0 +1,102 @@
+# utils/referentiel.py
+import threading
+
+from utils.db_utils import query_db, versions_tables
+
+# ============================================================
+# 📚 Cache des données de référence (listes déroulantes)
+#
+# Programmes, domaines, statuts, profils, complexités... changent
+# rarement : chaque jeu est chargé une fois puis servi depuis la
+# mémoire tant que la version de ses tables (table_versions,
+# incrémentée par trigger à chaque écriture) ne change pas.
+# Les valeurs retournées sont partagées : ne pas les modifier.
+# ============================================================
+
+
+def _grouper(rows, cle, en_dict=False):
+    """{ valeur de `cle` : [lignes] } dans l'ordre des lignes."""
+    groupes = {}
+    for r in rows:
+        groupes.setdefault(r[cle], []).append(dict(r) if en_dict else r)
+    return groupes
+
+
+# nom → (tables dont il dépend, chargement)
+REFERENTIELS = {
+    "programmes": (("programme",), lambda: query_db("SELECT id, nom, type FROM programme ORDER BY nom")),
+    "domaines": (("domaines",), lambda: query_db("SELECT id, nom FROM domaines ORDER BY nom")),
+    "categories": (("categorie",), lambda: query_db("SELECT id, nom FROM categorie ORDER BY nom")),
+    "statuts": (("statut",), lambda: query_db("SELECT id, nom FROM statut ORDER BY nom")),
+    "statuts_retenue": (("statut_demande",), lambda: query_db(
+        "SELECT id, nom FROM statut_demande WHERE nom IN ('Retenu','Non Retenue') ORDER BY nom"
+    )),
+    "profils": (("profils",), lambda: query_db("SELECT * FROM profils ORDER BY nom")),
+    "affectations": (("affectation",), lambda: query_db("SELECT * FROM affectation ORDER BY nom")),
+    "sous_domaines": (("sous_domaine_collaborateur",), lambda: query_db(
+        "SELECT id, nom FROM sous_domaine_collaborateur ORDER BY nom"
+    )),
+    "libelles_complexite": (("complexite",), lambda: query_db("""
+        SELECT DISTINCT libelle FROM complexite
+        WHERE libelle IS NOT NULL AND libelle <> ''
+        ORDER BY libelle
+    """)),
+    # { libelle : [options de complexité] }
+    "dropdowns_complexite": (("complexite",), lambda: _grouper(query_db("""
+        SELECT DISTINCT libelle, id, type_libelle, valeur_libelle
+        FROM complexite
+        WHERE type_libelle IS NOT NULL AND type_libelle <> ''
+        ORDER BY id
+    """), "libelle", en_dict=True)),
+    "libelles_valeur_metier": (("valeur_metier",), lambda: query_db("""
+        SELECT DISTINCT libelle FROM valeur_metier
+        WHERE libelle IS NOT NULL AND libelle <> ''
+        ORDER BY libelle
+    """)),
+    # { libelle : [options de valeur métier] }
+    "dropdowns": (("valeur_metier",), lambda: _grouper(query_db("""
+        SELECT id, libelle, type_libelle, valeur_libelle
+        FROM valeur_metier
+        ORDER BY libelle, type_libelle, valeur_libelle
+    """), "libelle")),
+}
+
+_cache = {}  # nom → (versions, valeur)
+_cache_lock = threading.Lock()
+
+
+def _valeur(nom, versions):
+    tables, charger = REFERENTIELS[nom]
+    if None in versions:
+        # Tables non suivies (base pas encore migrée) : pas de cache possible
+        return charger()
+    with _cache_lock:
+        entree = _cache.get(nom)
+        if entree and entree[0] == versions:
+            return entree[1]
+    valeur = charger()
+    with _cache_lock:
+        _cache[nom] = (versions, valeur)
+    return valeur
+
+
+def referentiels(*noms):
+    """
+    Jeux de référence demandés, dans l'ordre (une seule lecture des versions) :
+
+        programmes, domaines = referentiels("programmes", "domaines")
+    """
+    tables = list(dict.fromkeys(t for nom in noms for t in REFERENTIELS[nom][0]))
+    versions = dict(zip(tables, versions_tables(tables)))
+    return tuple(_valeur(nom, tuple(versions[t] for t in REFERENTIELS[nom][0])) for nom in noms)
+
+
+def referentiel(nom):
+    """Un seul jeu de référence."""
+    return referentiels(nom)[0]
+
+
+def vider_cache():
+    """Oublie tous les jeux chargés (rechargés à la prochaine demande)."""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,40 @@
+# utils/search_utils.py
+import re
+
+from utils.text_utils import normalize_text
+
+# ============================================================
+# 🔎 Recherche plein texte (tables FTS5 projet_fts / collaborateur_fts)
+# ============================================================
+
+
+def expression_fts(search, colonnes=None):
+    """
+    Saisie utilisateur → expression MATCH FTS5 : chaque mot normalisé
+    devient un préfixe ("mot"*), tous les mots sont requis.
+    `colonnes` restreint la recherche à certaines colonnes.
+    Retourne None si la saisie ne contient aucun mot.
+    """
+    mots = re.findall(r"\w+", normalize_text(search))
+    if not mots:
+        return None
+    expression = " ".join(f'"{mot}"*' for mot in mots)
+    if colonnes:
+        expression = "{" + " ".join(colonnes) + "} : (" + expression + ")"
+    return expression
+
+
+def filtre_fts(table_fts, cle, search, colonnes=None):
+    """
+    Fragments SQL pour filtrer et classer une liste par pertinence.
+
+    Retourne (jointure, rang, args) à insérer dans la requête :
+      jointure : JOIN <table_fts> f ON f.rowid = <cle> AND f.<table_fts> MATCH ?
+      rang     : f.rank (bm25, plus petit = plus pertinent)
+    Sans recherche exploitable : ("", "0", []).
+    """
+    expression = expression_fts(search, colonnes)
+    if expression is None:
+        return "", "0", []
+    jointure = f"JOIN {table_fts} f ON f.rowid = {cle} AND f.{table_fts} MATCH ?"
+    return jointure, "f.rank", [expression]
@@ -0,0 +1,241 @@
+# utils/sql_stats.py
+import contextvars
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+
+from flask import g, has_request_context, request
+
+# ============================================================
+# 📊 Instrumentation SQL par requête HTTP
+#
+# Les connexions de utils/db_utils passent chaque instruction (et
+# ses fetch*) par enregistrer() : nombre de requêtes et temps SQL
+# par requête HTTP (en-tête Server-Timing), instructions ramenées à
+# leur gabarit (littéraux → ?), agrégats par endpoint pour
+# /admin/sql-stats, et journal des instructions lentes avec leur
+# EXPLAIN QUERY PLAN.
+# (surchargés par SQL_STATS / SQL_SLOW_MS / SQL_SLOW_LOG dans .env)
+# ============================================================
+SQL_STATS = True
+SQL_SLOW_MS = 200.0
+RACINE = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SQL_SLOW_LOG = "logs/sql_lentes.log"  # relatif à la racine du projet
+SQL_TOP = 5                # gabarits les plus coûteux gardés par requête HTTP
+SQL_GABARITS_MAX = 50      # gabarits gardés par endpoint
+SQL_DERNIERES = 50         # dernières requêtes HTTP gardées
+
+logger = logging.getLogger("sql_lentes")
+
+_RE_CHAINE = re.compile(r"'(?:[^']|'')*'")
+_RE_NOMBRE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_ESPACES = re.compile(r"\s+")
+
+# Compteurs de la requête HTTP en cours (posés par before_request)
+_stats_requete = contextvars.ContextVar("sql_stats_requete", default=None)
+
+_lock = threading.Lock()
+_par_endpoint = {}
+_dernieres = deque(maxlen=SQL_DERNIERES)
+
+
+@lru_cache(maxsize=4096)
+def normaliser(sql):
+    """Gabarit d'une instruction : littéraux → ?, listes IN (?, ?, …) regroupées, espaces réduits."""
+    gabarit = _RE_CHAINE.sub("?", sql)
+    gabarit = _RE_NOMBRE.sub("?", gabarit)
+    gabarit = _RE_LISTE.sub("(?, …)", gabarit)
+    return _RE_ESPACES.sub(" ", gabarit).strip()
+
+
+def _plan(conn, sql, params):
+    """Lignes de l'EXPLAIN QUERY PLAN (curseur brut : non instrumenté)."""
+    try:
+        rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+    except (sqlite3.Error, ValueError):
+        return []
+    return [r[3] for r in rows]
+
+
+def _journaliser_lente(conn, sql, params, duree_ms):
+    endpoint = request.endpoint if has_request_context() else "hors requête"
+    plan = " ; ".join(_plan(conn, sql, params)) or "-"
+    logger.warning("🐢 %.1f ms [%s] %s | plan : %s", duree_ms, endpoint, normaliser(sql), plan)
+
+
+# --------------------------------------------------------------------
+# ⏱️ Mesure d'une instruction (appelée par les curseurs instrumentés)
+# --------------------------------------------------------------------
+class Suivi:
+    """Instruction en cours sur un curseur : temps cumulé (exécution + lectures)."""
+
+    __slots__ = ("conn", "sql", "params", "stats", "entree", "cumul_ms", "signalee")
+
+    def __init__(self, conn, sql, params, stats, entree):
+        self.conn, self.sql, self.params = conn, sql, params
+        self.stats, self.entree = stats, entree
+        self.cumul_ms = 0.0
+        self.signalee = False
+
+    def ajouter(self, duree_ms):
+        self.cumul_ms += duree_ms
+        if self.stats is not None:
+            self.stats["ms"] += duree_ms
+            self.entree[1] += duree_ms
+            if self.cumul_ms > self.entree[2]:
+                self.entree[2] = self.cumul_ms
+        if not self.signalee and self.cumul_ms >= SQL_SLOW_MS:
+            self.signalee = True
+            _journaliser_lente(self.conn, self.sql, self.params, self.cumul_ms)
+
+
+def enregistrer(conn, sql, params, duree_ms):
+    """
+    Compte une exécution de `sql` pour la requête HTTP courante.
+    Retourne le Suivi à prolonger par les lectures (fetch*), ou None si désactivé.
+    """
+    if not SQL_STATS:
+        return None
+
+    stats = _stats_requete.get()
+    entree = None
+    if stats is not None:
+        gabarit = normaliser(sql)
+        entree = stats["gabarits"].get(gabarit)
+        if entree is None:
+            entree = stats["gabarits"][gabarit] = [0, 0.0, 0.0]
+        stats["nb"] += 1
+        entree[0] += 1
+
+    suivi = Suivi(conn, sql, params, stats, entree)
+    suivi.ajouter(duree_ms)
+    return suivi
+
+
+# --------------------------------------------------------------------
+# 📈 Agrégats par endpoint
+# --------------------------------------------------------------------
+def _top(gabarits, n):
+    """[(gabarit, [nb, ms_total, ms_max])] triés par temps total décroissant."""
+    return sorted(gabarits.items(), key=lambda item: -item[1][1])[:n]
+
+
+def _agreger(endpoint, stats, duree_ms):
+    with _lock:
+        agregat = _par_endpoint.get(endpoint)
+        if agregat is None:
+            agregat = _par_endpoint[endpoint] = {
+                "requetes": 0, "sql_nb": 0, "sql_ms": 0.0, "sql_ms_max": 0.0,
+                "sql_nb_max": 0, "http_ms": 0.0, "gabarits": {},
+            }
+        agregat["requetes"] += 1
+        agregat["sql_nb"] += stats["nb"]
+        agregat["sql_ms"] += stats["ms"]
+        agregat["sql_ms_max"] = max(agregat["sql_ms_max"], stats["ms"])
+        agregat["sql_nb_max"] = max(agregat["sql_nb_max"], stats["nb"])
+        agregat["http_ms"] += duree_ms
+        gabarits = agregat["gabarits"]
+        for gabarit, (nb, ms, ms_max) in stats["gabarits"].items():
+            entree = gabarits.get(gabarit)
+            if entree is None:
+                gabarits[gabarit] = [nb, ms, ms_max]
+            else:
+                entree[0] += nb
+                entree[1] += ms
+                entree[2] = max(entree[2], ms_max)
+        if len(gabarits) > SQL_GABARITS_MAX:
+            agregat["gabarits"] = dict(_top(gabarits, SQL_GABARITS_MAX))
+
+        _dernieres.append({
+            "endpoint": endpoint,
+            "methode": request.method,
+            "chemin": request.path,
+            "http_ms": round(duree_ms, 3),
+            "sql_nb": stats["nb"],
+            "sql_ms": round(stats["ms"], 3),
+            "plus_lentes": [
+                {"sql": gab, "nb": nb, "ms": round(ms, 3)}
+                for gab, (nb, ms, _) in _top(stats["gabarits"], SQL_TOP)
+            ],
+        })
+
+
+def statistiques():
+    """Agrégats par endpoint (triés par temps SQL total) et dernières requêtes."""
+    with _lock:
+        endpoints = {}
+        for endpoint, a in sorted(_par_endpoint.items(), key=lambda item: -item[1]["sql_ms"]):
+            n = a["requetes"]
+            endpoints[endpoint] = {
+                "requetes": n,
+                "sql_nb_moyen": round(a["sql_nb"] / n, 2),
+                "sql_nb_max": a["sql_nb_max"],
+                "sql_ms_moyen": round(a["sql_ms"] / n, 3),
+                "sql_ms_max": round(a["sql_ms_max"], 3),
+                "http_ms_moyen": round(a["http_ms"] / n, 3),
+                "plus_couteuses": [
+                    {"sql": gab, "nb": nb, "ms_total": round(ms, 3), "ms_max": round(ms_max, 3)}
+                    for gab, (nb, ms, ms_max) in _top(a["gabarits"], SQL_TOP)
+                ],
+            }
+        return {
+            "seuil_lente_ms": SQL_SLOW_MS,
+            "endpoints": endpoints,
+            "dernieres": list(reversed(_dernieres)),
+        }
+
+
+def reinitialiser():
+    with _lock:
+        _par_endpoint.clear()
+        _dernieres.clear()
+
+
+# --------------------------------------------------------------------
+# 🔌 Branchement sur l'application
+# --------------------------------------------------------------------
+def init_sql_stats(app):
+    """Lit la configuration, ouvre le journal des instructions lentes et pose les hooks."""
+    global SQL_STATS, SQL_SLOW_MS
+    SQL_STATS = os.environ.get("SQL_STATS", "1") == "1"
+    SQL_SLOW_MS = float(os.environ.get("SQL_SLOW_MS", SQL_SLOW_MS))
+
+    chemin = os.environ.get("SQL_SLOW_LOG", SQL_SLOW_LOG)
+    if chemin and not logger.handlers:
+        chemin = os.path.join(RACINE, chemin)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        handler = RotatingFileHandler(chemin, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.WARNING)
+
+    @app.before_request
+    def _debut_requete():
+        g.debut_requete = time.perf_counter()
+        g.sql_stats_jeton = _stats_requete.set({"nb": 0, "ms": 0.0, "gabarits": {}})
+
+    @app.after_request
+    def _server_timing(response):
+        stats = _stats_requete.get()
+        if not SQL_STATS or stats is None or request.endpoint in (None, "static"):
+            return response
+        duree_ms = (time.perf_counter() - g.debut_requete) * 1000
+        response.headers.add(
+            "Server-Timing",
+            f'db;desc="SQL x{stats["nb"]}";dur={stats["ms"]:.1f}, app;dur={duree_ms:.1f}'
+        )
+        _agreger(request.endpoint, stats, duree_ms)
+        return response
+
+    @app.teardown_request
+    def _fin_requete(exc=None):
+        jeton = g.pop("sql_stats_jeton", None)
+        if jeton is not None:
+            _stats_requete.reset(jeton)
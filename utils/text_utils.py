@@ -0,0 +1,21 @@
+# utils/text_utils.py
+import unicodedata
+
+# ============================================================
+# 🔠 Normalisation du texte (imports Excel, recherche plein texte)
+# ============================================================
+
+
+def normalize_text(text):
+    """Nettoie et normalise les textes (accents, « œ », séparateurs, casse, espaces)."""
+    if text is None:
+        return ""
+    text = str(text).strip()
+    if text.lower() == "nan":
+        return ""
+    text = text.lower()
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    text = text.replace("_", " ").replace("-", " ").replace("’", "'").replace("œ", "oe")
+    text = " ".join(text.split())
+    return text